@@ -1,12 +1,30 @@
 __all__ = [
+    "cache",
     "classification",
+    "classification_model",
+    "exif",
+    "export",
     "gui",
     "identification_edit_window_ui",
     "identification",
     "image",
+    "image_loader",
+    "importer",
+    "index",
+    "journal",
+    "json_codec",
     "main_window_ui",
+    "persistence",
+    "photo_grid",
+    "photo_viewer",
+    "prefetcher",
+    "scanner",
     "single_slot_connector",
     "species_edit_window",
     "species",
+    "thumbnail_cache",
+    "thumbs",
+    "watcher",
+    "worker",
     "workspace"
 ]
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+* cache.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable
+
+### CACHE classes ###
+
+"""
+* LruCache
+* Bounded least recently used cache, the bound is an entry count or a total weight given by a weigher function.
+"""
+class LruCache:
+
+    def __init__(self, capacity: int, weigher: Callable = None) -> None:
+        # Init context.
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.weight = 0
+        self._weigher = (lambda value: 1) if (weigher is None) else weigher
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Any) -> bool:
+        with self._lock:
+            return (key in self._entries)
+
+    def _evict(self) -> None:
+        # Remove least recently used entries until the bound is respected (last one is always kept).
+        while ((self.weight > self.capacity) and (len(self._entries) > 1)):
+            _, (_, weight) = self._entries.popitem(last=False)
+            self.weight -= weight
+
+    def get(self, key: Any, default: Any = None, is_valid: Callable = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            # Stale entries are dropped and counted as misses.
+            if ((entry is not None) and (is_valid is not None) and (is_valid(entry[0]) == False)):
+                del self._entries[key]
+                self.weight -= entry[1]
+                entry = None
+            if (entry is None):
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def peek(self, key: Any, default: Any = None) -> Any:
+        # Read without updating recency and counters.
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if (entry is None) else entry[0]
+
+    def put(self, key: Any, value: Any) -> None:
+        # Local variables.
+        weight = self._weigher(value)
+        # Do not flush the whole cache for an entry which can never fit.
+        if (weight > self.capacity):
+            self.pop(key)
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if (previous is not None):
+                self.weight -= previous[1]
+            self._entries[key] = (value, weight)
+            self.weight += weight
+            self._evict()
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if (entry is None):
+                return default
+            self.weight -= entry[1]
+            return entry[0]
+
+    def remove_if(self, predicate: Callable) -> None:
+        # Remove all entries whose key matches the predicate.
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self.weight -= self._entries.pop(key)[1]
+
+    def set_capacity(self, capacity: int) -> None:
+        with self._lock:
+            self.capacity = capacity
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def hit_rate(self) -> float:
+        # Ratio of successful lookups.
+        lookups = (self.hits + self.misses)
+        return (self.hits / lookups) if (lookups > 0) else 0.0
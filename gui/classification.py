@@ -5,18 +5,37 @@
 *      Author: Ludo
 """
 
+import logging
 import os
-import array
+import re
+import shutil
 
-from pathlib import Path
-from PySide6.QtWidgets import QTreeWidgetItem, QHeaderView
+from PySide6.QtCore import QFile, QModelIndex, QPoint, Qt, QThreadPool
+from PySide6.QtGui import QKeySequence, QShortcut
+from PySide6.QtWidgets import QFileDialog, QHeaderView, QInputDialog, QMenu, QMessageBox
 
-from gui.species import Species, SpeciesEditWindow, SpeciesView
+from gui.cache import LruCache
+from gui.classification_model import ClassificationModel
+from gui.identification import Identification, IDENTIFICATION_CODEC
+from gui.image import Image
+from gui.importer import PhotoImporter
+from gui.index import WorkspaceIndex
+from gui.journal import EditJournal
+from gui.persistence import PersistenceQueue
+from gui.prefetcher import SpeciesPrefetcher
+from gui.single_slot_connector import SingleSlotConnector
+from gui.species import Species, SpeciesEditWindow, SpeciesView, SPECIES_CODEC
+from gui.thumbnail_cache import ThumbnailCache
+from gui.watcher import WorkspaceWatcher
+from gui.worker import Worker, WorkerSignals
 
 ### CLASSIFICATION macros ###   
 
 CLASSIFICATION_SPECIES_COLUMN = 6
 CLASSIFICATION_DEPTH_MAX = 8
+CLASSIFICATION_RANK_NAMES = ["Règne", "Division", "Classe", "Ordre", "Famille", "Genre", "Espèce"]
+CLASSIFICATION_TITLE = "CLASSIFICATION"
+CLASSIFICATION_SPECIES_CACHE_SIZE = 32
 
 ### CLASSIFICATION class definition ###
         
@@ -28,63 +47,463 @@ class ClassificationView:
         self._current_species = None
         self._current_species_directory = os.getcwd()
         self._data_directory_path = data_directory_path
-        # Setup tree view.
-        self._gui.classificationTreeWidget.header().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self._gui.classificationTreeWidget.itemClicked.connect(self._item_clicked_callback)
-        self._gui.classificationAddSpeciesPushButton.clicked.connect(self._add_species_callback)
-        self._gui.classificationRefreshPushButton.clicked.connect(self._refresh_callback)
-        # Init GUI.
+        # Edits of a previous session which has not been closed properly are applied before the scan.
+        self._journal = EditJournal.open(self._data_directory_path, {SPECIES_CODEC.name: (SPECIES_CODEC, Species), IDENTIFICATION_CODEC.name: (IDENTIFICATION_CODEC, Identification)})
+        self._index = WorkspaceIndex(self._data_directory_path, CLASSIFICATION_DEPTH_MAX)
+        self._model = ClassificationModel(self._index, self._data_directory_path, len(CLASSIFICATION_RANK_NAMES), self._gui.classificationTreeView)
+        self._single_slot_connector = SingleSlotConnector()
+        self._thread_pool = QThreadPool()
+        self._thread_pool.setMaxThreadCount(1)
+        self._background_thread_pool = QThreadPool()
+        self._index_worker = None
+        self._thumbnail_worker = None
+        self._import_worker = None
+        self._pending_directories = []
+        self._closed = False
+        self._species_cache = LruCache(CLASSIFICATION_SPECIES_CACHE_SIZE)
+        self._prefetcher = SpeciesPrefetcher(self._gui, self._species_cache)
+        # Watch taxonomy directories (species level changes are seen by its parent) and the opened species.
+        self._watcher = WorkspaceWatcher()
+        self._watcher.changed.connect(self._directories_changed_callback)
+        self._species_watcher = WorkspaceWatcher()
+        self._species_watcher.changed.connect(self._species_changed_callback)
+        # Setup tree view (only visible rows are measured).
+        self._gui.classificationTreeView.setModel(self._model)
+        self._gui.classificationTreeView.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self._gui.classificationTreeView.header().setResizeContentsPrecision(0)
+        self._gui.classificationTreeView.setContextMenuPolicy(Qt.CustomContextMenu)
+        self._single_slot_connector.connect(self._gui.classificationTreeView.clicked, self._item_clicked_callback)
+        self._single_slot_connector.connect(self._gui.classificationTreeView.customContextMenuRequested, self._context_menu_callback)
+        self._single_slot_connector.connect(self._gui.classificationTreeView.selectionModel().currentChanged, self._current_changed_callback)
+        self._single_slot_connector.connect(self._gui.classificationAddSpeciesPushButton.clicked, self._add_species_callback)
+        self._single_slot_connector.connect(self._gui.classificationRefreshPushButton.clicked, self._refresh_callback)
+        # Undo and redo the edits of the journal.
+        self._undo_shortcut = QShortcut(QKeySequence.Undo, self._gui)
+        self._undo_shortcut.activated.connect(self._undo_callback)
+        self._redo_shortcut = QShortcut(QKeySequence.Redo, self._gui)
+        self._redo_shortcut.activated.connect(self._redo_callback)
+        # Report files which could not be written (callback is called from the writer thread).
+        self._persistence_signals = WorkerSignals()
+        self._persistence_signals.failed.connect(self._write_failed_callback)
+        self._persistence_failure_callback = lambda path, error: self._persistence_signals.failed.emit(path)
+        PersistenceQueue.get_default().add_failure_callback(self._persistence_failure_callback)
+        # Init GUI (tree is displayed from the index while it is updated).
         SpeciesView.clear(self._gui)
+        self._update_header()
         self._refresh_callback()
 
-    def _refresh_callback(self) -> None:
+    @staticmethod
+    def _scan(worker: Worker, index: WorkspaceIndex) -> list:
+        # Stream batches of modified nodes to the GUI thread.
+        return index.update(lambda nodes, directory_count: worker.signals.progress.emit((nodes, directory_count)), worker.is_cancelled)
+
+    @staticmethod
+    def _update_directories(worker: Worker, index: WorkspaceIndex, directory_paths: list) -> tuple:
+        _ = worker
+        return index.update_directories(directory_paths)
+
+    def _update_header(self) -> None:
         # Local variables.
         header = []
-        item_count = array.array('I', (0 for i in range(0, CLASSIFICATION_DEPTH_MAX)))
-        data_directory_depth = len(Path(os.path.join(self._data_directory_path)).parents)
-        # Reset tree.
-        self._gui.classificationTreeWidget.clear()
-        # Read all data folder.
-        for root, _, _ in sorted(os.walk(self._data_directory_path)):
-            # Ignore folders with name starting with dot.
-            rel = os.path.relpath(root, self._data_directory_path)
-            if rel != ".":
-                parts = rel.split(os.sep)
-                if any(p.startswith(".") for p in parts):
-                    continue
-            # Compute directory depth.
-            depth = (len(Path(os.path.join(root)).parents) - data_directory_depth)
-            if ((depth > 0) and (depth < CLASSIFICATION_DEPTH_MAX)):
-                # Convert folder name in pretty format.
-                pretty_name = str(os.path.basename(root).title()).replace("_", " ")
-                # Add item.
-                item = QTreeWidgetItem(self._gui.classificationTreeWidget)
-                item.setText((depth - 1), pretty_name)
-                item.setWhatsThis((depth - 1), os.path.join(root))
-                # Update item count.
-                item_count[depth] += 1
+        item_count = self._index.get_depth_counts()
         # Set header.
-        header.append("Règne ("    + str(item_count[1]) + ")")
-        header.append("Division (" + str(item_count[2]) + ")")
-        header.append("Classe ("   + str(item_count[3]) + ")")
-        header.append("Ordre ("    + str(item_count[4]) + ")")
-        header.append("Famille ("  + str(item_count[5]) + ")")
-        header.append("Genre ("    + str(item_count[6]) + ")")
-        header.append("Espèce ("   + str(item_count[7]) + ")")
-        self._gui.classificationTreeWidget.setHeaderLabels(header)
-        
-    def _item_clicked_callback(self, item, column) -> None:
-        # Unused variable.
-        _ = column
-        # Check if a species has been clicked.
-        if (item.text(CLASSIFICATION_SPECIES_COLUMN)):
-            # Try creating species object.
+        for depth, rank_name in enumerate(CLASSIFICATION_RANK_NAMES, start=1):
+            header.append(rank_name + " (" + str(item_count[depth]) + ")")
+        self._model.set_header(header)
+
+    def _refresh_callback(self) -> None:
+        # Check if a scan or an update is already running.
+        if (self._index_worker is not None):
+            return
+        self._pending_directories = []
+        # Update index in background (only modified directories are read).
+        self._index_worker = Worker(ClassificationView._scan, self._index)
+        self._index_worker.signals.progress.connect(self._scan_progress_callback)
+        self._index_worker.signals.finished.connect(self._scan_finished_callback)
+        self._index_worker.signals.failed.connect(self._scan_failed_callback)
+        self._gui.classificationRefreshPushButton.setEnabled(False)
+        self._gui.classificationGroupBox.setTitle(CLASSIFICATION_TITLE + " (analyse...)")
+        self._thread_pool.start(self._index_worker)
+
+    def _scan_progress_callback(self, batch: tuple) -> None:
+        # Local variables.
+        nodes, directory_count = batch
+        # Check context.
+        if (self._closed == True):
+            return
+        # Patch tree and counts.
+        self._model.insert_nodes(nodes)
+        self._update_header()
+        self._gui.classificationGroupBox.setTitle(CLASSIFICATION_TITLE + " (analyse : " + str(directory_count) + " dossiers)")
+
+    def _scan_finished_callback(self, removed_paths: list) -> None:
+        # Check context.
+        if (self._closed == True):
+            return
+        # Remove vanished nodes.
+        if (removed_paths is not None):
+            self._model.remove_paths(removed_paths)
+        self._update_header()
+        # Watch all taxonomy directories.
+        self._watcher.set_paths(self._index.get_directory_paths(CLASSIFICATION_DEPTH_MAX - 1))
+        self._scan_done()
+
+    def _scan_failed_callback(self, error: str) -> None:
+        # Check context.
+        if (self._closed == True):
+            return
+        logging.error("Workspace scan failed : %s", error)
+        self._scan_done()
+
+    def _scan_done(self) -> None:
+        self._index_worker = None
+        self._gui.classificationRefreshPushButton.setEnabled(True)
+        self._gui.classificationGroupBox.setTitle(CLASSIFICATION_TITLE)
+        # Process changes notified during the scan.
+        if (len(self._pending_directories) > 0):
+            self._directories_changed_callback([])
+
+    def _directories_changed_callback(self, directory_paths: list) -> None:
+        # Local variables.
+        self._pending_directories.extend(directory_paths)
+        # Wait for the running scan or update.
+        if ((self._index_worker is not None) or (len(self._pending_directories) == 0)):
+            return
+        # Update modified sub-trees only.
+        self._index_worker = Worker(ClassificationView._update_directories, self._index, sorted(set(self._pending_directories)))
+        self._index_worker.signals.finished.connect(self._update_finished_callback)
+        self._index_worker.signals.failed.connect(self._scan_failed_callback)
+        self._pending_directories = []
+        self._gui.classificationRefreshPushButton.setEnabled(False)
+        self._thread_pool.start(self._index_worker)
+
+    def _update_finished_callback(self, result: tuple) -> None:
+        # Local variables.
+        nodes, removed_paths = result
+        # Check context.
+        if (self._closed == True):
+            return
+        # Patch tree, counts and watched directories.
+        self._model.insert_nodes(nodes)
+        self._model.remove_paths(removed_paths)
+        self._update_header()
+        self._watcher.remove_paths(removed_paths)
+        self._watcher.add_paths([node.path for node in nodes if (node.depth < (CLASSIFICATION_DEPTH_MAX - 1))])
+        self._scan_done()
+
+    def _species_changed_callback(self, paths: list) -> None:
+        _ = paths
+        # Check context.
+        if ((self._closed == True) or (self._current_species is None)):
+            return
+        # Reload opened species only.
+        identification_index = self._current_species.get_identification_index()
+        try:
+            self._set_current_species(self._load_species(self._current_species_directory))
+            self._current_species.set_identification_index(identification_index)
+            self._current_species.display(reset_identification=False)
+            self._species_watcher.set_paths(self._current_species.get_watched_paths())
+        except Exception as e:
+            logging.warning("Species reload failed : %s", e)
+            self._species_cache.pop(self._current_species_directory)
+            self._close_species()
+
+    def _write_failed_callback(self, json_path: str) -> None:
+        # Check context.
+        if (self._closed == True):
+            return
+        # Views which have been read before display modifications which are not saved.
+        self._species_cache.remove_if(lambda path: self._is_inside(json_path, path))
+        if ((self._current_species is not None) and self._is_inside(json_path, self._current_species_directory)):
+            self._species_changed_callback([json_path])
+        QMessageBox.warning(self._gui, "Enregistrer", "L'enregistrement de " + json_path + " a échoué, les modifications ne sont pas enregistrées dans le fichier.")
+
+    def _undo_callback(self) -> None:
+        self._walk_journal(self._journal.undo)
+
+    def _redo_callback(self) -> None:
+        self._walk_journal(self._journal.redo)
+
+    def _walk_journal(self, walk) -> None:
+        # Apply previous or next edit.
+        try:
+            json_path = walk()
+        except (OSError, ValueError) as e:
+            logging.error("Edit cannot be undone or redone, it is removed from the history : %s", e)
+            return
+        if ((self._closed == True) or (json_path is None)):
+            return
+        # Views which have been read before are outdated.
+        self._species_cache.remove_if(lambda path: self._is_inside(json_path, path))
+        if ((self._current_species is not None) and self._is_inside(json_path, self._current_species_directory)):
+            self._species_changed_callback([json_path])
+            return
+        # Show the modified species (JSON file of the species or of one of its identifications).
+        for directory_path in [os.path.dirname(json_path), os.path.dirname(os.path.dirname(json_path))]:
+            item = self._model.item(self._model.locate(directory_path))
+            if ((item is not None) and (item.depth == (CLASSIFICATION_SPECIES_COLUMN + 1))):
+                self._select(directory_path)
+                self._open_species(directory_path)
+                return
+
+    @staticmethod
+    def _compute_directory_name(name: str) -> str:
+        # Same rule as the species JSON file name.
+        return re.sub(r"\s+", "_", name.strip().lower())
+
+    @staticmethod
+    def _is_inside(path: str, directory_path: str) -> bool:
+        return ((path == directory_path) or path.startswith(directory_path + os.sep))
+
+    def _load_species(self, species_directory_path: str) -> SpeciesView:
+        # Reuse recently viewed species if its content has not been modified.
+        species_view = self._species_cache.get(species_directory_path, is_valid=SpeciesView.is_up_to_date)
+        if (species_view is None):
+            species_view = SpeciesView(self._gui, species_directory_path)
+            self._species_cache.put(species_directory_path, species_view)
+        logging.debug("Species cache : %d hits, %d misses", self._species_cache.hits, self._species_cache.misses)
+        return species_view
+
+    def _open_species(self, species_directory_path: str) -> None:
+        # Try creating species object.
+        try:
+            self._current_species_directory = species_directory_path
+            self._set_current_species(self._load_species(self._current_species_directory))
+            self._current_species.set_image(self._prefetcher.take_image(self._current_species_directory))
+            self._current_species.display()
+            self._species_watcher.set_paths(self._current_species.get_watched_paths())
+        except Exception as e:
+            raise ValueError(f"Species object creation failed: {e}")
+
+    def _set_current_species(self, species_view: SpeciesView) -> None:
+        # Previous species is only kept in the cache.
+        if ((self._current_species is not None) and (self._current_species is not species_view)):
+            self._current_species.hide()
+        self._current_species = species_view
+
+    def _close_species(self) -> None:
+        self._set_current_species(None)
+        self._current_species_directory = self._data_directory_path
+        self._species_watcher.clear()
+        SpeciesView.clear(self._gui)
+
+    def _select(self, directory_path: str) -> None:
+        # Local variables.
+        index = self._model.locate(directory_path)
+        # Check index.
+        if (not index.isValid()):
+            return
+        # Select node in the column of its rank.
+        index = index.siblingAtColumn(self._model.item(index).depth - 1)
+        self._gui.classificationTreeView.setCurrentIndex(index)
+        self._gui.classificationTreeView.scrollTo(index)
+
+    def add_node(self, directory_path: str, species: Species = None) -> None:
+        # Check path.
+        if (not directory_path.startswith(self._data_directory_path + os.sep)):
+            logging.error("Directory is outside of the workspace : %s", directory_path)
+            return
+        os.makedirs(directory_path, exist_ok=True)
+        # Patch index, tree and counts (only the new node and its missing ancestors).
+        nodes = self._index.add_directory(directory_path, species)
+        self._model.insert_nodes(nodes)
+        self._update_header()
+        self._watcher.add_paths([node.path for node in nodes if (node.depth < (CLASSIFICATION_DEPTH_MAX - 1))])
+        self._select(directory_path)
+
+    def rename_node(self, directory_path: str, new_name: str) -> None:
+        # Local variables.
+        new_directory_path = os.path.join(os.path.dirname(directory_path), self._compute_directory_name(new_name))
+        # Check name.
+        if ((new_directory_path == directory_path) or (os.path.basename(new_directory_path) in ["", ".", ".."])):
+            return
+        if os.path.exists(new_directory_path):
+            QMessageBox.warning(self._gui, "Renommer", "Le dossier " + os.path.basename(new_directory_path) + " existe déjà.")
+            return
+        # Rename directory (journaled edits are written first, they refer to the old path).
+        if (self._journal.compact() == False):
+            QMessageBox.warning(self._gui, "Renommer", "Les modifications en cours n'ont pas pu être enregistrées.")
+            return
+        old_watched_paths = self._index.get_directory_paths(CLASSIFICATION_DEPTH_MAX - 1, directory_path)
+        try:
+            os.rename(directory_path, new_directory_path)
+        except OSError as e:
+            logging.error("Directory renaming failed : %s", e)
+            return
+        self._journal.rename_directory(directory_path, new_directory_path)
+        # Patch index, tree, cache and watched directories.
+        self._species_cache.remove_if(lambda path: self._is_inside(path, directory_path))
+        node = self._index.rename_directory(directory_path, new_directory_path)
+        self._model.remove_paths([directory_path])
+        if (node is not None):
+            self._model.insert_nodes([node])
+        self._watcher.remove_paths(old_watched_paths)
+        self._watcher.add_paths(self._index.get_directory_paths(CLASSIFICATION_DEPTH_MAX - 1, new_directory_path))
+        self._select(new_directory_path)
+        # Reopen species if its path has changed.
+        if ((self._current_species is not None) and self._is_inside(self._current_species_directory, directory_path)):
+            identification_index = self._current_species.get_identification_index()
+            self._open_species(new_directory_path + self._current_species_directory[len(directory_path):])
+            self._current_species.set_identification_index(identification_index)
+            self._current_species.display(reset_identification=False)
+
+    def delete_node(self, directory_path: str, permanent: bool = False) -> bool:
+        # Local variables.
+        old_watched_paths = self._index.get_directory_paths(CLASSIFICATION_DEPTH_MAX - 1, directory_path)
+        self._journal.compact()
+        # Move directory to trash so that it can be restored.
+        if (permanent == True):
             try:
-                self._current_species_directory = item.whatsThis(CLASSIFICATION_SPECIES_COLUMN)
-                self._current_species = SpeciesView(self._gui, self._current_species_directory)
-                self._current_species.display()
-            except Exception as e:
-                raise ValueError(f"Species object creation failed: {e}")
+                shutil.rmtree(directory_path)
+            except OSError as e:
+                logging.error("Directory deletion failed : %s", e)
+                return False
+        elif (QFile.moveToTrash(directory_path) == False):
+            logging.warning("Directory cannot be moved to trash : %s", directory_path)
+            return False
+        # Patch journal, index, tree, cache, counts and watched directories.
+        self._journal.remove_directory(directory_path)
+        self._species_cache.remove_if(lambda path: self._is_inside(path, directory_path))
+        self._index.remove_directory(directory_path)
+        self._model.remove_paths([directory_path])
+        self._update_header()
+        self._watcher.remove_paths(old_watched_paths)
+        # Clear species panel if it was displayed.
+        if ((self._current_species is not None) and self._is_inside(self._current_species_directory, directory_path)):
+            self._close_species()
+        return True
+
+    def _item_clicked_callback(self, index: QModelIndex) -> None:
+        # Local variables.
+        item = self._model.item(index)
+        # Check if a species has been clicked.
+        if ((item is not None) and (item.depth == (CLASSIFICATION_SPECIES_COLUMN + 1))):
+            self._open_species(item.path)
+
+    @staticmethod
+    def _rebuild_thumbnails(worker: Worker, directory_path: str) -> int:
+        # Local variables.
+        image_paths = Image.find(directory_path)
+        # Generate all preview sizes again.
+        return ThumbnailCache.get_default().rebuild(image_paths, lambda count, total: worker.signals.progress.emit((count, total)), worker.is_cancelled)
+
+    def rebuild_thumbnails(self, directory_path: str) -> None:
+        # Check if a rebuild is already running.
+        if (self._thumbnail_worker is not None):
+            return
+        self._thumbnail_worker = Worker(ClassificationView._rebuild_thumbnails, directory_path)
+        self._thumbnail_worker.signals.progress.connect(self._thumbnails_progress_callback)
+        self._thumbnail_worker.signals.finished.connect(self._thumbnails_done_callback)
+        self._thumbnail_worker.signals.failed.connect(self._thumbnails_done_callback)
+        self._background_thread_pool.start(self._thumbnail_worker)
+
+    def _thumbnails_progress_callback(self, progress: tuple) -> None:
+        # Local variables.
+        count, total = progress
+        # Show progress unless a scan is running.
+        if ((self._closed == False) and (self._index_worker is None)):
+            self._gui.classificationGroupBox.setTitle(CLASSIFICATION_TITLE + " (miniatures : " + str(count) + "/" + str(total) + ")")
+
+    def _thumbnails_done_callback(self, result: object) -> None:
+        _ = result
+        self._thumbnail_worker = None
+        if ((self._closed == False) and (self._index_worker is None)):
+            self._gui.classificationGroupBox.setTitle(CLASSIFICATION_TITLE)
+
+    @staticmethod
+    def _import_photos(worker: Worker, source_directory_path: str, species_directory_path: str) -> PhotoImporter:
+        # Local variables.
+        importer = PhotoImporter(species_directory_path)
+        # Copy photos in dated identifications.
+        importer.run(Image.find(source_directory_path), lambda count, total: worker.signals.progress.emit((count, total)), worker.is_cancelled)
+        return importer
+
+    def import_photos(self, source_directory_path: str, species_directory_path: str) -> None:
+        # Check if an import is already running.
+        if (self._import_worker is not None):
+            return
+        self._import_worker = Worker(ClassificationView._import_photos, source_directory_path, species_directory_path)
+        self._import_worker.signals.progress.connect(self._import_progress_callback)
+        self._import_worker.signals.finished.connect(lambda importer, path=species_directory_path: self._import_done_callback(path, importer))
+        self._import_worker.signals.failed.connect(lambda error, path=species_directory_path: self._import_done_callback(path, None))
+        self._background_thread_pool.start(self._import_worker)
+
+    def _import_progress_callback(self, progress: tuple) -> None:
+        # Local variables.
+        count, total = progress
+        # Show progress unless a scan is running.
+        if ((self._closed == False) and (self._index_worker is None)):
+            self._gui.classificationGroupBox.setTitle(CLASSIFICATION_TITLE + " (import : " + str(count) + "/" + str(total) + ")")
+
+    def _import_done_callback(self, species_directory_path: str, importer: PhotoImporter) -> None:
+        self._import_worker = None
+        if (self._closed == True):
+            return
+        if (self._index_worker is None):
+            self._gui.classificationGroupBox.setTitle(CLASSIFICATION_TITLE)
+        # Show new identifications.
+        self._species_cache.pop(species_directory_path)
+        if ((self._current_species is not None) and (self._current_species_directory == species_directory_path)):
+            self._species_changed_callback([species_directory_path])
+        if (importer is None):
+            QMessageBox.warning(self._gui, "Importer des photos", "L'import a échoué.")
+        else:
+            QMessageBox.information(self._gui, "Importer des photos", f"{importer.copied_count} photos importées, {importer.skipped_count} déjà présentes, {importer.cancelled_count} annulées, {importer.failed_count} en erreur.\n{len(importer.created_directories)} identifications créées.")
+
+    def _current_changed_callback(self, current: QModelIndex, previous: QModelIndex) -> None:
+        # Local variables.
+        _ = previous
+        item = self._model.item(current)
+        neighbour_paths = []
+        # Preload sibling species of the selected one.
+        if ((item is not None) and (item.depth == (CLASSIFICATION_SPECIES_COLUMN + 1))):
+            neighbour_paths = SpeciesPrefetcher.neighbours([child.path for child in item.parent.children], item.path, self._prefetcher.depth)
+        self._prefetcher.schedule(neighbour_paths)
+
+    def _context_menu_callback(self, position: QPoint) -> None:
+        # Local variables.
+        item = self._model.item(self._gui.classificationTreeView.indexAt(position))
+        directory_path = self._data_directory_path if (item is None) else item.path
+        depth = 0 if (item is None) else item.depth
+        menu = QMenu(self._gui.classificationTreeView)
+        # Build menu (species directories only contain identifications).
+        new_action = menu.addAction("Nouveau dossier") if (depth < CLASSIFICATION_SPECIES_COLUMN + 1) else None
+        rename_action = menu.addAction("Renommer") if (item is not None) else None
+        delete_action = menu.addAction("Supprimer") if (item is not None) else None
+        menu.addSeparator()
+        import_action = menu.addAction("Importer des photos...") if (depth == (CLASSIFICATION_SPECIES_COLUMN + 1)) else None
+        if (import_action is not None):
+            import_action.setEnabled(self._import_worker is None)
+        thumbnails_action = menu.addAction("Reconstruire les miniatures")
+        thumbnails_action.setEnabled(self._thumbnail_worker is None)
+        action = menu.exec(self._gui.classificationTreeView.viewport().mapToGlobal(position))
+        # Execute action.
+        if (action is None):
+            return
+        if (action == new_action):
+            name, ok = QInputDialog.getText(self._gui, "Nouveau dossier", CLASSIFICATION_RANK_NAMES[depth] + " :")
+            if ((ok == True) and (self._compute_directory_name(name) != "")):
+                self.add_node(os.path.join(directory_path, self._compute_directory_name(name)))
+        elif (action == rename_action):
+            name, ok = QInputDialog.getText(self._gui, "Renommer", CLASSIFICATION_RANK_NAMES[depth - 1] + " :", text=item.pretty_name())
+            if (ok == True):
+                self.rename_node(directory_path, name)
+        elif (action == import_action):
+            source_directory_path = QFileDialog.getExistingDirectory(self._gui, "Importer des photos", os.path.expanduser("~"), QFileDialog.ShowDirsOnly)
+            if (source_directory_path != ""):
+                self.import_photos(source_directory_path, directory_path)
+        elif (action == thumbnails_action):
+            self.rebuild_thumbnails(directory_path)
+        elif (action == delete_action):
+            # Journaled edits are written first (history of the removed files is dropped).
+            if (self._journal.compact() == False):
+                QMessageBox.warning(self._gui, "Supprimer", "Les modifications en cours n'ont pas pu être enregistrées.")
+                return
+            answer = QMessageBox.question(self._gui, "Supprimer", "Déplacer " + item.pretty_name() + " et tout son contenu vers la corbeille ?")
+            if ((answer == QMessageBox.Yes) and (self.delete_node(directory_path) == False)):
+                answer = QMessageBox.question(self._gui, "Supprimer", "La corbeille n'est pas disponible, supprimer définitivement " + item.pretty_name() + " ?")
+                if (answer == QMessageBox.Yes):
+                    self.delete_node(directory_path, permanent=True)
 
     def _add_species_callback(self) -> None:
         # Create static object.
@@ -96,8 +515,45 @@ class ClassificationView:
         if (new_window._has_changed == True):
             # Create species object.
             new_species_view = SpeciesView(self._gui, new_species.creation_directory_path, new_species)
-            _ = new_species_view
-            # Refresh GUI.
-            self._refresh_callback()
+            self._species_cache.put(new_species.creation_directory_path, new_species_view)
+            # Insert new node and display it.
+            self.add_node(new_species.creation_directory_path, new_species)
+            item = self._model.item(self._model.locate(new_species.creation_directory_path))
+            if ((item is not None) and (item.depth == (CLASSIFICATION_SPECIES_COLUMN + 1))):
+                self._open_species(item.path)
         new_window.close()
+
+    def close(self) -> None:
+        # Cancel running scan and prefetching.
+        self._closed = True
+        if (self._index_worker is not None):
+            self._index_worker.cancel()
+        self._prefetcher.clear()
+        self._prefetcher.deleteLater()
+        for worker in [self._thumbnail_worker, self._import_worker]:
+            if (worker is not None):
+                worker.cancel()
+        if (self._current_species is not None):
+            self._current_species.hide()
+        # Only the workers of the view are waited for.
+        self._background_thread_pool.waitForDone()
+        self._thread_pool.waitForDone()
+        self._index_worker = None
+        self._gui.classificationRefreshPushButton.setEnabled(True)
+        self._gui.classificationGroupBox.setTitle(CLASSIFICATION_TITLE)
+        # Write journaled edits.
+        self._undo_shortcut.deleteLater()
+        self._redo_shortcut.deleteLater()
+        self._journal.close()
+        PersistenceQueue.get_default().remove_failure_callback(self._persistence_failure_callback)
+        # Stop watching.
+        self._watcher.clear()
+        self._watcher.deleteLater()
+        self._species_watcher.clear()
+        self._species_watcher.deleteLater()
+        self._species_cache.clear()
+        # Release tree model and workspace index.
+        self._gui.classificationTreeView.setModel(None)
+        self._model.deleteLater()
+        self._index.close()
             
\ No newline at end of file
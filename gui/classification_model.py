@@ -0,0 +1,235 @@
+"""
+* classification_model.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import bisect
+import os
+
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, QObject, Qt
+
+from gui.index import WorkspaceIndex
+
+### CLASSIFICATION MODEL macros ###
+
+CLASSIFICATION_MODEL_PATH_ROLE = Qt.UserRole
+
+### CLASSIFICATION MODEL classes ###
+
+"""
+* ClassificationItem
+* Data class containing a node of the classification tree.
+"""
+class ClassificationItem:
+
+    def __init__(self, path: str, depth: int, common_name: str = "", child_count: int = 0, parent: "ClassificationItem" = None) -> None:
+        self.path = path
+        self.depth = depth
+        self.common_name = common_name
+        self.child_count = child_count
+        self.parent = parent
+        self.children = []
+        self.row = 0
+        self.fetched = False
+
+    def pretty_name(self) -> str:
+        return str(os.path.basename(self.path).title()).replace("_", " ")
+
+"""
+* ClassificationModel
+* Lazy tree model of the classification, children are read from the index when a node is expanded.
+"""
+class ClassificationModel(QAbstractItemModel):
+
+    def __init__(self, index: WorkspaceIndex, data_directory_path: str, column_count: int, parent: QObject = None) -> None:
+        # Init parent.
+        super().__init__(parent)
+        # Init context.
+        self._index = index
+        self._column_count = column_count
+        self._header = [""] * column_count
+        self._root = ClassificationItem(data_directory_path, 0, child_count=1)
+        self._items = {}
+
+    def _item(self, index: QModelIndex) -> ClassificationItem:
+        return index.internalPointer() if index.isValid() else self._root
+
+    def _model_index(self, item: ClassificationItem, column: int = 0) -> QModelIndex:
+        if (item is self._root):
+            return QModelIndex()
+        return self.createIndex(item.row, column, item)
+
+    def _find_parent(self, path: str) -> ClassificationItem:
+        parent_path = os.path.dirname(path)
+        if (parent_path == self._root.path):
+            return self._root
+        return self._items.get(parent_path)
+
+    def _forget(self, item: ClassificationItem) -> None:
+        # Remove item and its loaded descendants from the path map.
+        self._items.pop(item.path, None)
+        for child in item.children:
+            self._forget(child)
+
+    @staticmethod
+    def _renumber(parent_item: ClassificationItem, first_row: int) -> None:
+        for row in range(first_row, len(parent_item.children)):
+            parent_item.children[row].row = row
+
+    def item(self, index: QModelIndex) -> ClassificationItem:
+        return index.internalPointer() if index.isValid() else None
+
+    def locate(self, path: str, column: int = 0) -> QModelIndex:
+        # Local variables.
+        item = self._items.get(path)
+        # Check path.
+        if ((item is None) and (not path.startswith(self._root.path + os.sep))):
+            return QModelIndex()
+        # Load ancestors down to the node (one fetch per level).
+        if (item is None):
+            parent_path = os.path.dirname(path)
+            if (parent_path == self._root.path):
+                parent_item = self._root
+            else:
+                parent_index = self.locate(parent_path)
+                if (not parent_index.isValid()):
+                    return QModelIndex()
+                parent_item = self._item(parent_index)
+            if (parent_item.fetched == False):
+                self.fetchMore(self._model_index(parent_item))
+            item = self._items.get(path)
+            if (item is None):
+                return QModelIndex()
+        return self._model_index(item, column)
+
+    def reset(self) -> None:
+        # Drop all loaded nodes, they will be fetched again on demand.
+        self.beginResetModel()
+        self._root.children = []
+        self._root.fetched = False
+        self._items = {}
+        self.endResetModel()
+
+    def set_header(self, labels: list) -> None:
+        self._header = list(labels)
+        self.headerDataChanged.emit(Qt.Horizontal, 0, (self._column_count - 1))
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        # Check bounds.
+        parent_item = self._item(parent)
+        if ((row < 0) or (row >= len(parent_item.children)) or (column < 0) or (column >= self._column_count)):
+            return QModelIndex()
+        return self.createIndex(row, column, parent_item.children[row])
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:
+        # Check index.
+        if (not index.isValid()):
+            return QModelIndex()
+        parent_item = index.internalPointer().parent
+        if ((parent_item is None) or (parent_item is self._root)):
+            return QModelIndex()
+        return self.createIndex(parent_item.row, 0, parent_item)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        # Only the first column has children.
+        if (parent.isValid() and (parent.column() != 0)):
+            return 0
+        return len(self._item(parent).children)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return self._column_count
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        # Use index count until children are fetched.
+        item = self._item(parent)
+        if (item.fetched == True):
+            return (len(item.children) > 0)
+        return ((item.child_count > 0) and (item.depth < self._column_count))
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        item = self._item(parent)
+        return ((item.fetched == False) and (item.depth < self._column_count))
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        # Local variables.
+        item = self._item(parent)
+        # Read children from index.
+        nodes = self._index.get_children(item.path)
+        item.fetched = True
+        if (len(nodes) == 0):
+            return
+        self.beginInsertRows(parent, 0, (len(nodes) - 1))
+        for row, node in enumerate(nodes):
+            child = ClassificationItem(node.path, node.depth, node.common_name, node.child_count, item)
+            child.row = row
+            item.children.append(child)
+            self._items[child.path] = child
+        self.endInsertRows()
+
+    def insert_nodes(self, nodes: list) -> None:
+        # Patch loaded part of the tree with new or modified index nodes.
+        for node in nodes:
+            parent_item = self._find_parent(node.path)
+            if (parent_item is None):
+                continue
+            item = self._items.get(node.path)
+            if (item is not None):
+                # Update existing node.
+                item.common_name = node.common_name
+                item.child_count = node.child_count
+                self.dataChanged.emit(self._model_index(item, 0), self._model_index(item, (self._column_count - 1)))
+            elif (parent_item.fetched == True):
+                # Insert new node at its sorted position.
+                row = bisect.bisect_left([child.path for child in parent_item.children], node.path)
+                self.beginInsertRows(self._model_index(parent_item), row, row)
+                item = ClassificationItem(node.path, node.depth, node.common_name, node.child_count, parent_item)
+                parent_item.children.insert(row, item)
+                self._renumber(parent_item, row)
+                self._items[item.path] = item
+                self.endInsertRows()
+            elif (parent_item is not self._root):
+                # Children will be read on expansion, only show the expansion arrow.
+                parent_item.child_count = max(parent_item.child_count, 1)
+                self.dataChanged.emit(self._model_index(parent_item, 0), self._model_index(parent_item, 0))
+
+    def remove_paths(self, paths: list) -> None:
+        # Remove loaded nodes from the tree.
+        for path in paths:
+            item = self._items.get(path)
+            if (item is None):
+                continue
+            parent_item = item.parent
+            self.beginRemoveRows(self._model_index(parent_item), item.row, item.row)
+            del parent_item.children[item.row]
+            self._renumber(parent_item, item.row)
+            self._forget(item)
+            parent_item.child_count = len(parent_item.children)
+            self.endRemoveRows()
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        # Check index.
+        if (not index.isValid()):
+            return None
+        item = index.internalPointer()
+        # Text is displayed in the column of its rank.
+        if (role == CLASSIFICATION_MODEL_PATH_ROLE):
+            return item.path
+        if (index.column() != (item.depth - 1)):
+            return None
+        if (role == Qt.DisplayRole):
+            return item.pretty_name()
+        if ((role == Qt.ToolTipRole) and (item.common_name != "")):
+            return item.common_name
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        if ((orientation == Qt.Horizontal) and (role == Qt.DisplayRole) and (section < self._column_count)):
+            return self._header[section]
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if (not index.isValid()):
+            return Qt.NoItemFlags
+        return (Qt.ItemIsEnabled | Qt.ItemIsSelectable)
@@ -0,0 +1,330 @@
+"""
+* exif.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import logging
+import os
+import sqlite3
+import struct
+import threading
+
+from dataclasses import dataclass
+from datetime import datetime
+from PySide6.QtGui import QImageIOHandler
+
+from gui.cache import LruCache
+
+### EXIF macros ###
+
+EXIF_INDEX_FILE = os.path.join("botany-guide-gui", "exif.sqlite")
+EXIF_INDEX_SCHEMA_VERSION = 1
+EXIF_INDEX_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS photos (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, orientation INTEGER, capture_time TEXT, latitude REAL, longitude REAL, altitude REAL)",
+]
+EXIF_INDEX_MEMORY_ENTRIES = 4096
+# Default index is created on first use, which may happen in any thread.
+EXIF_INDEX_DEFAULT_LOCK = threading.Lock()
+
+EXIF_JPEG_SOI = b"\xff\xd8"
+EXIF_JPEG_MARKER_APP1 = 0xE1
+EXIF_JPEG_MARKER_SOS = 0xDA
+EXIF_JPEG_MARKER_EOI = 0xD9
+EXIF_JPEG_MARKERS_WITHOUT_LENGTH = [0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8]
+EXIF_HEADER = b"Exif\x00\x00"
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+EXIF_TAG_ORIENTATION = 0x0112
+EXIF_TAG_DATE_TIME = 0x0132
+EXIF_TAG_EXIF_IFD = 0x8769
+EXIF_TAG_GPS_IFD = 0x8825
+EXIF_TAG_DATE_TIME_ORIGINAL = 0x9003
+EXIF_TAG_GPS_LATITUDE_REF = 0x0001
+EXIF_TAG_GPS_LATITUDE = 0x0002
+EXIF_TAG_GPS_LONGITUDE_REF = 0x0003
+EXIF_TAG_GPS_LONGITUDE = 0x0004
+EXIF_TAG_GPS_ALTITUDE_REF = 0x0005
+EXIF_TAG_GPS_ALTITUDE = 0x0006
+EXIF_TAG_THUMBNAIL_OFFSET = 0x0201
+EXIF_TAG_THUMBNAIL_LENGTH = 0x0202
+
+# Size of each TIFF field type.
+EXIF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8, 13: 4}
+# Field types accepted for each kind of value (other types are ignored).
+EXIF_TYPES_ASCII = [2]
+EXIF_TYPES_INTEGER = [1, 3, 4, 9, 13]
+EXIF_TYPES_RATIONAL = [5, 10]
+
+# Qt transformation of each EXIF orientation.
+EXIF_ORIENTATION_TRANSFORMATIONS = {
+    1: QImageIOHandler.TransformationNone,
+    2: QImageIOHandler.TransformationMirror,
+    3: QImageIOHandler.TransformationRotate180,
+    4: QImageIOHandler.TransformationFlip,
+    5: QImageIOHandler.TransformationMirrorAndRotate90,
+    6: QImageIOHandler.TransformationRotate90,
+    7: QImageIOHandler.TransformationFlipAndRotate90,
+    8: QImageIOHandler.TransformationRotate270,
+}
+
+### EXIF functions ###
+
+def _read_app1(image_path: str) -> bytes:
+    # Walk JPEG segments until the EXIF one, pixels are never read.
+    with open(image_path, "rb") as image_file:
+        if (image_file.read(2) != EXIF_JPEG_SOI):
+            return None
+        while True:
+            marker = image_file.read(2)
+            if ((len(marker) < 2) or (marker[0] != 0xFF)):
+                return None
+            # Skip fill bytes.
+            while (marker[1] == 0xFF):
+                marker = b"\xff" + image_file.read(1)
+            if (marker[1] in EXIF_JPEG_MARKERS_WITHOUT_LENGTH):
+                continue
+            if (marker[1] in [EXIF_JPEG_MARKER_SOS, EXIF_JPEG_MARKER_EOI]):
+                return None
+            length = struct.unpack(">H", image_file.read(2))[0]
+            if (marker[1] == EXIF_JPEG_MARKER_APP1):
+                segment = image_file.read(length - 2)
+                if segment.startswith(EXIF_HEADER):
+                    return segment[len(EXIF_HEADER):]
+            else:
+                image_file.seek((length - 2), os.SEEK_CUR)
+
+def _read_ifd(tiff: bytes, byte_order: str, offset: int) -> dict:
+    # Local variables.
+    entries = {}
+    # Raw values of all entries of an image file directory.
+    count = struct.unpack_from(byte_order + "H", tiff, offset)[0]
+    for index in range(count):
+        tag, field_type, value_count = struct.unpack_from(byte_order + "HHI", tiff, (offset + 2 + (index * 12)))
+        size = (EXIF_TYPE_SIZES.get(field_type, 1) * value_count)
+        value_offset = (offset + 2 + (index * 12) + 8)
+        if (size > 4):
+            value_offset = struct.unpack_from(byte_order + "I", tiff, value_offset)[0]
+        entries[tag] = (field_type, value_count, value_offset)
+    return entries
+
+def _next_ifd_offset(tiff: bytes, byte_order: str, offset: int) -> int:
+    # Directory chain (IFD1 holds the embedded thumbnail).
+    count = struct.unpack_from(byte_order + "H", tiff, offset)[0]
+    return struct.unpack_from(byte_order + "I", tiff, (offset + 2 + (count * 12)))[0]
+
+def _read_value(tiff: bytes, byte_order: str, entry: tuple, field_types: list) -> object:
+    # Local variables.
+    field_type, value_count, value_offset = entry
+    # Tags written with an unexpected type are ignored (None).
+    if (field_type not in field_types):
+        return None
+    # Decode value according to its type.
+    if (field_type == 2):
+        return tiff[value_offset:(value_offset + value_count)].split(b"\x00")[0].decode("ascii", "replace")
+    if (field_type in [5, 10]):
+        values = struct.unpack_from(byte_order + (("I" if (field_type == 5) else "i") * (2 * value_count)), tiff, value_offset)
+        return [(values[i] / values[i + 1]) if (values[i + 1] != 0) else 0.0 for i in range(0, len(values), 2)]
+    formats = {1: "B", 3: "H", 4: "I", 9: "i", 13: "I"}
+    return list(struct.unpack_from(byte_order + (formats[field_type] * value_count), tiff, value_offset))
+
+def _read_first(tiff: bytes, byte_order: str, entries: dict, tag: int, field_types: list) -> object:
+    # First value of a numeric tag (None if missing, empty or of an unexpected type).
+    values = _read_value(tiff, byte_order, entries[tag], field_types) if (tag in entries) else None
+    return values[0] if ((values is not None) and (len(values) > 0)) else None
+
+def _read_coordinate(tiff: bytes, byte_order: str, gps: dict, tag: int, reference_tag: int, negative_reference: str) -> float:
+    # Degrees, minutes and seconds.
+    values = _read_value(tiff, byte_order, gps[tag], EXIF_TYPES_RATIONAL) if (tag in gps) else None
+    if ((values is None) or (len(values) == 0)):
+        return None
+    coordinate = sum(value / (60 ** i) for i, value in enumerate(values[:3]))
+    reference = _read_value(tiff, byte_order, gps[reference_tag], EXIF_TYPES_ASCII) if (reference_tag in gps) else None
+    if ((reference is not None) and (reference.strip().upper() == negative_reference)):
+        coordinate = -coordinate
+    return coordinate
+
+def read_exif(image_path: str) -> "ExifData":
+    # Read JPEG header only.
+    try:
+        tiff = _read_app1(image_path)
+    except (OSError, struct.error) as e:
+        logging.warning("EXIF reading failed : %s", e)
+        return ExifData()
+    if (tiff is None):
+        return ExifData()
+    try:
+        # TIFF header gives the byte order and the first directory.
+        byte_order = "<" if (tiff[:2] == b"II") else ">"
+        ifd0 = _read_ifd(tiff, byte_order, struct.unpack_from(byte_order + "I", tiff, 4)[0])
+        orientation = _read_first(tiff, byte_order, ifd0, EXIF_TAG_ORIENTATION, EXIF_TYPES_INTEGER)
+        # Capture time (DateTime tag of the first directory if the original one is missing).
+        capture_time = None
+        date_entry = ifd0.get(EXIF_TAG_DATE_TIME)
+        exif_ifd_offset = _read_first(tiff, byte_order, ifd0, EXIF_TAG_EXIF_IFD, EXIF_TYPES_INTEGER)
+        if (exif_ifd_offset is not None):
+            exif_ifd = _read_ifd(tiff, byte_order, exif_ifd_offset)
+            date_entry = exif_ifd.get(EXIF_TAG_DATE_TIME_ORIGINAL, date_entry)
+        date = None if (date_entry is None) else _read_value(tiff, byte_order, date_entry, EXIF_TYPES_ASCII)
+        if (date is not None):
+            try:
+                capture_time = datetime.strptime(date.strip(), EXIF_DATE_FORMAT)
+            except ValueError:
+                pass
+        # GPS position.
+        latitude, longitude, altitude = None, None, None
+        gps_ifd_offset = _read_first(tiff, byte_order, ifd0, EXIF_TAG_GPS_IFD, EXIF_TYPES_INTEGER)
+        if (gps_ifd_offset is not None):
+            gps = _read_ifd(tiff, byte_order, gps_ifd_offset)
+            latitude = _read_coordinate(tiff, byte_order, gps, EXIF_TAG_GPS_LATITUDE, EXIF_TAG_GPS_LATITUDE_REF, "S")
+            longitude = _read_coordinate(tiff, byte_order, gps, EXIF_TAG_GPS_LONGITUDE, EXIF_TAG_GPS_LONGITUDE_REF, "W")
+            altitude = _read_first(tiff, byte_order, gps, EXIF_TAG_GPS_ALTITUDE, EXIF_TYPES_RATIONAL)
+            if ((altitude is not None) and (_read_first(tiff, byte_order, gps, EXIF_TAG_GPS_ALTITUDE_REF, EXIF_TYPES_INTEGER) == 1)):
+                altitude = -altitude
+    except (struct.error, IndexError, KeyError, AttributeError, TypeError, ValueError, OverflowError) as e:
+        logging.warning("Invalid EXIF data in %s : %s", image_path, e)
+        return ExifData()
+    return ExifData(orientation if (orientation in EXIF_ORIENTATION_TRANSFORMATIONS) else 1, capture_time, latitude, longitude, altitude)
+
+def read_exif_thumbnail(image_path: str) -> bytes:
+    # Embedded JPEG thumbnail written by the camera (None if missing).
+    try:
+        tiff = _read_app1(image_path)
+        if (tiff is None):
+            return None
+        byte_order = "<" if (tiff[:2] == b"II") else ">"
+        ifd1_offset = _next_ifd_offset(tiff, byte_order, struct.unpack_from(byte_order + "I", tiff, 4)[0])
+        if (ifd1_offset == 0):
+            return None
+        ifd1 = _read_ifd(tiff, byte_order, ifd1_offset)
+        if ((EXIF_TAG_THUMBNAIL_OFFSET not in ifd1) or (EXIF_TAG_THUMBNAIL_LENGTH not in ifd1)):
+            return None
+        offset = _read_first(tiff, byte_order, ifd1, EXIF_TAG_THUMBNAIL_OFFSET, EXIF_TYPES_INTEGER)
+        length = _read_first(tiff, byte_order, ifd1, EXIF_TAG_THUMBNAIL_LENGTH, EXIF_TYPES_INTEGER)
+        if ((offset is None) or (length is None)):
+            return None
+        thumbnail = tiff[offset:(offset + length)]
+    except (OSError, struct.error, IndexError, TypeError, ValueError) as e:
+        logging.warning("EXIF thumbnail reading failed : %s", e)
+        return None
+    return thumbnail if ((len(thumbnail) == length) and (length > 0)) else None
+
+### EXIF classes ###
+
+"""
+* ExifData
+* Data class containing the metadata of a photo.
+"""
+@dataclass(frozen=True)
+class ExifData:
+
+    orientation: int = 1
+    capture_time: datetime = None
+    latitude: float = None
+    longitude: float = None
+    altitude: float = None
+
+    def transformation(self) -> QImageIOHandler.Transformation:
+        return EXIF_ORIENTATION_TRANSFORMATIONS.get(self.orientation, QImageIOHandler.TransformationNone)
+
+    def has_position(self) -> bool:
+        return ((self.latitude is not None) and (self.longitude is not None))
+
+"""
+* ExifIndex
+* Persistent table of the photos metadata, keyed by photo path, size and modification time.
+"""
+class ExifIndex:
+
+    _default = None
+
+    def __init__(self, index_path: str = None) -> None:
+        # Init context.
+        self._lock = threading.Lock()
+        self._memory = LruCache(EXIF_INDEX_MEMORY_ENTRIES)
+        index_path = ExifIndex.default_index_path() if (index_path is None) else index_path
+        # Open database.
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            self._connection = sqlite3.connect(index_path, check_same_thread=False)
+            self._create_schema()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning("EXIF index not writable, using memory index : %s", e)
+            self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+            self._create_schema()
+
+    @staticmethod
+    def default_index_path() -> str:
+        # XDG base directory specification.
+        cache_home = os.environ.get("XDG_CACHE_HOME", "")
+        if (cache_home == ""):
+            cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(cache_home, EXIF_INDEX_FILE)
+
+    @staticmethod
+    def get_default() -> "ExifIndex":
+        with EXIF_INDEX_DEFAULT_LOCK:
+            if (ExifIndex._default is None):
+                ExifIndex._default = ExifIndex()
+        return ExifIndex._default
+
+    def _create_schema(self) -> None:
+        # Drop table in case of schema change.
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if (version != EXIF_INDEX_SCHEMA_VERSION):
+            self._connection.execute("DROP TABLE IF EXISTS photos")
+            self._connection.execute(f"PRAGMA user_version = {EXIF_INDEX_SCHEMA_VERSION}")
+        for statement in EXIF_INDEX_SCHEMA:
+            self._connection.execute(statement)
+        self._connection.commit()
+
+    def get(self, image_path: str) -> ExifData:
+        return self.get_many([image_path])[image_path]
+
+    def get_many(self, image_paths: list) -> dict:
+        # Local variables.
+        metadata = {}
+        missing = {}
+        rows = []
+        # Memory first, then database.
+        for image_path in image_paths:
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                metadata[image_path] = ExifData()
+                continue
+            key = (image_path, stat.st_size, stat.st_mtime_ns)
+            data = self._memory.get(key)
+            if (data is None):
+                missing[image_path] = key
+            else:
+                metadata[image_path] = data
+        if (len(missing) == 0):
+            return metadata
+        with self._lock:
+            for image_path, key in missing.items():
+                row = self._connection.execute("SELECT size, mtime_ns, orientation, capture_time, latitude, longitude, altitude FROM photos WHERE path = ?", (image_path,)).fetchone()
+                if ((row is not None) and (row[0] == key[1]) and (row[1] == key[2])):
+                    data = ExifData(row[2], None if (row[3] is None) else datetime.fromisoformat(row[3]), row[4], row[5], row[6])
+                else:
+                    # Photo is new or has been modified.
+                    data = read_exif(image_path)
+                    rows.append((image_path, key[1], key[2], data.orientation, None if (data.capture_time is None) else data.capture_time.isoformat(), data.latitude, data.longitude, data.altitude))
+                self._memory.put(key, data)
+                metadata[image_path] = data
+            # Store all new entries at once.
+            if (len(rows) > 0):
+                try:
+                    self._connection.executemany("INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    self._connection.commit()
+                except sqlite3.Error as e:
+                    logging.warning("EXIF index write failed : %s", e)
+        return metadata
+
+    def clear(self) -> None:
+        # Remove all entries.
+        with self._lock:
+            self._memory.clear()
+            self._connection.execute("DELETE FROM photos")
+            self._connection.commit()
@@ -0,0 +1,376 @@
+"""
+* export.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import logging
+import os
+import shutil
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+from PySide6.QtCore import QRectF, QSize, QSizeF, QUrl
+from PySide6.QtGui import QGuiApplication, QPageSize, QPainter, QPdfWriter, QTextDocument
+
+from gui.classification import CLASSIFICATION_DEPTH_MAX, CLASSIFICATION_RANK_NAMES, CLASSIFICATION_SPECIES_COLUMN
+from gui.exif import ExifIndex
+from gui.identification import Identification, IdentificationView, IDENTIFICATION_CODEC, IDENTIFICATION_DATA_FILE_EXTENSION
+from gui.image import Image
+from gui.persistence import write_atomic, PERSISTENCE_TEMPORARY_FILE_SUFFIX
+from gui.scanner import HerbariumScanner
+from gui.species import Species, SpeciesView, SPECIES_CODEC, SPECIES_DATA_FILE_EXTENSION
+
+### EXPORT macros ###
+
+EXPORT_WORKERS = max(1, (os.cpu_count() or 1))
+# Resize tasks queued per worker, the walk waits beyond this limit.
+EXPORT_PENDING_TASKS_PER_WORKER = 4
+EXPORT_PHOTO_SIZE = 1024
+EXPORT_PHOTO_QUALITY = 85
+EXPORT_IDENTIFICATION_PHOTO_WIDTH = 480
+EXPORT_PHOTO_DIRECTORY = "photos"
+EXPORT_SPECIES_PHOTO_NAME = "espece"
+EXPORT_PAGE_FILE = "index.html"
+EXPORT_STYLE_FILE = "style.css"
+EXPORT_MANIFEST_FILE = ".export.json"
+EXPORT_PDF_FILE = "herbier.pdf"
+EXPORT_PDF_RESOLUTION = 150
+EXPORT_PROGRESS_PERIOD_S = 2.0
+EXPORT_TITLE = "Herbier"
+
+EXPORT_SPECIES_DEPTH = (CLASSIFICATION_SPECIES_COLUMN + 1)
+
+EXPORT_DESCRIPTION_FIELDS = [
+    ("Critères", "criteria"),
+    ("Comestibilité", "edibility"),
+    ("Confusions", "confusion"),
+]
+EXPORT_REFERENCE_FIELDS = [
+    ("Guide Delachaux des Fleurs", "references_guide_delachaux_fleurs"),
+    ("Guide 700 Plantes", "references_reconnaitre_700_plantes"),
+    ("Guide Flore des Pyrénées", "references_decouvrir_flore_pyrenees"),
+    ("Guide Delachaux des Arbres", "references_guide_delachaux_arbres"),
+    ("Guide des Champignons", "references_guide_champignons"),
+]
+
+EXPORT_STYLE = """body { font-family: sans-serif; max-width: 1100px; margin: auto; padding: 1em; color: #222; }
+h1 { color: #26a269; margin-bottom: 0; }
+h2 { color: #555; font-weight: normal; margin-top: 0.2em; }
+h3 { color: #3584e4; border-bottom: 1px solid #ccc; }
+h4 { color: #9141ac; margin-bottom: 0.3em; }
+th { text-align: left; vertical-align: top; padding-right: 1em; }
+img { max-width: 100%; height: auto; margin: 2px; }
+.path { color: #777; font-size: small; }
+.rank1 { font-size: x-large; margin-top: 1em; }
+"""
+
+### EXPORT functions ###
+
+def _escape(value: object) -> str:
+    return html.escape("" if (value is None) else str(value))
+
+def _resize_photo(source_path: str, destination_path: str) -> tuple:
+    # Decode through the preview cache and write the exported photo atomically.
+    try:
+        image = Image.read(source_path, QSize(EXPORT_PHOTO_SIZE, EXPORT_PHOTO_SIZE))
+        if image.isNull():
+            return (destination_path, "decoding failed")
+        # Temporary file is written outside of the photo directory, which is cleaned while photos are being written.
+        temporary_path = os.path.join(os.path.dirname(os.path.dirname(destination_path)), "." + os.path.basename(destination_path) + PERSISTENCE_TEMPORARY_FILE_SUFFIX)
+        if (image.save(temporary_path, "JPG", EXPORT_PHOTO_QUALITY) == False):
+            return (destination_path, "writing failed")
+        os.replace(temporary_path, destination_path)
+    except Exception as e:
+        return (destination_path, str(e))
+    return (destination_path, None)
+
+def _find_json(directory_path: str, extension: str, codec, record) -> bool:
+    # First valid JSON file of the directory, as the views do.
+    for f in sorted(os.listdir(directory_path)):
+        if (Path(f).suffix.lower() == extension):
+            try:
+                codec.load(os.path.join(directory_path, f), record)
+                return True
+            except ValueError as e:
+                logging.error("Invalid JSON file : %s", e)
+    return False
+
+def read_species(species_directory_path: str) -> tuple:
+    # Local variables.
+    species = Species()
+    image_path = None
+    identifications = []
+    # Species file and photo.
+    if (_find_json(species_directory_path, SPECIES_DATA_FILE_EXTENSION, SPECIES_CODEC, species) == False):
+        raise ValueError(f"Invalid species directory: {species_directory_path}")
+    for f in sorted(os.listdir(species_directory_path)):
+        p = os.path.join(species_directory_path, f)
+        if ((image_path is None) and (Path(f).suffix.lower() == Image.IMAGE_FILE_EXTENSION)):
+            image_path = p
+        if (os.path.isdir(p) and (not f.startswith("."))):
+            # Identification with its photos sorted by capture time.
+            identification = Identification()
+            if (_find_json(p, IDENTIFICATION_DATA_FILE_EXTENSION, IDENTIFICATION_CODEC, identification) == False):
+                continue
+            image_paths = [os.path.join(p, g) for g in sorted(os.listdir(p)) if (Path(g).suffix.lower() == Image.IMAGE_FILE_EXTENSION)]
+            metadata = ExifIndex.get_default().get_many(image_paths)
+            image_paths.sort(key=lambda q: ((metadata[q].capture_time is None), (metadata[q].capture_time or datetime.min)))
+            identifications.append((f, identification, image_paths))
+    return (species, image_path, identifications)
+
+def compute_signature(species_directory_path: str) -> str:
+    # Local variables.
+    digest = hashlib.blake2b(digest_size=16)
+    # Name, size and modification time of the species and identification files.
+    for root, directories, files in os.walk(species_directory_path):
+        directories[:] = sorted(d for d in directories if (not d.startswith(".")))
+        for f in sorted(files):
+            try:
+                stat = os.stat(os.path.join(root, f))
+            except OSError:
+                continue
+            digest.update(f"{os.path.relpath(os.path.join(root, f), species_directory_path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def _print_document(writer: QPdfWriter, painter: QPainter, document: QTextDocument, new_page: bool) -> None:
+    # Local variables.
+    page_rect = writer.pageLayout().paintRectPixels(writer.resolution())
+    width = page_rect.width()
+    height = page_rect.height()
+    # Document is laid out with the PDF resolution and cut in pages.
+    document.documentLayout().setPaintDevice(writer)
+    document.setPageSize(QSizeF(width, height))
+    for page in range(document.pageCount()):
+        if ((new_page == True) or (page > 0)):
+            writer.newPage()
+        painter.save()
+        painter.translate(0, -(page * height))
+        document.drawContents(painter, QRectF(0, (page * height), width, height))
+        painter.restore()
+
+### EXPORT classes ###
+
+"""
+* HerbariumExporter
+* Static site export of a workspace, species are read, rendered and released one at a time.
+"""
+class HerbariumExporter:
+
+    def __init__(self, workspace_path: str, output_path: str, workers: int = EXPORT_WORKERS, incremental: bool = False) -> None:
+        # Init context.
+        self.workspace_path = os.path.abspath(workspace_path)
+        self.output_path = os.path.abspath(output_path)
+        self.workers = workers
+        self.incremental = incremental
+        self.species_count = 0
+        self.rendered_count = 0
+        self.photo_count = 0
+        self.failed_count = 0
+        self._manifest_path = os.path.join(self.output_path, EXPORT_MANIFEST_FILE)
+        self._manifest = {}
+        self._pending = {}
+        # Previous export (species signatures and names).
+        if ((self.incremental == True) and os.path.isfile(self._manifest_path)):
+            try:
+                with open(self._manifest_path, 'r', encoding='utf-8') as manifest_file:
+                    self._manifest = json.load(manifest_file)
+            except (OSError, ValueError) as e:
+                logging.warning("Export manifest ignored : %s", e)
+
+    def _page_header(self, title: str, prefix: str) -> str:
+        return f"<!DOCTYPE html>\n<html lang=\"fr\">\n<head>\n<meta charset=\"utf-8\">\n<title>{_escape(title)}</title>\n<link rel=\"stylesheet\" href=\"{prefix}{EXPORT_STYLE_FILE}\">\n</head>\n<body>\n"
+
+    @staticmethod
+    def _pretty_name(directory_name: str) -> str:
+        # Same rule as the classification tree.
+        return directory_name.title().replace("_", " ")
+
+    def _submit(self, executor: ProcessPoolExecutor, relative_path: str, source_path: str, destination_path: str) -> None:
+        # Photos already exported from the same version are kept.
+        try:
+            if (os.path.getmtime(destination_path) >= os.path.getmtime(source_path)):
+                return
+        except OSError:
+            pass
+        # Bound the queued tasks so that the walk does not get ahead of the workers.
+        while (len(self._pending) >= (self.workers * EXPORT_PENDING_TASKS_PER_WORKER)):
+            self._collect(FIRST_COMPLETED)
+        self._pending[executor.submit(_resize_photo, source_path, destination_path)] = relative_path
+
+    def _collect(self, return_when: str) -> None:
+        # Check finished resize tasks.
+        done, _ = wait(list(self._pending), return_when=return_when)
+        for future in done:
+            relative_path = self._pending.pop(future)
+            destination_path, error = future.result()
+            if (error is None):
+                self.photo_count += 1
+                continue
+            # Species is rendered again by the next incremental export.
+            self.failed_count += 1
+            logging.error("Photo export failed for %s : %s", destination_path, error)
+            if (relative_path in self._manifest):
+                self._manifest[relative_path]["signature"] = None
+
+    def _render_species(self, executor: ProcessPoolExecutor, species_directory_path: str, relative_path: str) -> Species:
+        # Local variables.
+        species, image_path, identifications = read_species(species_directory_path)
+        page_directory_path = os.path.join(self.output_path, relative_path)
+        photo_directory_path = os.path.join(page_directory_path, EXPORT_PHOTO_DIRECTORY)
+        prefix = "../" * len(Path(relative_path).parts)
+        photo_names = set()
+        os.makedirs(photo_directory_path, exist_ok=True)
+        # Title and classification.
+        parts = Path(relative_path).parts
+        lines = [self._page_header(species.latin_name, prefix)]
+        lines.append(f"<p class=\"path\"><a href=\"{prefix}{EXPORT_PAGE_FILE}\">{EXPORT_TITLE}</a> / " + " / ".join(_escape(HerbariumExporter._pretty_name(part)) for part in parts[:-1]) + "</p>\n")
+        lines.append(f"<h1><i>{_escape(species.latin_name)}</i></h1>\n<h2>{_escape(species.common_name)}</h2>\n")
+        if (image_path is not None):
+            photo_name = EXPORT_SPECIES_PHOTO_NAME + Image.IMAGE_FILE_EXTENSION
+            photo_names.add(photo_name)
+            self._submit(executor, relative_path, image_path, os.path.join(photo_directory_path, photo_name))
+            lines.append(f"<p><img src=\"{EXPORT_PHOTO_DIRECTORY}/{photo_name}\" alt=\"{_escape(species.latin_name)}\"></p>\n")
+        # Description and references (same formatting as the species panel).
+        rows = [(label, getattr(species, attribute)) for label, attribute in EXPORT_DESCRIPTION_FIELDS if (getattr(species, attribute) != "")]
+        if (len(rows) > 0):
+            lines.append("<table>\n" + "".join(f"<tr><th>{_escape(label)}</th><td>{_escape(value)}</td></tr>\n" for label, value in rows) + "</table>\n")
+        rows = [(label, SpeciesView._display_page(getattr(species, attribute))) for label, attribute in EXPORT_REFERENCE_FIELDS]
+        rows = [(label, value) for label, value in rows if (value != "")]
+        if (len(rows) > 0):
+            lines.append("<h3>Références</h3>\n<table>\n" + "".join(f"<tr><th>{_escape(label)}</th><td>{_escape(value)}</td></tr>\n" for label, value in rows) + "</table>\n")
+        # Identifications with their photos.
+        lines.append(f"<h3>Identifications ({len(identifications)})</h3>\n")
+        for directory_name, identification, image_paths in identifications:
+            lines.append(f"<h4>{_escape(IdentificationView._display_date(identification))}</h4>\n<table>\n")
+            for label, value in [("Commune", identification.location_city), ("Département", identification.location_department), ("Pays", identification.location_country), ("Coordonnées GPS", IdentificationView._display_gps(identification)), ("Description terrain", identification.description)]:
+                if (value != ""):
+                    lines.append(f"<tr><th>{_escape(label)}</th><td>{_escape(value)}</td></tr>\n")
+            lines.append("</table>\n<p>\n")
+            for source_path in image_paths:
+                photo_name = directory_name + "_" + os.path.basename(source_path)
+                photo_names.add(photo_name)
+                self._submit(executor, relative_path, source_path, os.path.join(photo_directory_path, photo_name))
+                lines.append(f"<a href=\"{EXPORT_PHOTO_DIRECTORY}/{_escape(photo_name)}\"><img src=\"{EXPORT_PHOTO_DIRECTORY}/{_escape(photo_name)}\" width=\"{EXPORT_IDENTIFICATION_PHOTO_WIDTH}\" alt=\"\"></a>\n")
+            lines.append("</p>\n")
+        lines.append("</body>\n</html>\n")
+        write_atomic(os.path.join(page_directory_path, EXPORT_PAGE_FILE), "".join(lines))
+        # Remove photos which are not in the species anymore.
+        for f in os.listdir(photo_directory_path):
+            if (f not in photo_names):
+                os.remove(os.path.join(photo_directory_path, f))
+        return species
+
+    def run(self, progress_callback=None) -> None:
+        # Local variables.
+        manifest = {}
+        start = time.perf_counter()
+        last_report = start
+        os.makedirs(self.output_path, exist_ok=True)
+        write_atomic(os.path.join(self.output_path, EXPORT_STYLE_FILE), EXPORT_STYLE)
+        index_path = os.path.join(self.output_path, EXPORT_PAGE_FILE)
+        # Index is written while the workspace is walked.
+        with open(index_path + ".tmp", 'w', encoding='utf-8') as index_file, ProcessPoolExecutor(max_workers=self.workers) as executor:
+            index_file.write(self._page_header(EXPORT_TITLE, "") + f"<h1>{EXPORT_TITLE}</h1>\n")
+            for node in HerbariumScanner(self.workspace_path, CLASSIFICATION_DEPTH_MAX).iter_nodes():
+                relative_path = os.path.relpath(node.path, self.workspace_path)
+                name = HerbariumExporter._pretty_name(os.path.basename(node.path))
+                # Taxonomy levels are headings of the index.
+                if (node.depth < EXPORT_SPECIES_DEPTH):
+                    index_file.write(f"<p class=\"rank{node.depth}\">{_escape(CLASSIFICATION_RANK_NAMES[node.depth - 1])} : <b>{_escape(name)}</b></p>\n")
+                    continue
+                self.species_count += 1
+                # Unchanged species are not rendered again.
+                signature = compute_signature(node.path)
+                entry = self._manifest.get(relative_path)
+                if ((entry is None) or (entry.get("signature") != signature) or (not os.path.isfile(os.path.join(self.output_path, relative_path, EXPORT_PAGE_FILE)))):
+                    try:
+                        self._manifest[relative_path] = {"signature": signature}
+                        species = self._render_species(executor, node.path, relative_path)
+                    except (OSError, ValueError) as e:
+                        self._manifest.pop(relative_path, None)
+                        self.failed_count += 1
+                        logging.error("Species export failed : %s", e)
+                        continue
+                    self.rendered_count += 1
+                    entry = self._manifest[relative_path]
+                    entry["latin_name"] = species.latin_name
+                    entry["common_name"] = species.common_name
+                manifest[relative_path] = entry
+                index_file.write(f"<p>&nbsp;&nbsp;<a href=\"{_escape(Path(relative_path).as_posix())}/{EXPORT_PAGE_FILE}\"><i>{_escape(entry.get('latin_name'))}</i></a> {_escape(entry.get('common_name'))}</p>\n")
+                # Report progress periodically.
+                now = time.perf_counter()
+                if ((progress_callback is not None) and ((now - last_report) >= EXPORT_PROGRESS_PERIOD_S)):
+                    last_report = now
+                    progress_callback(f"{self.species_count} species, {self.rendered_count} rendered, {self.photo_count} photos")
+            # Wait for the last photos.
+            while (len(self._pending) > 0):
+                self._collect(FIRST_COMPLETED)
+            index_file.write("</body>\n</html>\n")
+        os.replace(index_path + ".tmp", index_path)
+        # Remove pages of the species which do not exist anymore.
+        for relative_path in self._manifest:
+            if ((relative_path not in manifest) and os.path.isdir(os.path.join(self.output_path, relative_path))):
+                shutil.rmtree(os.path.join(self.output_path, relative_path))
+        self._manifest = manifest
+        write_atomic(self._manifest_path, json.dumps(self._manifest, indent=1))
+
+    def export_pdf(self, pdf_path: str) -> int:
+        # Local variables.
+        writer = QPdfWriter(pdf_path)
+        writer.setResolution(EXPORT_PDF_RESOLUTION)
+        writer.setPageSize(QPageSize(QPageSize.A4))
+        writer.setTitle(EXPORT_TITLE)
+        painter = QPainter(writer)
+        page_count = 0
+        # One page (or more) per species, pages are read back from the site one at a time.
+        for relative_path in self._manifest:
+            page_path = os.path.join(self.output_path, relative_path, EXPORT_PAGE_FILE)
+            document = QTextDocument()
+            document.setDefaultStyleSheet(EXPORT_STYLE)
+            document.setBaseUrl(QUrl.fromLocalFile(os.path.join(self.output_path, relative_path) + os.sep))
+            with open(page_path, 'r', encoding='utf-8') as page_file:
+                document.setHtml(page_file.read())
+            _print_document(writer, painter, document, (page_count > 0))
+            page_count += 1
+        painter.end()
+        return page_count
+
+### EXPORT main function ###
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export the herbarium as a static site (one page per species) and optionally as a PDF file.")
+    parser.add_argument("directory", help="Workspace directory")
+    parser.add_argument("output", help="Output directory")
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS, help=f"Photo resizing processes (default: {EXPORT_WORKERS})")
+    parser.add_argument("--incremental", action="store_true", help="Only render the species modified since the previous export")
+    parser.add_argument("--pdf", action="store_true", help=f"Also write {EXPORT_PDF_FILE} in the output directory")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # Export site.
+    exporter = HerbariumExporter(args.directory, args.output, args.workers, args.incremental)
+    start = time.perf_counter()
+    try:
+        exporter.run(print)
+    except KeyboardInterrupt:
+        return 130
+    print(f"{exporter.species_count} species in {time.perf_counter() - start:.1f} s, {exporter.rendered_count} rendered, {exporter.photo_count} photos resized, {exporter.failed_count} failed")
+    # Text layout needs an application (use QT_QPA_PLATFORM=offscreen without display).
+    if (args.pdf == True):
+        application = QGuiApplication.instance() or QGuiApplication([])
+        start = time.perf_counter()
+        page_count = exporter.export_pdf(os.path.join(exporter.output_path, EXPORT_PDF_FILE))
+        print(f"{page_count} species written in {EXPORT_PDF_FILE} in {time.perf_counter() - start:.1f} s")
+        del application
+    return 0 if (exporter.failed_count == 0) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,19 +5,21 @@
 *      Author: Ludo & Copilot
 """
 
-import json
 import logging
 import os
 import re
 
-from datetime import date
+from datetime import date, datetime
 from pathlib import Path
-from typing import Any
-from PySide6.QtWidgets import QDialog, QDialogButtonBox, QTextEdit
+from PySide6.QtWidgets import QDialog, QDialogButtonBox, QFileDialog, QTextEdit
 from PySide6.QtCore import QDate
 
+from gui.exif import ExifIndex
 from gui.identification_edit_window_ui import Ui_IdentificationEditDialog
 from gui.image import Image
+from gui.journal import EditJournal
+from gui.persistence import PersistenceQueue
+from gui.json_codec import JsonCodec, JsonField, JsonObject, to_number
 from gui.single_slot_connector import SingleSlotConnector
 
 ### IDENTIFICATION macros ###
@@ -40,29 +42,26 @@ IDENTIFICATION_JSON_KEY_LOCATION_GPS_LONGITUDE = 'longitude'
 IDENTIFICATION_JSON_KEY_LOCATION_GPS_ALTITUDE = 'altitude'
 IDENTIFICATION_JSON_KEY_DESCRIPTION = 'description'
 
-IDENTIFICATION_JSON_KEY_REQUIRED = [
-    IDENTIFICATION_JSON_KEY_DATE,
-    IDENTIFICATION_JSON_KEY_LOCATION
-]
-
-IDENTIFICATION_JSON_KEY_DATE_REQUIRED = [
-    IDENTIFICATION_JSON_KEY_DATE_DAY,
-    IDENTIFICATION_JSON_KEY_DATE_MONTH,
-    IDENTIFICATION_JSON_KEY_DATE_YEAR
-]
-
-IDENTIFICATION_JSON_KEY_LOCATION_REQUIRED = [
-    IDENTIFICATION_JSON_KEY_LOCATION_CITY,
-    IDENTIFICATION_JSON_KEY_LOCATION_DEPARTMENT,
-    IDENTIFICATION_JSON_KEY_LOCATION_COUNTRY,
-    IDENTIFICATION_JSON_KEY_LOCATION_GPS
-]
-
-IDENTIFICATION_JSON_KEY_GPS_REQUIRED = [
-    IDENTIFICATION_JSON_KEY_LOCATION_GPS_LATITUDE,
-    IDENTIFICATION_JSON_KEY_LOCATION_GPS_LONGITUDE,
-    IDENTIFICATION_JSON_KEY_LOCATION_GPS_ALTITUDE
-]
+IDENTIFICATION_CODEC = JsonCodec(JsonObject(IDENTIFICATION_JSON_KEY_TOP_LEVEL, [
+    JsonObject(IDENTIFICATION_JSON_KEY_DATE, [
+        JsonField(IDENTIFICATION_JSON_KEY_DATE_DAY, "date_day", to_number, 0, required=True),
+        JsonField(IDENTIFICATION_JSON_KEY_DATE_MONTH, "date_month", to_number, 0, required=True),
+        JsonField(IDENTIFICATION_JSON_KEY_DATE_YEAR, "date_year", to_number, 0, required=True),
+    ]),
+    JsonObject(IDENTIFICATION_JSON_KEY_LOCATION, [
+        JsonField(IDENTIFICATION_JSON_KEY_LOCATION_CITY, "location_city", required=True),
+        JsonField(IDENTIFICATION_JSON_KEY_LOCATION_DEPARTMENT, "location_department", required=True),
+        JsonField(IDENTIFICATION_JSON_KEY_LOCATION_COUNTRY, "location_country", required=True),
+        JsonObject(IDENTIFICATION_JSON_KEY_LOCATION_GPS, [
+            JsonField(IDENTIFICATION_JSON_KEY_LOCATION_GPS_LATITUDE, "location_gps_latitude", to_number, 0, required=True),
+            JsonField(IDENTIFICATION_JSON_KEY_LOCATION_GPS_LONGITUDE, "location_gps_longitude", to_number, 0, required=True),
+            JsonField(IDENTIFICATION_JSON_KEY_LOCATION_GPS_ALTITUDE, "location_gps_altitude", to_number, 0, required=True),
+        ]),
+    ]),
+    JsonField(IDENTIFICATION_JSON_KEY_DESCRIPTION, "description"),
+]))
+
+IDENTIFICATION_PHOTO_PREFETCH_COUNT = 2
 
 IDENTIFICATION_MONTH = [ "Error", "Janvier", "Février", "Mars", "Avril", "Mai", "Juin", "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre" ]
 
@@ -99,7 +98,7 @@ class Identification:
 """
 class IdentificationEditWindow(QDialog, Ui_IdentificationEditDialog):
 
-    def __init__(self, identification: Identification, new_mode: bool) -> None:
+    def __init__(self, identification: Identification, new_mode: bool, image_paths: list = None) -> None:
         # Init parent.
         super().__init__()
         # Store species.
@@ -108,12 +107,17 @@ class IdentificationEditWindow(QDialog, Ui_IdentificationEditDialog):
         self.setupUi(self)
         # Init context.
         self._has_changed = False
+        self._image_paths = []
         # Check mode.
         if (new_mode == True):
             # Set date to today by default.
             self.setWindowTitle("Nouvelle identification")
             self.dateEdit.setDate(QDate.currentDate())
             self.buttonBox.button(QDialogButtonBox.Ok).setEnabled(False)
+            # Date and position can be read from the photos.
+            self.buttonBox.addButton("Depuis les photos...", QDialogButtonBox.ActionRole).clicked.connect(self._select_photos_callback)
+            if (image_paths is not None):
+                self._fill_from_photos(image_paths)
         else:
             # Print current fields.
             self.setWindowTitle("Edition identification")
@@ -144,6 +148,31 @@ class IdentificationEditWindow(QDialog, Ui_IdentificationEditDialog):
     def _display_altitude(text_edit: QTextEdit, altitude: int) -> None:
         text_edit.setPlainText(str(altitude) if (altitude >= 0) else "")
 
+    def _fill_from_photos(self, image_paths: list) -> None:
+        # Local variables.
+        metadata = ExifIndex.get_default().get_many(image_paths)
+        dated = sorted(data.capture_time for data in metadata.values() if (data.capture_time is not None))
+        located = [data for data in metadata.values() if data.has_position()]
+        # Photos are copied in the new identification directory.
+        self._image_paths = list(image_paths)
+        # Use date of the first photo and the first known position.
+        if (len(dated) > 0):
+            self.dateEdit.setDate(QDate(dated[0].year, dated[0].month, dated[0].day))
+        if (len(located) > 0):
+            self.latitudeTextEdit.setPlainText(f"{located[0].latitude:.6f}")
+            self.longitudeTextEdit.setPlainText(f"{located[0].longitude:.6f}")
+            if (located[0].altitude is not None):
+                IdentificationEditWindow._display_altitude(self.altitudeTextEdit, round(located[0].altitude))
+
+    def _select_photos_callback(self) -> None:
+        # Open photos selection window.
+        image_paths, _ = QFileDialog.getOpenFileNames(self, "Sélectionner les photos", os.getcwd(), "Photos (*" + Image.IMAGE_FILE_EXTENSION + ")")
+        if (len(image_paths) > 0):
+            self._fill_from_photos(image_paths)
+
+    def get_image_paths(self) -> list:
+        return list(self._image_paths)
+
     @staticmethod
     def _is_positive_decimal(s: str) -> bool:
         if not re.fullmatch(r'[0-9]+', s):
@@ -152,7 +181,7 @@ class IdentificationEditWindow(QDialog, Ui_IdentificationEditDialog):
 
     @staticmethod
     def _is_float(s: str) -> bool:
-        float_regex = re.compile(r'^[0-9]+[.,][0-9]+$')
+        float_regex = re.compile(r'^-?[0-9]+[.,][0-9]+$')
         return bool(float_regex.fullmatch(s))
 
     def _check_all_fields(self) -> None:
@@ -218,6 +247,7 @@ class IdentificationView:
         image_found = False
         # Init context.
         self._gui = gui
+        self._directory_path = identification_directory_path
         self._image_path_list = []
         self._current_image_index = 0
         self._single_slot_connector = SingleSlotConnector()
@@ -230,8 +260,9 @@ class IdentificationView:
             # Create object from input.
             self._identification = identification
             self._json_path = os.path.join(identification_directory_path, "identification.json")
-            # Create JSON file.
+            # Create JSON file (written now since the directory is listed below).
             self._write_json()
+            PersistenceQueue.get_default().flush(self._json_path)
         # Read directory.
         for f in sorted(os.listdir(identification_directory_path)):
             # Build complete path.
@@ -245,105 +276,57 @@ class IdentificationView:
                     self._json_path = p
                 except Exception as e:
                     logging.error("Invalid JSON file : %s", e)
-            # Check if there a photo.
-            if ((Path(f).suffix.lower() == Image.IMAGE_FILE_EXTENSION) and (Path(p).stat().st_size < Image.IMAGE_FILE_MAXIMUM_SIZE_BYTES)):
+            # Check if there a photo (large files are displayed through scaled previews).
+            if (Path(f).suffix.lower() == Image.IMAGE_FILE_EXTENSION):
                 self._image_path_list.append(p)
                 image_found = True
         # Warn if image has not been found.
         if (image_found == False):
             logging.warning("No identification image found")
+        # Sort photos by capture time (photos without date last, by name).
+        metadata = ExifIndex.get_default().get_many(self._image_path_list)
+        self._image_path_list.sort(key=lambda p: ((metadata[p].capture_time is None), (metadata[p].capture_time or datetime.min)))
         # Check if directory content is valid.
         if (json_decoded == False):
             raise ValueError("Invalid identification directory")
 
-    @staticmethod
-    def _to_text(value: Any) -> str:
-        # Check none input.
-        if value is None:
-            return ""
-        # Convert to string by default.
-        return str(value)
-
     def _parse_json(self, identification_json_path: str) -> None:
-        # Open JSON file.
-        try:
-            with open(identification_json_path, 'r') as json_file:
-                data = json.load(json_file)
-        except Exception as e:
-            raise ValueError(f"Identification JSON file decoding failed: {e}")
-        # Check top level key.
-        if IDENTIFICATION_JSON_KEY_TOP_LEVEL not in data:
-            raise ValueError("Identification JSON file top level key not found")
-        # Extract data.
-        identification_mapping = data[IDENTIFICATION_JSON_KEY_TOP_LEVEL]
-        # Check type.
-        if not isinstance(identification_mapping, dict):
-            raise ValueError("Invalid identification content: expected an object")
-        # Check mandatory keys.
-        missing_keys = [k for k in IDENTIFICATION_JSON_KEY_REQUIRED if k not in identification_mapping]
-        if missing_keys:
-            raise ValueError(f"Missing required identification keys: {', '.join(missing_keys)}")
-        date_mapping = identification_mapping.get(IDENTIFICATION_JSON_KEY_DATE)
-        missing_keys = [k for k in IDENTIFICATION_JSON_KEY_DATE_REQUIRED if k not in date_mapping]
-        if missing_keys:
-            raise ValueError(f"Missing required identification keys: {', '.join(missing_keys)}")
-        location_mapping = identification_mapping.get(IDENTIFICATION_JSON_KEY_LOCATION)
-        missing_keys = [k for k in IDENTIFICATION_JSON_KEY_LOCATION_REQUIRED if k not in location_mapping]
-        if missing_keys:
-            raise ValueError(f"Missing required identification keys: {', '.join(missing_keys)}")
-        gps_mapping = location_mapping.get(IDENTIFICATION_JSON_KEY_LOCATION_GPS)
-        missing_keys = [k for k in IDENTIFICATION_JSON_KEY_GPS_REQUIRED if k not in gps_mapping]
-        if missing_keys:
-            raise ValueError(f"Missing required identification keys: {', '.join(missing_keys)}")
-        # Update context.
-        self._identification.date_day = date_mapping.get(IDENTIFICATION_JSON_KEY_DATE_DAY, 0)
-        self._identification.date_month = date_mapping.get(IDENTIFICATION_JSON_KEY_DATE_MONTH, 0)
-        self._identification.date_year = date_mapping.get(IDENTIFICATION_JSON_KEY_DATE_YEAR, 0)
-        self._identification.location_city = IdentificationView._to_text(location_mapping.get(IDENTIFICATION_JSON_KEY_LOCATION_CITY, ""))
-        self._identification.location_department = IdentificationView._to_text(location_mapping.get(IDENTIFICATION_JSON_KEY_LOCATION_DEPARTMENT, ""))
-        self._identification.location_country = IdentificationView._to_text(location_mapping.get(IDENTIFICATION_JSON_KEY_LOCATION_COUNTRY, ""))
-        self._identification.location_gps_latitude = gps_mapping.get(IDENTIFICATION_JSON_KEY_LOCATION_GPS_LATITUDE, 0)
-        self._identification.location_gps_longitude = gps_mapping.get(IDENTIFICATION_JSON_KEY_LOCATION_GPS_LONGITUDE, 0)
-        self._identification.location_gps_altitude = gps_mapping.get(IDENTIFICATION_JSON_KEY_LOCATION_GPS_ALTITUDE, 0)
-        self._identification.description = IdentificationView._to_text(identification_mapping.get(IDENTIFICATION_JSON_KEY_DESCRIPTION, ""))
+        IdentificationView.decode_json(identification_json_path, self._identification)
+
+    @staticmethod
+    def decode_json(identification_json_path: str, identification: Identification) -> None:
+        # Decode and validate in a single pass.
+        IDENTIFICATION_CODEC.load(identification_json_path, identification)
 
     def _write_json(self) -> None:
-        # Local variables.
-        data = dict()
         # Check local path.
         if (self._json_path is None):
             return
-        # Open JSON file in reading mode.
-        with open(self._json_path, 'r+' if (os.path.isfile(self._json_path)) else 'w+') as json_file:
-            # Compute data.
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL] = dict()
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_DATE] = dict()
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_DATE][IDENTIFICATION_JSON_KEY_DATE_DAY] = self._identification.date_day
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_DATE][IDENTIFICATION_JSON_KEY_DATE_MONTH] = self._identification.date_month
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_DATE][IDENTIFICATION_JSON_KEY_DATE_YEAR] = self._identification.date_year
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_LOCATION] = dict()
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_LOCATION][IDENTIFICATION_JSON_KEY_LOCATION_CITY] = self._identification.location_city
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_LOCATION][IDENTIFICATION_JSON_KEY_LOCATION_DEPARTMENT] = self._identification.location_department
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_LOCATION][IDENTIFICATION_JSON_KEY_LOCATION_COUNTRY] = self._identification.location_country
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_LOCATION][IDENTIFICATION_JSON_KEY_LOCATION_GPS] = dict()
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_LOCATION][IDENTIFICATION_JSON_KEY_LOCATION_GPS][IDENTIFICATION_JSON_KEY_LOCATION_GPS_LATITUDE] = self._identification.location_gps_latitude
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_LOCATION][IDENTIFICATION_JSON_KEY_LOCATION_GPS][IDENTIFICATION_JSON_KEY_LOCATION_GPS_LONGITUDE] = self._identification.location_gps_longitude
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_LOCATION][IDENTIFICATION_JSON_KEY_LOCATION_GPS][IDENTIFICATION_JSON_KEY_LOCATION_GPS_ALTITUDE] = self._identification.location_gps_altitude
-            data[IDENTIFICATION_JSON_KEY_TOP_LEVEL][IDENTIFICATION_JSON_KEY_DESCRIPTION] = self._identification.description
-            # Write file.
-            json_file.seek(0)
-            json.dump(data, json_file, indent=4)
-            json_file.truncate()
-            json_file.close()
+        # Write file in background.
+        IDENTIFICATION_CODEC.save(self._json_path, self._identification)
+
+    def _journal_edit(self, previous_values: dict) -> None:
+        # Local variables.
+        journal = EditJournal.get_default()
+        # Whole file is rewritten when the journal is compacted.
+        if ((journal is not None) and (self._json_path is not None)):
+            try:
+                journal.record(self._json_path, IDENTIFICATION_CODEC, previous_values, self._identification)
+                return
+            except OSError as e:
+                logging.error("Journal writing failed : %s", e)
+        self._write_json()
 
     def _edit_callback(self) -> None:
+        # Local variables.
+        previous_values = IDENTIFICATION_CODEC.snapshot(self._identification)
         # Open edition window.
         edit_window = IdentificationEditWindow(self._identification, False)
         edit_window.exec()
         # Check if any property has been modified.
         if (edit_window._has_changed == True):
-            # Update JSON file.
-            self._write_json()
+            # Journal modified fields.
+            self._journal_edit(previous_values)
             # Refresh GUI.
             self.display(reset = False)
         edit_window.close()
@@ -354,7 +337,7 @@ class IdentificationView:
         # Check count.
         if (image_count == 0):
             # Clear identification panel.
-            Image.clear(self._gui.identificationPhotosGraphicsView)
+            self._gui.identificationPhotosGraphicsView.clear()
             self._gui.identificationPhotosPreviousPushButton.setEnabled(False)
             self._gui.identificationPhotosNextPushButton.setEnabled(False)
             # Update title.
@@ -365,12 +348,24 @@ class IdentificationView:
                 logging.warning("_current_image_index index overflow, defaulting to last")
                 self._current_identification_index = (image_count - 1)
             # Print identification.
-            Image.display(self._gui.identificationPhotosGraphicsView, self._image_path_list[self._current_image_index])
+            self._gui.identificationPhotosGraphicsView.display(self._image_path_list[self._current_image_index])
             # Update buttons state.
             self._gui.identificationPhotosPreviousPushButton.setEnabled(True if (self._current_image_index > 0) else False)
             self._gui.identificationPhotosNextPushButton.setEnabled(True if (self._current_image_index < (image_count - 1)) else False)
             # Update title.
             self._gui.identificationPhotosGroupBox.setTitle("Photos (" + str(self._current_image_index + 1) + "/" + str(image_count) + ")")
+            # Decode next and previous photos in background.
+            self._gui.identificationPhotosGraphicsView.prefetch(self._get_photo_window(), "photos")
+
+    def _get_photo_window(self) -> list:
+        # Local variables.
+        image_paths = []
+        # Next photos first since the list is mostly browsed forward.
+        for distance in range(1, (IDENTIFICATION_PHOTO_PREFETCH_COUNT + 1)):
+            for index in [(self._current_image_index + distance), (self._current_image_index - distance)]:
+                if ((index >= 0) and (index < len(self._image_path_list))):
+                    image_paths.append(self._image_path_list[index])
+        return image_paths
 
     def _previous_image_callback(self):
         # Check index.
@@ -386,16 +381,36 @@ class IdentificationView:
             self._current_image_index += 1
             self._display_image()
 
+    def show_image(self, image_path: str) -> None:
+        # Display a given photo of the identification.
+        if (image_path in self._image_path_list):
+            self._current_image_index = self._image_path_list.index(image_path)
+            self._display_image()
+
     def get_identification(self) -> Identification:
         return (self._identification)
 
+    def get_image_paths(self) -> list:
+        return list(self._image_path_list)
+
+    def get_watched_paths(self) -> list:
+        return [self._directory_path, self._json_path]
+
+    @staticmethod
+    def _display_date(identification: Identification) -> str:
+        return (str(identification.date_day) + " " + IDENTIFICATION_MONTH[identification.date_month] + " " + str(identification.date_year))
+
+    @staticmethod
+    def _display_gps(identification: Identification) -> str:
+        return (str(identification.location_gps_latitude) + "° " + str(identification.location_gps_longitude) + "° (" + str(identification.location_gps_altitude) + "m)")
+
     def display(self, reset: bool = True) -> None:
         # Print fields.
-        self._gui.identificationDateLabel.setText(str(self._identification.date_day) + " " + IDENTIFICATION_MONTH[self._identification.date_month] + " " + str(self._identification.date_year))
+        self._gui.identificationDateLabel.setText(IdentificationView._display_date(self._identification))
         self._gui.identificationCityContentLabel.setText(self._identification.location_city)
         self._gui.identificationDepartmentContentLabel.setText(self._identification.location_department)
         self._gui.identificationCountryContentLabel.setText(self._identification.location_country)
-        self._gui.identificationGpsContentLabel.setText(str(self._identification.location_gps_latitude) + "° " + str(self._identification.location_gps_longitude) + "° (" + str(self._identification.location_gps_altitude) + "m)")
+        self._gui.identificationGpsContentLabel.setText(IdentificationView._display_gps(self._identification))
         self._gui.identificationDescriptionContentLabel.setText(self._identification.description)
         # Check call type.
         if (reset == True):
@@ -422,7 +437,7 @@ class IdentificationView:
         # Clear titles.
         gui.identificationPhotosGroupBox.setTitle("Photos")
         # Clear image.
-        Image.display(gui.identificationPhotosGraphicsView, None)
+        gui.identificationPhotosGraphicsView.clear()
         # Disable buttons.
         gui.identificationPhotosPreviousPushButton.setEnabled(False)
         gui.identificationPhotosNextPushButton.setEnabled(False)
@@ -9,9 +9,12 @@ import os
 
 from dataclasses import dataclass
 
-from PySide6.QtWidgets import QGraphicsScene, QGraphicsView
-from PySide6.QtGui import QPixmap, QImageReader
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QImage, QImageReader
+
+from gui.exif import ExifIndex, read_exif_thumbnail
+from gui.image_loader import transform_image
+from gui.thumbnail_cache import ThumbnailCache, THUMBNAIL_SIZES
 
 ### IMAGE class ###
 
@@ -19,50 +22,55 @@ from PySide6.QtCore import Qt
 class Image:
     
     IMAGE_FILE_EXTENSION = '.jpg'
-    IMAGE_FILE_MAXIMUM_SIZE_BYTES = 1000000
+    # Files above this size are never decoded at full resolution unless explicitly requested.
+    IMAGE_PREVIEW_THRESHOLD_BYTES = 1000000
+    IMAGE_PREVIEW_SIZE = THUMBNAIL_SIZES[-1]
+    # Full resolution decodes are limited to this pixel count.
+    IMAGE_FULL_RESOLUTION_MAXIMUM_PIXELS = (64 * 1000 * 1000)
+
+    @staticmethod
+    def _apply_policy(image_path: str, size: QSize) -> QSize:
+        # Full resolution on demand, bounded in memory.
+        if (size is None):
+            source_size = QImageReader(image_path).size()
+            pixel_count = (source_size.width() * source_size.height())
+            if (source_size.isValid() and (pixel_count > Image.IMAGE_FULL_RESOLUTION_MAXIMUM_PIXELS)):
+                ratio = ((Image.IMAGE_FULL_RESOLUTION_MAXIMUM_PIXELS / pixel_count) ** 0.5)
+                return QSize(int(source_size.width() * ratio), int(source_size.height() * ratio))
+            return None
+        # Large photos are served through a preview when the target size is unknown.
+        if (size.isEmpty()):
+            try:
+                if (os.path.getsize(image_path) >= Image.IMAGE_PREVIEW_THRESHOLD_BYTES):
+                    return QSize(Image.IMAGE_PREVIEW_SIZE, Image.IMAGE_PREVIEW_SIZE)
+            except OSError:
+                pass
+        return size
 
     @staticmethod
-    def display(q_graphic_view: QGraphicsView, image_path: str = None) -> None:
-        # Check QT object.
-        if q_graphic_view is None:
-            raise ValueError("No QGraphicsView provided, cannot display image")
-        # Clear scene if none image is provided.
-        if (image_path is None):
-            q_graphic_view.setScene(None)
-            return
-        # Check image.
-        if (not os.path.isfile(image_path)):
-            raise ValueError("Image file not found:")
-        # Create pixel map object.
-        try:
-            # Manage orientation.
-            reader = QImageReader(image_path)
-            reader.setAutoTransform(True)
-            image = reader.read()
-            # Check image.
-            if image is None or image.isNull():
-                # Fallback to simple QPixmap load.
-                pixmap = QPixmap(image_path)
-                if pixmap.isNull():
-                    raise ValueError("Failed to load image")
-            else:
-                pixmap = QPixmap.fromImage(image)
-            # Configure scene.
-            scene = QGraphicsScene()
-            scene.addPixmap(pixmap)
-            scene_rect = scene.itemsBoundingRect()
-            scene.setSceneRect(scene_rect)
-            # Set the scene on the provided view.
-            q_graphic_view.setScene(scene)
-            q_graphic_view.setSceneRect(scene_rect)
-            q_graphic_view.fitInView(scene_rect, Qt.KeepAspectRatio)
-            q_graphic_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-            q_graphic_view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        except Exception as e:
-            raise ValueError(f"Image processing failed: {e}")
-        
+    def read(image_path: str, size: QSize = None) -> QImage:
+        # Smallest cached size which fills the requested size, original photo otherwise (orientation comes from the EXIF index).
+        return ThumbnailCache.get_default().read(image_path, Image._apply_policy(image_path, size), ExifIndex.get_default().get(image_path).transformation())
+
+    @staticmethod
+    def read_preview(image_path: str) -> QImage:
+        # Fast low resolution version: cached preview or thumbnail embedded by the camera (null image if none).
+        image = ThumbnailCache.get_default().read_cached(image_path)
+        if (not image.isNull()):
+            return image
+        thumbnail = read_exif_thumbnail(image_path)
+        if (thumbnail is None):
+            return QImage()
+        return transform_image(QImage.fromData(thumbnail), ExifIndex.get_default().get(image_path).transformation())
+
     @staticmethod
-    def clear(q_graphic_view: QGraphicsView) -> None:
-        # Clear scene.
-        q_graphic_view.setScene(None)
-            
\ No newline at end of file
+    def find(directory_path: str) -> list:
+        # Local variables.
+        image_paths = []
+        # All photos of a workspace sub-tree (dot folders are skipped).
+        for root, directories, files in os.walk(directory_path):
+            directories[:] = sorted(d for d in directories if (not d.startswith(".")))
+            for f in sorted(files):
+                if (os.path.splitext(f)[1].lower() == Image.IMAGE_FILE_EXTENSION):
+                    image_paths.append(os.path.join(root, f))
+        return image_paths
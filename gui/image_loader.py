@@ -0,0 +1,286 @@
+"""
+* image_loader.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import logging
+import os
+
+from typing import Callable
+from PySide6.QtCore import QObject, QSize, QThreadPool, Qt, Signal
+from PySide6.QtGui import QImage, QImageIOHandler, QImageReader, QPixmap, QTransform
+from PySide6.QtWidgets import QGraphicsView
+
+from gui.cache import LruCache
+from gui.worker import Worker
+
+### IMAGE LOADER macros ###
+
+IMAGE_LOADER_THREADS = 2
+IMAGE_LOADER_PRIORITY_DISPLAY = 1
+IMAGE_LOADER_PRIORITY_PREFETCH = 0
+IMAGE_LOADER_PIXMAP_CACHE_MAX_BYTES = (256 * 1024 * 1024)
+
+### IMAGE LOADER functions ###
+
+def transformation_matrix(transformation: QImageIOHandler.Transformation) -> QTransform:
+    # Local variables.
+    matrix = QTransform()
+    # Rotation is applied before mirror and flip.
+    if (transformation & QImageIOHandler.TransformationRotate90):
+        matrix *= QTransform().rotate(90)
+    if (transformation & QImageIOHandler.TransformationMirror):
+        matrix *= QTransform.fromScale(-1, 1)
+    if (transformation & QImageIOHandler.TransformationFlip):
+        matrix *= QTransform.fromScale(1, -1)
+    return matrix
+
+def transform_image(image: QImage, transformation: QImageIOHandler.Transformation) -> QImage:
+    # Local variables.
+    matrix = transformation_matrix(transformation)
+    # Apply orientation.
+    return image if (matrix.isIdentity() or image.isNull()) else image.transformed(matrix)
+
+def read_image(image_path: str, target_size: QSize = None, transformation: QImageIOHandler.Transformation = None) -> QImage:
+    # Manage orientation (QImage can be decoded outside of the GUI thread).
+    reader = QImageReader(image_path)
+    # Orientation is read from the photo header unless already known.
+    if (transformation is None):
+        reader.setAutoTransform(True)
+    else:
+        reader.setAutoTransform(False)
+    # Let the decoder downscale (JPEG decodes directly at 1/2, 1/4 or 1/8 of the size).
+    if ((target_size is not None) and (not target_size.isEmpty())):
+        # Scaling is applied before the EXIF rotation.
+        if ((reader.transformation() if (transformation is None) else transformation) & QImageIOHandler.TransformationRotate90):
+            target_size = target_size.transposed()
+        source_size = reader.size()
+        if (source_size.isValid() and ((source_size.width() > target_size.width()) or (source_size.height() > target_size.height()))):
+            reader.setScaledSize(source_size.scaled(target_size, Qt.KeepAspectRatio))
+    return reader.read() if (transformation is None) else transform_image(reader.read(), transformation)
+
+def target_size(q_graphic_view: QGraphicsView) -> QSize:
+    # Size of the view in physical pixels.
+    ratio = q_graphic_view.devicePixelRatioF()
+    size = q_graphic_view.viewport().size()
+    return QSize(round(size.width() * ratio), round(size.height() * ratio))
+
+def pixmap_size_bytes(pixmap: QPixmap) -> int:
+    return ((pixmap.width() * pixmap.height() * pixmap.depth()) // 8)
+
+### IMAGE LOADER classes ###
+
+"""
+* ImageLoader
+* Decodes the photos of a graphics view in background at the view size, only the last requested photo is delivered.
+"""
+class ImageLoader(QObject):
+
+    _thread_pool = None
+
+    # Decoded photos shared by all views.
+    pixmap_cache = LruCache(IMAGE_LOADER_PIXMAP_CACHE_MAX_BYTES, weigher=pixmap_size_bytes)
+
+    loading = Signal(str)
+    loaded = Signal(str, QPixmap)
+    failed = Signal(str)
+
+    def __init__(self, q_graphic_view: QGraphicsView, decoder: Callable = read_image, preview_decoder: Callable = None) -> None:
+        # Init parent.
+        super().__init__(q_graphic_view)
+        # Init context.
+        self._view = q_graphic_view
+        self._decoder = decoder
+        self._preview_decoder = preview_decoder
+        self._image_path = None
+        self._generation = 0
+        self._worker = None
+        self._running_workers = set()
+        self._prefetch_workers = {}
+        self._full_resolution = False
+        self._decoded_size = QSize()
+        self._decoded_target_size = QSize()
+
+    @staticmethod
+    def _get_thread_pool() -> QThreadPool:
+        if (ImageLoader._thread_pool is None):
+            ImageLoader._thread_pool = QThreadPool()
+            ImageLoader._thread_pool.setMaxThreadCount(IMAGE_LOADER_THREADS)
+        return ImageLoader._thread_pool
+
+    @staticmethod
+    def set_cache_budget(max_bytes: int) -> None:
+        ImageLoader.pixmap_cache.set_capacity(max_bytes)
+
+    @staticmethod
+    def get_cache_statistics() -> dict:
+        # Diagnostics of the shared pixmap cache.
+        cache = ImageLoader.pixmap_cache
+        return {"entries": len(cache), "bytes": cache.weight, "budget_bytes": cache.capacity, "hits": cache.hits, "misses": cache.misses, "hit_rate": cache.hit_rate()}
+
+    @staticmethod
+    def _cache_key(image_path: str, size: QSize) -> tuple:
+        # Photo modification gives a new key (None if the photo cannot be read).
+        try:
+            mtime_ns = os.stat(image_path).st_mtime_ns
+        except OSError:
+            return None
+        return (image_path, mtime_ns, 0 if (size is None) else size.width(), 0 if (size is None) else size.height())
+
+    @staticmethod
+    def _decode(worker: Worker, decoder: Callable, image_path: str, size: QSize) -> QImage:
+        # Check if the photo is still wanted.
+        if (worker.is_cancelled() == True):
+            return None
+        return decoder(image_path, size)
+
+    def cancel(self) -> None:
+        # Make any pending result stale.
+        self._generation += 1
+        self._image_path = None
+        if (self._worker is not None):
+            self._worker.cancel()
+            if (ImageLoader._get_thread_pool().tryTake(self._worker) == True):
+                self._running_workers.discard(self._worker)
+            self._worker = None
+
+    def load(self, image_path: str) -> None:
+        # Check if the photo is already being loaded.
+        if ((image_path == self._image_path) and (self._worker is not None)):
+            return
+        self.cancel()
+        self._image_path = image_path
+        self._full_resolution = False
+        self._start(True)
+
+    def load_full_resolution(self) -> None:
+        # Explicit zoom: decode the current photo without downscaling (current pixmap stays visible).
+        if ((self._image_path is None) or (self._full_resolution == True)):
+            return
+        self._full_resolution = True
+        self._restart()
+
+    def _restart(self) -> None:
+        # Decode current photo again.
+        image_path = self._image_path
+        full_resolution = self._full_resolution
+        self.cancel()
+        self._image_path = image_path
+        self._full_resolution = full_resolution
+        self._start(False)
+
+    def _start(self, placeholder: bool) -> None:
+        # Local variables.
+        size = None if (self._full_resolution == True) else target_size(self._view)
+        key = ImageLoader._cache_key(self._image_path, size)
+        self._decoded_target_size = QSize() if (size is None) else size
+        # Use the photo decoded a moment ago.
+        pixmap = None if (key is None) else ImageLoader.pixmap_cache.get(key)
+        logging.debug("Pixmap cache : %s", ImageLoader.get_cache_statistics())
+        if (pixmap is not None):
+            self._decoded_size = pixmap.size()
+            self.loaded.emit(self._image_path, pixmap)
+            return
+        # Show a low resolution version (placeholder if none) until the photo is decoded.
+        if (placeholder == True):
+            preview = None if (self._preview_decoder is None) else self._preview_decoder(self._image_path)
+            if ((preview is not None) and (not preview.isNull())):
+                self.loaded.emit(self._image_path, QPixmap.fromImage(preview))
+            else:
+                self.loading.emit(self._image_path)
+        # Decode in background.
+        worker = Worker(ImageLoader._decode, self._decoder, self._image_path, size)
+        worker.signals.finished.connect(lambda image, generation=self._generation, worker=worker, key=key: self._decoded_callback(generation, worker, key, image))
+        worker.signals.failed.connect(lambda error, generation=self._generation, worker=worker, key=key: self._decoded_callback(generation, worker, key, None))
+        self._worker = worker
+        self._running_workers.add(worker)
+        ImageLoader._get_thread_pool().start(worker, IMAGE_LOADER_PRIORITY_DISPLAY)
+
+    def prefetch(self, image_paths: list, group: str = "") -> None:
+        # Local variables.
+        size = target_size(self._view)
+        keys = {}
+        for image_path in image_paths:
+            key = ImageLoader._cache_key(image_path, size)
+            if (key is not None):
+                keys[key] = image_path
+        # Cancel queued prefetches of the group which are out of the new window.
+        for key, (worker, worker_group) in list(self._prefetch_workers.items()):
+            if ((worker_group == group) and (key not in keys)):
+                worker.cancel()
+                if (ImageLoader._get_thread_pool().tryTake(worker) == True):
+                    self._running_workers.discard(worker)
+                    self._prefetch_workers.pop(key)
+        # Decode missing photos into the shared cache, after the displayed one.
+        for key, image_path in keys.items():
+            if ((key in self._prefetch_workers) or (key in ImageLoader.pixmap_cache)):
+                continue
+            worker = Worker(ImageLoader._decode, self._decoder, image_path, size)
+            worker.signals.finished.connect(lambda image, worker=worker, key=key: self._prefetched_callback(worker, key, image))
+            worker.signals.failed.connect(lambda error, worker=worker, key=key: self._prefetched_callback(worker, key, None))
+            self._prefetch_workers[key] = (worker, group)
+            self._running_workers.add(worker)
+            ImageLoader._get_thread_pool().start(worker, IMAGE_LOADER_PRIORITY_PREFETCH)
+
+    def _prefetched_callback(self, worker: Worker, key: tuple, image: QImage) -> None:
+        # Local variables.
+        entry = self._prefetch_workers.get(key)
+        # Forget worker.
+        self._running_workers.discard(worker)
+        if ((entry is not None) and (entry[0] is worker)):
+            self._prefetch_workers.pop(key)
+        # Keep photo for next display (pixmaps can only be created in the GUI thread).
+        if ((worker.is_cancelled() == False) and (image is not None) and (not image.isNull())):
+            ImageLoader.pixmap_cache.put(key, QPixmap.fromImage(image))
+
+    def show(self, image_path: str, image: QImage) -> None:
+        # Display an already decoded photo.
+        self.cancel()
+        self._image_path = image_path
+        self._full_resolution = False
+        self._decoded_target_size = QSize()
+        pixmap = QPixmap.fromImage(image)
+        key = ImageLoader._cache_key(image_path, target_size(self._view))
+        if (key is not None):
+            ImageLoader.pixmap_cache.put(key, pixmap)
+        self._decoded_size = pixmap.size()
+        self.loaded.emit(image_path, pixmap)
+
+    def _decoded_callback(self, generation: int, worker: Worker, key: tuple, image: QImage) -> None:
+        # Drop stale results (user has moved to another photo).
+        self._running_workers.discard(worker)
+        if (generation != self._generation):
+            return
+        self._worker = None
+        if ((image is None) or image.isNull()):
+            logging.error("Image decoding failed : %s", self._image_path)
+            image_path = self._image_path
+            self.cancel()
+            self.failed.emit(image_path)
+            return
+        # Convert in the GUI thread and keep for next display.
+        pixmap = QPixmap.fromImage(image)
+        if (key is not None):
+            ImageLoader.pixmap_cache.put(key, pixmap)
+        self._decoded_size = pixmap.size()
+        self.loaded.emit(self._image_path, pixmap)
+
+    def _needs_decoding(self, size: QSize) -> bool:
+        # Check if decoded image is limited by the previous view size.
+        if ((self._full_resolution == True) or size.isEmpty()):
+            return False
+        if (self._decoded_target_size.isEmpty()):
+            return True
+        source_limited = ((self._decoded_size.width() < self._decoded_target_size.width()) and (self._decoded_size.height() < self._decoded_target_size.height()))
+        if (source_limited and (size.width() >= self._decoded_target_size.width()) and (size.height() >= self._decoded_target_size.height())):
+            return False
+        return (size != self._decoded_target_size)
+
+    def update_size(self) -> None:
+        # Decode displayed photo again if the view size has changed.
+        if ((self._image_path is None) or (self._worker is not None)):
+            return
+        if (self._needs_decoding(target_size(self._view)) == True):
+            self._restart()
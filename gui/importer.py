@@ -0,0 +1,238 @@
+"""
+* importer.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable
+
+from gui.exif import ExifIndex, read_exif
+from gui.identification import Identification, IDENTIFICATION_CODEC
+from gui.image import Image
+from gui.persistence import PersistenceQueue
+from gui.thumbnail_cache import ThumbnailCache
+
+### IMPORTER macros ###
+
+# Copies are I/O bound and decoding releases the interpreter lock, threads are enough.
+IMPORTER_WORKERS = max(1, min(8, (os.cpu_count() or 1)))
+IMPORTER_CHUNK_SIZE = (1024 * 1024)
+IMPORTER_TEMPORARY_FILE_SUFFIX = ".part"
+IMPORTER_IDENTIFICATION_FILE = "identification.json"
+IMPORTER_PROGRESS_PERIOD_S = 2.0
+
+### IMPORTER functions ###
+
+def _hash_file(file_path: str) -> str:
+    # Local variables.
+    digest = hashlib.blake2b()
+    # Read by chunks.
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(IMPORTER_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _copy_and_hash(source_path: str, destination_path: str) -> str:
+    # Photo is read once for both operations.
+    digest = hashlib.blake2b()
+    with open(source_path, 'rb') as source_file, open(destination_path, 'wb') as destination_file:
+        for chunk in iter(lambda: source_file.read(IMPORTER_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            destination_file.write(chunk)
+    # Keep capture related modification time.
+    shutil.copystat(source_path, destination_path)
+    return digest.hexdigest()
+
+def plan_import(image_paths: list, species_directory_path: str, workers: int = IMPORTER_WORKERS) -> dict:
+    # Local variables.
+    groups = {}
+    located = set()
+    # Headers are read in parallel (source is often a slow memory card).
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        metadata = dict(zip(image_paths, executor.map(read_exif, image_paths)))
+    # One identification per capture day.
+    for image_path in image_paths:
+        data = metadata[image_path]
+        capture_time = data.capture_time if (data.capture_time is not None) else datetime.fromtimestamp(os.path.getmtime(image_path))
+        identification = Identification()
+        identification.date_day = capture_time.day
+        identification.date_month = capture_time.month
+        identification.date_year = capture_time.year
+        directory_path = os.path.join(species_directory_path, identification.compute_directory_name())
+        if (directory_path not in groups):
+            groups[directory_path] = (identification, [])
+        groups[directory_path][1].append(image_path)
+        # First known position of the day.
+        if (data.has_position() and (directory_path not in located)):
+            located.add(directory_path)
+            identification = groups[directory_path][0]
+            identification.location_gps_latitude = round(data.latitude, 6)
+            identification.location_gps_longitude = round(data.longitude, 6)
+            identification.location_gps_altitude = 0 if (data.altitude is None) else max(0, round(data.altitude))
+    return groups
+
+"""
+* PhotoImporter
+* Copy of a folder of field photos into dated identification directories of a species.
+"""
+class PhotoImporter:
+
+    def __init__(self, species_directory_path: str, workers: int = IMPORTER_WORKERS, generate_previews: bool = True) -> None:
+        # Init context.
+        self.species_directory_path = species_directory_path
+        self.workers = workers
+        self.generate_previews = generate_previews
+        self.copied_count = 0
+        self.skipped_count = 0
+        self.cancelled_count = 0
+        self.failed_count = 0
+        self.created_directories = []
+        self._lock = threading.Lock()
+        self._hashes = set()
+        self._reserved_paths = set()
+        self._prepared_directories = set()
+
+    def _destination_path(self, source_path: str, directory_path: str, digest: str) -> str:
+        # Local variables.
+        name, extension = os.path.splitext(os.path.basename(source_path))
+        destination_path = os.path.join(directory_path, name + extension)
+        index = 1
+        while True:
+            # Free name is reserved until the photo is moved to it.
+            with self._lock:
+                reserved = (destination_path in self._reserved_paths)
+                if ((reserved == False) and (not os.path.exists(destination_path))):
+                    self._reserved_paths.add(destination_path)
+                    return destination_path
+            # Photo with the same name: skipped if identical (import already done), renamed otherwise (hashed outside the lock).
+            if ((reserved == False) and (os.path.getsize(destination_path) == os.path.getsize(source_path)) and (_hash_file(destination_path) == digest)):
+                return None
+            destination_path = os.path.join(directory_path, f"{name}_{index}{extension}")
+            index += 1
+
+    def _import_photo(self, source_path: str, directory_path: str, identification: Identification, is_cancelled: Callable) -> str:
+        # Check cancellation.
+        if ((is_cancelled is not None) and (is_cancelled() == True)):
+            raise CancelledError()
+        # Copy in a temporary file of the species (same file system), the photo appears in the directory once it is complete.
+        temporary_path = os.path.join(self.species_directory_path, f".{os.path.basename(source_path)}.{threading.get_ident()}{IMPORTER_TEMPORARY_FILE_SUFFIX}")
+        try:
+            digest = _copy_and_hash(source_path, temporary_path)
+            # Same photo found twice in the source folder.
+            with self._lock:
+                duplicate = (digest in self._hashes)
+                self._hashes.add(digest)
+            destination_path = None if (duplicate == True) else self._destination_path(source_path, directory_path, digest)
+            if (destination_path is not None):
+                # Identification directory is created with its first photo.
+                with self._lock:
+                    self._create_identification(directory_path, identification)
+                os.replace(temporary_path, destination_path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        if (destination_path is None):
+            return None
+        # Previews are ready before the identification is displayed.
+        if (self.generate_previews == True):
+            ThumbnailCache.get_default().generate(destination_path)
+        return destination_path
+
+    def _create_identification(self, directory_path: str, identification: Identification) -> None:
+        # Check if the directory is already prepared.
+        if (directory_path in self._prepared_directories):
+            return
+        self._prepared_directories.add(directory_path)
+        # Existing identification of the same day is kept, photos are added to it.
+        json_path = os.path.join(directory_path, IMPORTER_IDENTIFICATION_FILE)
+        if os.path.isdir(directory_path):
+            if (any(f.lower().endswith(".json") for f in os.listdir(directory_path))):
+                return
+        else:
+            os.makedirs(directory_path)
+            self.created_directories.append(directory_path)
+        IDENTIFICATION_CODEC.save(json_path, identification)
+
+    def run(self, image_paths: list, progress_callback: Callable = None, is_cancelled: Callable = None) -> list:
+        # Local variables.
+        imported_paths = []
+        count = 0
+        # Group photos by identification directory.
+        groups = plan_import(image_paths, self.species_directory_path, self.workers)
+        # Copy, hash and generate previews in parallel.
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._import_photo, source_path, directory_path, identification, is_cancelled): source_path for directory_path, (identification, source_paths) in groups.items() for source_path in source_paths}
+            try:
+                for future in as_completed(futures):
+                    count += 1
+                    try:
+                        destination_path = future.result()
+                        if (destination_path is None):
+                            self.skipped_count += 1
+                        else:
+                            self.copied_count += 1
+                            imported_paths.append(destination_path)
+                    except CancelledError:
+                        self.cancelled_count += 1
+                    except OSError as e:
+                        self.failed_count += 1
+                        logging.error("Photo import failed for %s : %s", futures[future], e)
+                    if (progress_callback is not None):
+                        progress_callback(count, len(futures))
+            except KeyboardInterrupt:
+                # Drop queued photos, next run skips the ones which have been copied.
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+            finally:
+                # Identification files of the created directories are written.
+                PersistenceQueue.get_default().flush()
+        # Index imported photos so that identifications are sorted without reading them again.
+        ExifIndex.get_default().get_many(imported_paths)
+        return imported_paths
+
+### IMPORTER main function ###
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import a folder of field photos in a species, one identification directory per capture day.")
+    parser.add_argument("source", help="Folder of photos (sub-folders included)")
+    parser.add_argument("species", help="Species directory")
+    parser.add_argument("--workers", type=int, default=IMPORTER_WORKERS, help=f"Worker threads (default: {IMPORTER_WORKERS})")
+    parser.add_argument("--no-previews", action="store_true", help="Do not generate the cached previews")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # Check species.
+    if (not os.path.isdir(args.species)):
+        print(f"Species directory not found: {args.species}")
+        return 1
+    image_paths = Image.find(args.source)
+    print(f"{len(image_paths)} photos found")
+    # Import with periodic throughput report.
+    importer = PhotoImporter(args.species, args.workers, (args.no_previews == False))
+    start = time.perf_counter()
+    last_report = [start]
+    def report(count: int, total: int) -> None:
+        now = time.perf_counter()
+        if ((now - last_report[0]) >= IMPORTER_PROGRESS_PERIOD_S):
+            last_report[0] = now
+            print(f"{count}/{total} photos, {count / (now - start):.1f} images/s")
+    try:
+        importer.run(image_paths, report)
+    except KeyboardInterrupt:
+        return 130
+    duration = (time.perf_counter() - start)
+    print(f"{importer.copied_count} photos imported in {duration:.1f} s ({len(image_paths) / max(duration, 1e-6):.1f} images/s), {importer.skipped_count} already present, {importer.cancelled_count} cancelled, {importer.failed_count} failed, {len(importer.created_directories)} identifications created")
+    return 0 if (importer.failed_count == 0) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,503 @@
+"""
+* index.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from gui.identification import Identification, IdentificationView, IDENTIFICATION_DATA_FILE_EXTENSION
+from gui.species import Species, SpeciesView, SPECIES_DATA_FILE_EXTENSION
+from gui.image import Image
+from gui.scanner import HerbariumScanner
+
+### INDEX macros ###
+
+INDEX_FILE = '.botany-index.sqlite'
+INDEX_SCHEMA_VERSION = 2
+INDEX_MTIME_RACY_WINDOW_NS = 2000000000
+INDEX_MTIME_UNTRUSTED = -1
+INDEX_BATCH_SIZE = 200
+
+INDEX_TABLES = ["directories", "species", "identifications", "settings"]
+# Path columns rewritten when a directory is renamed.
+INDEX_PATH_COLUMNS = {
+    "directories": ["path", "parent"],
+    "species": ["path", "json_path", "image_path"],
+    "identifications": ["path", "species_path", "json_path"],
+}
+INDEX_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, parent TEXT, depth INTEGER, name TEXT, mtime_ns INTEGER)",
+    "CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent)",
+    "CREATE TABLE IF NOT EXISTS species (path TEXT PRIMARY KEY, mtime_ns INTEGER, json_path TEXT, json_mtime_ns INTEGER, image_path TEXT, latin_name TEXT, common_name TEXT)",
+    "CREATE TABLE IF NOT EXISTS identifications (path TEXT PRIMARY KEY, species_path TEXT, mtime_ns INTEGER, json_path TEXT, json_mtime_ns INTEGER, date_year INTEGER, date_month INTEGER, date_day INTEGER, location_city TEXT)",
+    "CREATE INDEX IF NOT EXISTS identifications_species_path ON identifications (species_path)",
+]
+
+### INDEX classes ###
+
+"""
+* IndexNode
+* Data class containing a classification directory read from the index.
+"""
+@dataclass(frozen=True)
+class IndexNode:
+
+    path: str
+    depth: int
+    common_name: str
+    child_count: int = 0
+
+"""
+* _ScanContext
+* Data class containing the state of an index update.
+"""
+class _ScanContext:
+
+    def __init__(self, known: dict, scan_time_ns: int, scanner: HerbariumScanner, relist: bool, batch_callback: Callable, is_cancelled: Callable, root: "_ScanContext" = None) -> None:
+        self.known = known
+        self.scan_time_ns = scan_time_ns
+        self.scanner = scanner
+        self.relist = relist
+        self.batch_callback = batch_callback
+        self._is_cancelled = is_cancelled
+        self.rows = {"directories": {}, "species": {}, "identifications": {}}
+        self.pending = {"directories": [], "species": [], "identifications": []}
+        self.changed = []
+        # Directory counter is shared by all branches.
+        self._root = self if (root is None) else root
+        self._directory_count = 0
+        self._lock = threading.Lock()
+
+    def branch(self) -> "_ScanContext":
+        return _ScanContext(self.known, self.scan_time_ns, self.scanner, self.relist, self.batch_callback, self._is_cancelled, self._root)
+
+    def directory_count(self) -> int:
+        return self._root._directory_count
+
+    def is_cancelled(self) -> bool:
+        return ((self._is_cancelled is not None) and (self._is_cancelled() == True))
+
+    def trusted_mtime(self, mtime_ns: int) -> int:
+        # Modification times too close to the scan time are not trusted.
+        return mtime_ns if ((self.scan_time_ns - mtime_ns) > INDEX_MTIME_RACY_WINDOW_NS) else INDEX_MTIME_UNTRUSTED
+
+    def add(self, table: str, row: tuple) -> bool:
+        # Store row and keep it for the next batch if it changed.
+        self.rows[table][row[0]] = row
+        if (self.known["rows"][table].get(row[0]) == row):
+            return False
+        self.pending[table].append(row)
+        return True
+
+    def add_directory(self, row: tuple, child_count: int, force: bool) -> None:
+        with self._root._lock:
+            self._root._directory_count += 1
+        if (self.add("directories", row) or force):
+            self.changed.append((row[0], row[2], child_count))
+
+    def pending_count(self) -> int:
+        return sum(len(rows) for rows in self.pending.values())
+
+    def clear_pending(self) -> None:
+        for rows in self.pending.values():
+            rows.clear()
+        self.changed = []
+
+"""
+* WorkspaceIndex
+* Persistent SQLite index of the workspace directories, species and identifications.
+"""
+class WorkspaceIndex:
+
+    def __init__(self, data_directory_path: str, depth_max: int) -> None:
+        # Init context.
+        self._data_directory_path = data_directory_path
+        self._depth_max = depth_max
+        self._species_depth = (depth_max - 1)
+        self._lock = threading.Lock()
+        self._depth_counts = None
+        # Open database.
+        index_path = os.path.join(data_directory_path, INDEX_FILE)
+        try:
+            self._connection = sqlite3.connect(index_path, check_same_thread=False)
+            self._create_schema()
+        except sqlite3.Error as e:
+            logging.warning("Workspace index not writable, using memory index : %s", e)
+            self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+            self._create_schema()
+
+    def _create_schema(self) -> None:
+        # Drop tables in case of schema change.
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if (version != INDEX_SCHEMA_VERSION):
+            for table in INDEX_TABLES:
+                self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self._connection.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+        for statement in INDEX_SCHEMA:
+            self._connection.execute(statement)
+        self._connection.commit()
+
+    def _to_absolute(self, relative_path: str) -> str:
+        return os.path.join(self._data_directory_path, relative_path) if (relative_path != "") else self._data_directory_path
+
+    def _to_relative(self, absolute_path: str) -> str:
+        relative_path = os.path.relpath(absolute_path, self._data_directory_path)
+        return "" if (relative_path == ".") else relative_path
+
+    @staticmethod
+    def _sub_tree(column: str, relative_path: str) -> tuple:
+        # Path range of a sub-tree (works with binary collation).
+        return (f"({column} = ? OR ({column} >= ? AND {column} < ?))", (relative_path, relative_path + os.sep, relative_path + chr(ord(os.sep) + 1)))
+
+    @staticmethod
+    def _find_json(directory_path: str, extension: str, decoder, record) -> tuple:
+        # Same rule as the views: first JSON file (by name) which can be decoded.
+        for f in sorted(os.listdir(directory_path)):
+            if (Path(f).suffix.lower() != extension):
+                continue
+            p = os.path.join(directory_path, f)
+            try:
+                decoder(p, record)
+                return (p, os.stat(p).st_mtime_ns)
+            except Exception as e:
+                logging.error("Invalid JSON file : %s", e)
+        return (None, None)
+
+    def _scan(self, relative_path: str, depth: int, context: "_ScanContext") -> list:
+        # Check cancellation.
+        if context.is_cancelled():
+            return []
+        # Local variables.
+        directory_path = self._to_absolute(relative_path)
+        parent = os.path.dirname(relative_path) if (depth > 0) else None
+        # Read directory modification time.
+        try:
+            mtime_ns = os.stat(directory_path).st_mtime_ns
+        except OSError:
+            return []
+        # Species directory: children are identifications.
+        if (depth == self._species_depth):
+            species_changed = self._scan_species(relative_path, mtime_ns, context)
+            context.add_directory((relative_path, parent, depth, os.path.basename(relative_path), context.trusted_mtime(mtime_ns)), 0, species_changed)
+            self._flush(context, False)
+            return []
+        # Only list directory content if it changed since last scan.
+        previous = context.known["rows"]["directories"].get(relative_path)
+        if ((previous is not None) and (previous[4] == mtime_ns) and (context.relist == False)):
+            names = context.scanner.filter(relative_path, context.known["children"].get(relative_path, []))
+        else:
+            try:
+                names = context.scanner.list_directories(relative_path)
+            except OSError as e:
+                logging.error("Directory listing failed : %s", e)
+                names = []
+        context.add_directory((relative_path, parent, depth, os.path.basename(relative_path), context.trusted_mtime(mtime_ns)), len(names), False)
+        self._flush(context, False)
+        # Recurse in sub-directories (top level branches are scanned in parallel).
+        if (depth == 0):
+            return names
+        if ((depth + 1) < self._depth_max):
+            for name in names:
+                self._scan(os.path.join(relative_path, name), (depth + 1), context)
+        return []
+
+    def _scan_species(self, relative_path: str, mtime_ns: int, context: "_ScanContext") -> bool:
+        # Local variables.
+        directory_path = self._to_absolute(relative_path)
+        previous = context.known["rows"]["species"].get(relative_path)
+        json_path = None
+        json_mtime_ns = None
+        image_path = None
+        species = Species()
+        # Check if the previous summary is still valid.
+        if ((previous is not None) and (previous[1] == mtime_ns) and (previous[2] is not None)):
+            try:
+                json_mtime_ns = os.stat(self._to_absolute(previous[2])).st_mtime_ns
+            except OSError:
+                json_mtime_ns = None
+            if (json_mtime_ns == previous[3]):
+                context.add("species", previous)
+                for name in context.known["identification_names"].get(relative_path, []):
+                    self._scan_identification(os.path.join(relative_path, name), relative_path, context)
+                return False
+        # Read species directory content.
+        try:
+            json_path, json_mtime_ns = self._find_json(directory_path, SPECIES_DATA_FILE_EXTENSION, SpeciesView.decode_json, species)
+            for f in sorted(os.listdir(directory_path)):
+                if (Path(f).suffix.lower() == Image.IMAGE_FILE_EXTENSION):
+                    image_path = os.path.join(directory_path, f)
+                    break
+            names = context.scanner.list_directories(relative_path)
+        except OSError as e:
+            logging.error("Species directory listing failed : %s", e)
+            names = []
+        changed = context.add("species", (relative_path,
+                                          context.trusted_mtime(mtime_ns),
+                                          None if (json_path is None) else self._to_relative(json_path),
+                                          None if (json_mtime_ns is None) else context.trusted_mtime(json_mtime_ns),
+                                          None if (image_path is None) else self._to_relative(image_path),
+                                          species.latin_name if (json_path is not None) else "",
+                                          species.common_name if (json_path is not None) else ""))
+        for name in names:
+            self._scan_identification(os.path.join(relative_path, name), relative_path, context)
+        return changed
+
+    def _scan_identification(self, relative_path: str, species_relative_path: str, context: "_ScanContext") -> None:
+        # Local variables.
+        directory_path = self._to_absolute(relative_path)
+        previous = context.known["rows"]["identifications"].get(relative_path)
+        identification = Identification()
+        # Read directory modification time.
+        try:
+            mtime_ns = os.stat(directory_path).st_mtime_ns
+        except OSError:
+            return
+        # Check if the previous summary is still valid.
+        if ((previous is not None) and (previous[2] == mtime_ns) and (previous[3] is not None)):
+            try:
+                json_mtime_ns = os.stat(self._to_absolute(previous[3])).st_mtime_ns
+            except OSError:
+                json_mtime_ns = None
+            if (json_mtime_ns == previous[4]):
+                context.add("identifications", previous)
+                return
+        # Read identification directory content.
+        try:
+            json_path, json_mtime_ns = self._find_json(directory_path, IDENTIFICATION_DATA_FILE_EXTENSION, IdentificationView.decode_json, identification)
+        except OSError as e:
+            logging.error("Identification directory listing failed : %s", e)
+            json_path, json_mtime_ns = (None, None)
+        context.add("identifications", (relative_path,
+                                        species_relative_path,
+                                        context.trusted_mtime(mtime_ns),
+                                        None if (json_path is None) else self._to_relative(json_path),
+                                        None if (json_mtime_ns is None) else context.trusted_mtime(json_mtime_ns),
+                                        identification.date_year,
+                                        identification.date_month,
+                                        identification.date_day,
+                                        identification.location_city))
+
+    def _load(self, relative_path: str = "") -> dict:
+        # Local variables.
+        known = {"rows": {"directories": {}, "species": {}, "identifications": {}}, "children": {}, "identification_names": {}}
+        where = ""
+        parameters = ()
+        # Restrict to a sub-tree.
+        if (relative_path != ""):
+            condition, parameters = self._sub_tree("path", relative_path)
+            where = " WHERE " + condition
+        # Directories and their children names.
+        for row in self._connection.execute("SELECT path, parent, depth, name, mtime_ns FROM directories" + where + " ORDER BY path", parameters):
+            known["rows"]["directories"][row[0]] = row
+            if (row[1] is not None):
+                known["children"].setdefault(row[1], []).append(row[3])
+        # Species summaries.
+        for row in self._connection.execute("SELECT path, mtime_ns, json_path, json_mtime_ns, image_path, latin_name, common_name FROM species" + where, parameters):
+            known["rows"]["species"][row[0]] = row
+        # Identification summaries.
+        for row in self._connection.execute("SELECT path, species_path, mtime_ns, json_path, json_mtime_ns, date_year, date_month, date_day, location_city FROM identifications" + where + " ORDER BY path", parameters):
+            known["rows"]["identifications"][row[0]] = row
+            known["identification_names"].setdefault(row[1], []).append(os.path.basename(row[0]))
+        return known
+
+    def _flush(self, context: "_ScanContext", force: bool) -> None:
+        # Wait for a complete batch.
+        if ((force == False) and (context.pending_count() < INDEX_BATCH_SIZE)):
+            return
+        # Insert new or modified entries.
+        with self._lock:
+            self._depth_counts = None
+            with self._connection:
+                for table, rows in context.pending.items():
+                    if (len(rows) > 0):
+                        placeholders = ", ".join("?" for _ in rows[0])
+                        self._connection.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", rows)
+        # Notify changed classification nodes.
+        nodes = []
+        for relative_path, depth, child_count in context.changed:
+            if ((depth > 0) and (depth < self._depth_max)):
+                species_row = context.rows["species"].get(relative_path)
+                nodes.append(IndexNode(path=self._to_absolute(relative_path), depth=depth, common_name=(species_row[6] if (species_row is not None) else ""), child_count=child_count))
+        context.clear_pending()
+        if (context.batch_callback is not None):
+            context.batch_callback(nodes, context.directory_count())
+
+    def _scan_branch(self, relative_path: str, context: "_ScanContext") -> None:
+        self._scan(relative_path, 1, context)
+        self._flush(context, True)
+
+    def update(self, batch_callback: Callable = None, is_cancelled: Callable = None) -> list:
+        # Local variables.
+        scanner = HerbariumScanner(self._data_directory_path, self._depth_max)
+        ignore_patterns = "\n".join(scanner.ignore_rules.patterns)
+        # Compare file system with previous index content.
+        with self._lock:
+            known = self._load()
+            row = self._connection.execute("SELECT value FROM settings WHERE key = 'ignore_patterns'").fetchone()
+        # Cached listings are not valid anymore if ignore rules changed.
+        context = _ScanContext(known, time.time_ns(), scanner, ((row is None) or (row[0] != ignore_patterns)), batch_callback, is_cancelled)
+        names = self._scan("", 0, context)
+        self._flush(context, True)
+        # Scan top level branches in parallel.
+        contexts = [context] + [context.branch() for _ in names]
+        scanner.fan_out(lambda arguments: self._scan_branch(*arguments), [(name, contexts[i + 1]) for i, name in enumerate(names)])
+        # Entries can only be removed after a complete scan.
+        if context.is_cancelled():
+            return None
+        removed = self._sweep(known, contexts)
+        with self._lock:
+            with self._connection:
+                self._connection.execute("INSERT OR REPLACE INTO settings VALUES ('ignore_patterns', ?)", (ignore_patterns,))
+        return removed
+
+    def _sweep(self, known: dict, contexts: list) -> list:
+        # Local variables.
+        removed = []
+        # Delete entries which have not been found by the scan.
+        with self._lock:
+            self._depth_counts = None
+            with self._connection:
+                for table in known["rows"]:
+                    rows = set()
+                    for context in contexts:
+                        rows.update(context.rows[table])
+                    vanished = [p for p in known["rows"][table] if p not in rows]
+                    self._connection.executemany(f"DELETE FROM {table} WHERE path = ?", [(p,) for p in vanished])
+                    if (table == "directories"):
+                        removed = [self._to_absolute(p) for p in vanished if (known["rows"][table][p][2] > 0)]
+        return removed
+
+    def update_directories(self, directory_paths: list) -> tuple:
+        # Local variables.
+        nodes = []
+        removed = []
+        scanner = HerbariumScanner(self._data_directory_path, self._depth_max)
+        # Update each modified sub-tree only.
+        for directory_path in directory_paths:
+            relative_path = self._to_relative(directory_path)
+            if (relative_path.startswith(os.pardir) or (os.path.isdir(directory_path) == False)):
+                continue
+            depth = 0 if (relative_path == "") else len(relative_path.split(os.sep))
+            if (depth >= self._depth_max):
+                continue
+            with self._lock:
+                known = self._load(relative_path)
+            context = _ScanContext(known, time.time_ns(), scanner, False, lambda batch, directory_count: nodes.extend(batch), None)
+            for name in self._scan(relative_path, depth, context):
+                self._scan(os.path.join(relative_path, name), 1, context)
+            self._flush(context, True)
+            removed.extend(self._sweep(known, [context]))
+        return (nodes, removed)
+
+    def get_nodes(self) -> list:
+        # Local variables.
+        nodes = []
+        # Classification directories sorted by path.
+        with self._lock:
+            rows = self._connection.execute("SELECT d.path, d.depth, s.common_name FROM directories d LEFT JOIN species s ON s.path = d.path "
+                                            "WHERE d.depth > 0 AND d.depth < ? ORDER BY d.path", (self._depth_max,)).fetchall()
+        for row in rows:
+            nodes.append(IndexNode(path=self._to_absolute(row[0]), depth=row[1], common_name=(row[2] or "")))
+        return nodes
+
+    def get_children(self, directory_path: str) -> list:
+        # Local variables.
+        nodes = []
+        # Direct sub-directories sorted by name.
+        with self._lock:
+            rows = self._connection.execute("SELECT d.path, d.depth, s.common_name, (SELECT COUNT(*) FROM directories c WHERE c.parent = d.path) "
+                                            "FROM directories d LEFT JOIN species s ON s.path = d.path WHERE d.parent = ? ORDER BY d.path",
+                                            (self._to_relative(directory_path),)).fetchall()
+        for row in rows:
+            nodes.append(IndexNode(path=self._to_absolute(row[0]), depth=row[1], common_name=(row[2] or ""), child_count=row[3]))
+        return nodes
+
+    def add_directory(self, directory_path: str, species: Species = None) -> list:
+        # Local variables.
+        nodes = []
+        relative_path = self._to_relative(directory_path)
+        parts = relative_path.split(os.sep)
+        # Insert directory and its missing ancestors, the content will be read by the next scan.
+        with self._lock:
+            with self._connection:
+                for depth in range(1, min(len(parts), (self._depth_max - 1)) + 1):
+                    path = os.sep.join(parts[:depth])
+                    exists = (self._connection.execute("SELECT 1 FROM directories WHERE path = ?", (path,)).fetchone() is not None)
+                    if (exists and (path != relative_path)):
+                        continue
+                    self._connection.execute("INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?)", (path, os.path.dirname(path), depth, parts[depth - 1], INDEX_MTIME_UNTRUSTED))
+                    common_name = ""
+                    if ((depth == self._species_depth) and (species is not None)):
+                        common_name = species.common_name
+                        self._connection.execute("INSERT OR REPLACE INTO species VALUES (?, ?, ?, ?, ?, ?, ?)", (path, INDEX_MTIME_UNTRUSTED, None, None, None, species.latin_name, species.common_name))
+                    if ((exists == False) and (self._depth_counts is not None)):
+                        self._depth_counts[depth] += 1
+                    nodes.append(IndexNode(path=self._to_absolute(path), depth=depth, common_name=common_name, child_count=(0 if (path == relative_path) else 1)))
+        return nodes
+
+    def rename_directory(self, directory_path: str, new_directory_path: str) -> IndexNode:
+        # Local variables.
+        relative_path = self._to_relative(directory_path)
+        new_relative_path = self._to_relative(new_directory_path)
+        # Rewrite paths of the whole sub-tree.
+        with self._lock:
+            with self._connection:
+                for table, columns in INDEX_PATH_COLUMNS.items():
+                    for column in columns:
+                        condition, parameters = self._sub_tree(column, relative_path)
+                        self._connection.execute(f"UPDATE {table} SET {column} = ? || substr({column}, ?) WHERE " + condition, (new_relative_path, (len(relative_path) + 1)) + parameters)
+                self._connection.execute("UPDATE directories SET name = ?, mtime_ns = ? WHERE path = ?", (os.path.basename(new_relative_path), INDEX_MTIME_UNTRUSTED, new_relative_path))
+            row = self._connection.execute("SELECT d.depth, s.common_name, (SELECT COUNT(*) FROM directories c WHERE c.parent = d.path) "
+                                           "FROM directories d LEFT JOIN species s ON s.path = d.path WHERE d.path = ?", (new_relative_path,)).fetchone()
+        if (row is None):
+            return None
+        return IndexNode(path=new_directory_path, depth=row[0], common_name=(row[1] or ""), child_count=row[2])
+
+    def remove_directory(self, directory_path: str) -> None:
+        # Local variables.
+        relative_path = self._to_relative(directory_path)
+        # Delete the whole sub-tree.
+        with self._lock:
+            with self._connection:
+                condition, parameters = self._sub_tree("path", relative_path)
+                if (self._depth_counts is not None):
+                    for depth, count in self._connection.execute("SELECT depth, COUNT(*) FROM directories WHERE " + condition + " GROUP BY depth", parameters).fetchall():
+                        if (depth < self._depth_max):
+                            self._depth_counts[depth] -= count
+                for table in INDEX_PATH_COLUMNS:
+                    self._connection.execute(f"DELETE FROM {table} WHERE " + condition, parameters)
+
+    def get_directory_paths(self, depth_max: int, directory_path: str = None) -> list:
+        # Local variables.
+        condition, parameters = ("1", ())
+        # Directories above the given depth, optionally restricted to a sub-tree.
+        if (directory_path is not None):
+            condition, parameters = self._sub_tree("path", self._to_relative(directory_path))
+        with self._lock:
+            rows = self._connection.execute("SELECT path FROM directories WHERE depth < ? AND " + condition + " ORDER BY path", (depth_max,) + parameters).fetchall()
+        return [self._to_absolute(row[0]) for row in rows]
+
+    def get_depth_counts(self) -> list:
+        # Count directories per depth (cached until the next scan writes).
+        with self._lock:
+            if (self._depth_counts is None):
+                self._depth_counts = [0] * self._depth_max
+                for depth, count in self._connection.execute("SELECT depth, COUNT(*) FROM directories GROUP BY depth").fetchall():
+                    if (depth < self._depth_max):
+                        self._depth_counts[depth] = count
+            return list(self._depth_counts)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,243 @@
+"""
+* journal.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import atexit
+import json
+import logging
+import os
+
+from typing import Any
+
+from gui.json_codec import JsonCodec
+from gui.persistence import PersistenceQueue
+
+### JOURNAL macros ###
+
+JOURNAL_FILE = ".journal.jsonl"
+JOURNAL_COMPACTION_ENTRIES = 64
+JOURNAL_FLUSH_TIMEOUT_S = 10.0
+JOURNAL_TYPE_EDIT = "edit"
+JOURNAL_TYPE_UNDO = "undo"
+JOURNAL_TYPE_REDO = "redo"
+
+### JOURNAL classes ###
+
+"""
+* EditJournal
+* Append-only journal of the field modifications of a workspace, JSON files are only rewritten when the journal is compacted.
+"""
+class EditJournal:
+
+    _default = None
+
+    def __init__(self, directory_path: str, codecs: dict) -> None:
+        # Init context (codecs are (codec, record factory) tuples indexed by codec name).
+        self.directory_path = directory_path
+        self.journal_path = os.path.join(directory_path, JOURNAL_FILE)
+        self.entry_count = 0
+        self._codecs = codecs
+        self._staged = {}
+        self._undo_stack = []
+        self._redo_stack = []
+        self._journal_file = None
+        # Apply the entries which have not been compacted (previous session has not been closed properly).
+        self.recover()
+        self._journal_file = open(self.journal_path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def open(directory_path: str, codecs: dict) -> "EditJournal":
+        # Journal of the workspace used by the views.
+        if (EditJournal._default is not None):
+            EditJournal._default.close()
+        else:
+            atexit.register(EditJournal._close_default)
+        EditJournal._default = EditJournal(directory_path, codecs)
+        return EditJournal._default
+
+    @staticmethod
+    def get_default() -> "EditJournal":
+        return EditJournal._default
+
+    @staticmethod
+    def _close_default() -> None:
+        if (EditJournal._default is not None):
+            EditJournal._default.close()
+
+    def _to_relative(self, json_path: str) -> str:
+        # Journal remains valid if the workspace is moved.
+        return os.path.relpath(json_path, self.directory_path)
+
+    def _to_absolute(self, relative_path: str) -> str:
+        return os.path.join(self.directory_path, relative_path)
+
+    @staticmethod
+    def _is_inside(relative_path: str, relative_directory_path: str) -> bool:
+        return ((relative_path == relative_directory_path) or relative_path.startswith(relative_directory_path + os.sep))
+
+    def _append(self, entry: dict) -> None:
+        # One line per entry, durable before the edition is acknowledged.
+        self._journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal_file.flush()
+        os.fsync(self._journal_file.fileno())
+        self.entry_count += 1
+
+    def _read(self, entry: dict) -> Any:
+        # Current content of the file (staged content first).
+        codec, factory = self._codecs[entry["codec"]]
+        return codec.load(self._to_absolute(entry["path"]), factory())
+
+    def _apply(self, entry: dict, side: int, record: Any) -> str:
+        # Local variables.
+        json_path = self._to_absolute(entry["path"])
+        codec = self._codecs[entry["codec"]][0]
+        # Set old (side 0) or new (side 1) values.
+        for attribute, values in entry["changes"].items():
+            if (attribute in codec.attributes):
+                setattr(record, attribute, values[side])
+        # New content is visible to readers until it is compacted.
+        content = codec.dumps(record)
+        self._staged[json_path] = content
+        PersistenceQueue.get_default().stage(json_path, content)
+        return json_path
+
+    def record(self, json_path: str, codec: JsonCodec, previous_values: dict, record: Any) -> bool:
+        # Local variables.
+        current_values = codec.snapshot(record)
+        changes = {attribute: [previous_values[attribute], value] for attribute, value in current_values.items() if (value != previous_values.get(attribute))}
+        # Check modifications.
+        if (len(changes) == 0):
+            return False
+        entry = {"type": JOURNAL_TYPE_EDIT, "codec": codec.name, "path": self._to_relative(json_path), "changes": changes}
+        self._append(entry)
+        self._apply(entry, 1, record)
+        # New edition clears the redo history.
+        self._undo_stack.append(entry)
+        self._redo_stack = []
+        self._compact_if_needed()
+        return True
+
+    def can_undo(self) -> bool:
+        return (len(self._undo_stack) > 0)
+
+    def can_redo(self) -> bool:
+        return (len(self._redo_stack) > 0)
+
+    def _walk(self, source: list, target: list, entry_type: str, side: int) -> str:
+        # Check history.
+        if (len(source) == 0):
+            return None
+        entry = source[-1]
+        # File is read before journaling so that a removed file does not corrupt the history (its entry is dropped).
+        try:
+            record = self._read(entry)
+        except (OSError, ValueError):
+            source.pop()
+            raise
+        # Values are journaled as a new entry so that a replay gives the same result.
+        self._append({"type": entry_type, "codec": entry["codec"], "path": entry["path"], "changes": entry["changes"]})
+        target.append(source.pop())
+        json_path = self._apply(entry, side, record)
+        self._compact_if_needed()
+        return json_path
+
+    def undo(self) -> str:
+        # Restore previous values of the last edition (path of the modified file is returned).
+        return self._walk(self._undo_stack, self._redo_stack, JOURNAL_TYPE_UNDO, 0)
+
+    def redo(self) -> str:
+        return self._walk(self._redo_stack, self._undo_stack, JOURNAL_TYPE_REDO, 1)
+
+    def rename_directory(self, directory_path: str, new_directory_path: str) -> None:
+        # Local variables.
+        old_prefix = self._to_relative(directory_path)
+        new_prefix = self._to_relative(new_directory_path)
+        # History follows the renamed files (journal is compacted before, entries only remain in the stacks).
+        for stack in [self._undo_stack, self._redo_stack]:
+            for index, entry in enumerate(stack):
+                if EditJournal._is_inside(entry["path"], old_prefix):
+                    stack[index] = dict(entry, path=(new_prefix + entry["path"][len(old_prefix):]))
+
+    def remove_directory(self, directory_path: str) -> None:
+        # Local variables.
+        prefix = self._to_relative(directory_path)
+        # Edits of removed files cannot be undone anymore.
+        self._undo_stack = [entry for entry in self._undo_stack if (not EditJournal._is_inside(entry["path"], prefix))]
+        self._redo_stack = [entry for entry in self._redo_stack if (not EditJournal._is_inside(entry["path"], prefix))]
+
+    def recover(self) -> int:
+        # Local variables.
+        entries = []
+        # Read journal (a line interrupted by a crash is ignored).
+        if (not os.path.isfile(self.journal_path)):
+            return 0
+        with open(self.journal_path, 'r', encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logging.warning("Incomplete journal entry ignored : %s", line.strip())
+        # Replay entries in order and rebuild the history.
+        for entry in entries:
+            try:
+                if (entry["type"] == JOURNAL_TYPE_UNDO):
+                    self._apply(entry, 0, self._read(entry))
+                    self._redo_stack.append(self._undo_stack.pop())
+                else:
+                    self._apply(entry, 1, self._read(entry))
+                    if (entry["type"] == JOURNAL_TYPE_REDO):
+                        self._undo_stack.append(self._redo_stack.pop())
+                    else:
+                        self._undo_stack.append(entry)
+                        self._redo_stack = []
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logging.error("Journal entry replay failed : %s", e)
+        # Fold recovered entries in the JSON files.
+        if (len(entries) > 0):
+            logging.warning("%d journal entries recovered", len(entries))
+        self.compact()
+        return len(entries)
+
+    def _compact_if_needed(self) -> None:
+        if (self.entry_count >= JOURNAL_COMPACTION_ENTRIES):
+            self.compact()
+
+    def compact(self) -> bool:
+        # Local variables.
+        persistence_queue = PersistenceQueue.get_default()
+        # Write the staged files.
+        for json_path, content in self._staged.items():
+            persistence_queue.write(json_path, content)
+        persistence_queue.flush(timeout=JOURNAL_FLUSH_TIMEOUT_S)
+        # Journal is kept as long as a file has not been written (replay is idempotent).
+        failed_paths = [json_path for json_path in self._staged if ((persistence_queue.read(json_path) is not None) or persistence_queue.has_failed(json_path))]
+        if (len(failed_paths) > 0):
+            logging.error("Journal compaction failed, entries are kept")
+            # Journaled content is still the reference for readers (written again on next compaction).
+            for json_path in failed_paths:
+                if (persistence_queue.read(json_path) is None):
+                    persistence_queue.stage(json_path, self._staged[json_path])
+            return False
+        self._staged = {}
+        if (self._journal_file is not None):
+            self._journal_file.truncate(0)
+            os.fsync(self._journal_file.fileno())
+        elif os.path.isfile(self.journal_path):
+            os.remove(self.journal_path)
+        self.entry_count = 0
+        return True
+
+    def close(self) -> None:
+        # Fold entries in the JSON files.
+        if (self._journal_file is None):
+            return
+        compacted = self.compact()
+        self._journal_file.close()
+        self._journal_file = None
+        if (compacted == True):
+            os.remove(self.journal_path)
+        if (EditJournal._default is self):
+            EditJournal._default = None
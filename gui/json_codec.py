@@ -0,0 +1,220 @@
+"""
+* json_codec.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import argparse
+import json
+import os
+import time
+
+from typing import Any, Callable
+
+from gui.persistence import PersistenceQueue
+
+# Faster parser when installed (files are always written with the standard module to keep their format).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+### JSON CODEC macros ###
+
+JSON_CODEC_BACKEND = "json" if (orjson is None) else "orjson"
+JSON_CODEC_INDENT = 4
+
+### JSON CODEC functions ###
+
+def loads(content: bytes) -> Any:
+    return json.loads(content) if (orjson is None) else orjson.loads(content)
+
+def to_text(value: Any) -> str:
+    return "" if (value is None) else str(value)
+
+def to_number(value: Any) -> Any:
+    # Booleans are integers in Python but not valid numbers here.
+    if ((not isinstance(value, (int, float))) or isinstance(value, bool)):
+        raise TypeError(f"expected a number, got {type(value).__name__}")
+    return value
+
+### JSON CODEC classes ###
+
+"""
+* JsonSchemaError
+* Decoding error with the path of the faulty key.
+"""
+class JsonSchemaError(ValueError):
+
+    def __init__(self, path: str, message: str) -> None:
+        super().__init__(f"{path}: {message}")
+        self.path = path
+
+"""
+* JsonField
+* Schema of a value stored in an attribute of the record.
+"""
+class JsonField:
+
+    def __init__(self, key: str, attribute: str, converter: Callable = to_text, default: Any = "", required: bool = False) -> None:
+        self.key = key
+        self.attribute = attribute
+        self.converter = converter
+        self.default = default
+        self.required = required
+
+"""
+* JsonObject
+* Schema of a nested object.
+"""
+class JsonObject:
+
+    def __init__(self, key: str, children: list, required: bool = True) -> None:
+        self.key = key
+        self.children = children
+        self.required = required
+
+"""
+* JsonCodec
+* Single pass decoder and encoder compiled from a record schema.
+"""
+class JsonCodec:
+
+    def __init__(self, schema: JsonObject, name: str = None) -> None:
+        # Init context.
+        self.schema = schema
+        self.name = schema.key if (name is None) else name
+        # Compile schema once.
+        self.attributes = JsonCodec._list_attributes(schema)
+        self._decoder = JsonCodec._compile_decoder(JsonObject("", [schema]), "")
+        self._encoder = JsonCodec._compile_encoder(JsonObject("", [schema]))
+
+    @staticmethod
+    def _list_attributes(schema: JsonObject) -> list:
+        # Record attributes in schema order.
+        attributes = []
+        for child in schema.children:
+            attributes.extend(JsonCodec._list_attributes(child) if isinstance(child, JsonObject) else [child.attribute])
+        return attributes
+
+    @staticmethod
+    def _compile_decoder(schema: JsonObject, path: str) -> Callable:
+        # Local variables.
+        steps = []
+        # One step per child, nested objects are compiled recursively.
+        for child in schema.children:
+            child_path = child.key if (path == "") else (path + "." + child.key)
+            if isinstance(child, JsonObject):
+                steps.append((child.key, child.required, child_path, None, JsonCodec._compile_decoder(child, child_path)))
+            else:
+                steps.append((child.key, child.required, child_path, child, None))
+        def decode(mapping: Any, record: Any) -> None:
+            # Check type.
+            if (not isinstance(mapping, dict)):
+                raise JsonSchemaError(path if (path != "") else "<root>", f"expected an object, got {type(mapping).__name__}")
+            for key, required, child_path, field, decoder in steps:
+                # Missing keys take their default value.
+                if (key not in mapping):
+                    if (required == True):
+                        raise JsonSchemaError(child_path, "missing required key")
+                    if (field is not None):
+                        setattr(record, field.attribute, field.default)
+                    else:
+                        decoder({}, record)
+                    continue
+                value = mapping[key]
+                if (decoder is not None):
+                    decoder(value, record)
+                    continue
+                try:
+                    setattr(record, field.attribute, field.converter(value))
+                except (TypeError, ValueError) as e:
+                    raise JsonSchemaError(child_path, str(e))
+        return decode
+
+    @staticmethod
+    def _compile_encoder(schema: JsonObject) -> Callable:
+        # Local variables.
+        steps = []
+        # Keys are written in schema order.
+        for child in schema.children:
+            if isinstance(child, JsonObject):
+                steps.append((child.key, None, JsonCodec._compile_encoder(child)))
+            else:
+                steps.append((child.key, child.attribute, None))
+        def encode(record: Any) -> dict:
+            return {key: (encoder(record) if (encoder is not None) else getattr(record, attribute)) for key, attribute, encoder in steps}
+        return encode
+
+    def decode(self, data: Any, record: Any) -> Any:
+        self._decoder(data, record)
+        return record
+
+    def encode(self, record: Any) -> dict:
+        return self._encoder(record)
+
+    def snapshot(self, record: Any) -> dict:
+        # Values of the record attributes (to detect the fields modified by an edition).
+        return {attribute: getattr(record, attribute) for attribute in self.attributes}
+
+    def load(self, json_path: str, record: Any) -> Any:
+        # Read and parse file (content which is still being written is read from the persistence queue).
+        try:
+            content = PersistenceQueue.get_default().read(json_path)
+            if (content is None):
+                with open(json_path, 'rb') as json_file:
+                    content = json_file.read()
+            data = loads(content)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"{self.name.title()} JSON file decoding failed: {e}")
+        return self.decode(data, record)
+
+    def dumps(self, record: Any) -> str:
+        return json.dumps(self.encode(record), indent=JSON_CODEC_INDENT)
+
+    def save(self, json_path: str, record: Any) -> None:
+        # File is written atomically in background.
+        PersistenceQueue.get_default().write(json_path, self.dumps(record))
+
+### JSON CODEC main function ###
+
+def main() -> int:
+    # Local import to avoid a circular dependency with the views.
+    from gui.identification import Identification, IDENTIFICATION_CODEC
+    from gui.species import Species, SPECIES_CODEC
+    parser = argparse.ArgumentParser(description="Measure the parsing cost of the species and identification files of a workspace.")
+    parser.add_argument("directory", help="Workspace directory")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs (default: 5)")
+    args = parser.parse_args()
+    # Read files once, only the parsing is measured.
+    contents = {SPECIES_CODEC.name: [], IDENTIFICATION_CODEC.name: []}
+    for root, directories, files in os.walk(args.directory):
+        directories[:] = [d for d in directories if (not d.startswith("."))]
+        for f in files:
+            if f.endswith(".json"):
+                with open(os.path.join(root, f), 'rb') as json_file:
+                    content = json_file.read()
+                for name in contents:
+                    if (("\"" + name + "\"").encode() in content):
+                        contents[name].append(content)
+    print(f"Backend: {JSON_CODEC_BACKEND}")
+    for codec, factory in [(SPECIES_CODEC, Species), (IDENTIFICATION_CODEC, Identification)]:
+        files = contents[codec.name]
+        if (len(files) == 0):
+            continue
+        parsers = [("json.loads", json.loads), ("json + schema", lambda content: codec.decode(json.loads(content), factory()))]
+        if (orjson is not None):
+            parsers.append(("orjson + schema", lambda content: codec.decode(orjson.loads(content), factory())))
+        for name, parse in parsers:
+            durations = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                for content in files:
+                    parse(content)
+                durations.append(time.perf_counter() - start)
+            print(f"{codec.name:15s} {name:16s}: {len(files)} files, best {(min(durations) / len(files)) * 1e6:.1f} us/file")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -17,8 +17,10 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QPalette, QPixmap, QRadialGradient, QTransform)
 from PySide6.QtWidgets import (QApplication, QFrame, QGraphicsView, QGridLayout,
     QGroupBox, QHBoxLayout, QHeaderView, QLabel,
-    QMainWindow, QPushButton, QSizePolicy, QTreeWidget,
-    QTreeWidgetItem, QVBoxLayout, QWidget)
+    QMainWindow, QPushButton, QSizePolicy, QTreeView,
+    QVBoxLayout, QWidget)
+
+from gui.photo_viewer import PhotoViewer
 
 class Ui_MainWindow(object):
     def setupUi(self, MainWindow):
@@ -47,27 +49,22 @@ class Ui_MainWindow(object):
         self.classificationGroupBox.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.gridLayout_17 = QGridLayout(self.classificationGroupBox)
         self.gridLayout_17.setObjectName(u"gridLayout_17")
-        self.classificationTreeWidget = QTreeWidget(self.classificationGroupBox)
-        __qtreewidgetitem = QTreeWidgetItem()
-        __qtreewidgetitem.setText(0, u"R\u00e8gne");
-        self.classificationTreeWidget.setHeaderItem(__qtreewidgetitem)
-        self.classificationTreeWidget.setObjectName(u"classificationTreeWidget")
-        self.classificationTreeWidget.setAutoFillBackground(False)
-        self.classificationTreeWidget.setFrameShape(QFrame.Shape.StyledPanel)
-        self.classificationTreeWidget.setFrameShadow(QFrame.Shadow.Sunken)
-        self.classificationTreeWidget.setLineWidth(1)
-        self.classificationTreeWidget.setTextElideMode(Qt.TextElideMode.ElideRight)
-        self.classificationTreeWidget.setIndentation(0)
-        self.classificationTreeWidget.setSortingEnabled(False)
-        self.classificationTreeWidget.setWordWrap(True)
-        self.classificationTreeWidget.setColumnCount(7)
-        self.classificationTreeWidget.setSupportedDragActions(Qt.DropAction.IgnoreAction)
-        self.classificationTreeWidget.header().setCascadingSectionResizes(False)
-        self.classificationTreeWidget.header().setMinimumSectionSize(100)
-        self.classificationTreeWidget.header().setProperty(u"showSortIndicator", False)
-        self.classificationTreeWidget.header().setStretchLastSection(True)
-
-        self.gridLayout_17.addWidget(self.classificationTreeWidget, 0, 0, 1, 1)
+        self.classificationTreeView = QTreeView(self.classificationGroupBox)
+        self.classificationTreeView.setObjectName(u"classificationTreeView")
+        self.classificationTreeView.setAutoFillBackground(False)
+        self.classificationTreeView.setFrameShape(QFrame.Shape.StyledPanel)
+        self.classificationTreeView.setFrameShadow(QFrame.Shadow.Sunken)
+        self.classificationTreeView.setLineWidth(1)
+        self.classificationTreeView.setTextElideMode(Qt.TextElideMode.ElideRight)
+        self.classificationTreeView.setIndentation(0)
+        self.classificationTreeView.setSortingEnabled(False)
+        self.classificationTreeView.setWordWrap(True)
+        self.classificationTreeView.header().setCascadingSectionResizes(False)
+        self.classificationTreeView.header().setMinimumSectionSize(100)
+        self.classificationTreeView.header().setProperty(u"showSortIndicator", False)
+        self.classificationTreeView.header().setStretchLastSection(True)
+
+        self.gridLayout_17.addWidget(self.classificationTreeView, 0, 0, 1, 1)
 
         self.horizontalLayout_3 = QHBoxLayout()
         self.horizontalLayout_3.setObjectName(u"horizontalLayout_3")
@@ -161,12 +158,11 @@ class Ui_MainWindow(object):
 
         self.gridLayout_15.addWidget(self.speciesNameGroupBox, 0, 0, 1, 1)
 
-        self.speciesPhotoGraphicsView = QGraphicsView(self.speciesGroupBox)
+        self.speciesPhotoGraphicsView = PhotoViewer(self.speciesGroupBox)
         self.speciesPhotoGraphicsView.setObjectName(u"speciesPhotoGraphicsView")
         self.speciesPhotoGraphicsView.setMinimumSize(QSize(0, 0))
         self.speciesPhotoGraphicsView.setMaximumSize(QSize(16777215, 16777215))
         self.speciesPhotoGraphicsView.setFrameShape(QFrame.Shape.Panel)
-        self.speciesPhotoGraphicsView.setInteractive(False)
         self.speciesPhotoGraphicsView.setRenderHints(QPainter.RenderHint.LosslessImageRendering|QPainter.RenderHint.SmoothPixmapTransform|QPainter.RenderHint.TextAntialiasing)
         self.speciesPhotoGraphicsView.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
 
@@ -300,6 +296,11 @@ class Ui_MainWindow(object):
 
         self.horizontalLayout_2.addWidget(self.speciesOpenDirectoryPushButton)
 
+        self.speciesGalleryPushButton = QPushButton(self.speciesGroupBox)
+        self.speciesGalleryPushButton.setObjectName(u"speciesGalleryPushButton")
+
+        self.horizontalLayout_2.addWidget(self.speciesGalleryPushButton)
+
         self.speciesEditPushButton = QPushButton(self.speciesGroupBox)
         self.speciesEditPushButton.setObjectName(u"speciesEditPushButton")
 
@@ -334,7 +335,7 @@ class Ui_MainWindow(object):
 
         self.gridLayout_3.addWidget(self.identificationPhotosPreviousPushButton, 0, 0, 1, 1)
 
-        self.identificationPhotosGraphicsView = QGraphicsView(self.identificationPhotosGroupBox)
+        self.identificationPhotosGraphicsView = PhotoViewer(self.identificationPhotosGroupBox)
         self.identificationPhotosGraphicsView.setObjectName(u"identificationPhotosGraphicsView")
 
         self.gridLayout_3.addWidget(self.identificationPhotosGraphicsView, 0, 1, 1, 1)
@@ -488,13 +489,6 @@ class Ui_MainWindow(object):
     def retranslateUi(self, MainWindow):
         MainWindow.setWindowTitle(QCoreApplication.translate("MainWindow", u"MainWindow", None))
         self.classificationGroupBox.setTitle(QCoreApplication.translate("MainWindow", u"CLASSIFICATION", None))
-        ___qtreewidgetitem = self.classificationTreeWidget.headerItem()
-        ___qtreewidgetitem.setText(6, QCoreApplication.translate("MainWindow", u"Esp\u00e8ce", None));
-        ___qtreewidgetitem.setText(5, QCoreApplication.translate("MainWindow", u"Genre", None));
-        ___qtreewidgetitem.setText(4, QCoreApplication.translate("MainWindow", u"Famille", None));
-        ___qtreewidgetitem.setText(3, QCoreApplication.translate("MainWindow", u"Ordre", None));
-        ___qtreewidgetitem.setText(2, QCoreApplication.translate("MainWindow", u"Classe", None));
-        ___qtreewidgetitem.setText(1, QCoreApplication.translate("MainWindow", u"Division", None));
         self.workspaceEditPushButton.setText(QCoreApplication.translate("MainWindow", u"Dossier de travail", None))
         self.workspaceContentLabel.setText(QCoreApplication.translate("MainWindow", u"<html><head/><body><p><br/></p></body></html>", None))
         self.classificationAddSpeciesPushButton.setText(QCoreApplication.translate("MainWindow", u"Ajouter une esp\u00e8ce", None))
@@ -524,6 +518,7 @@ class Ui_MainWindow(object):
         self.speciesRefChampignonsContentLabel.setText("")
         self.speciesRefGuide700PlantesLabel.setText(QCoreApplication.translate("MainWindow", u"<html><head/><body><p><span style=\" font-weight:700; color:#3584e4;\">Guide 700 Plantes</span></p></body></html>", None))
         self.speciesOpenDirectoryPushButton.setText(QCoreApplication.translate("MainWindow", u"Ouvrir dossier", None))
+        self.speciesGalleryPushButton.setText(QCoreApplication.translate("MainWindow", u"Galerie", None))
         self.speciesEditPushButton.setText(QCoreApplication.translate("MainWindow", u"Editer", None))
         self.identificationGroupBox.setTitle(QCoreApplication.translate("MainWindow", u"IDENTIFICATIONS", None))
         self.identificationPhotosGroupBox.setTitle(QCoreApplication.translate("MainWindow", u"Photos", None))
@@ -0,0 +1,170 @@
+"""
+* persistence.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import atexit
+import logging
+import os
+import threading
+
+### PERSISTENCE macros ###
+
+PERSISTENCE_TEMPORARY_FILE_SUFFIX = ".tmp"
+PERSISTENCE_DEFAULT_LOCK = threading.Lock()
+# Failed writes are retried with a doubled delay before being reported.
+PERSISTENCE_WRITE_RETRIES = 3
+PERSISTENCE_RETRY_DELAY_S = 0.5
+
+### PERSISTENCE functions ###
+
+def write_atomic(file_path: str, content: str) -> None:
+    # Local variables.
+    directory_path = os.path.dirname(os.path.abspath(file_path))
+    temporary_path = os.path.join(directory_path, "." + os.path.basename(file_path) + PERSISTENCE_TEMPORARY_FILE_SUFFIX)
+    # Readers see either the previous or the new file, never a partial one.
+    with open(temporary_path, 'w', encoding='utf-8') as temporary_file:
+        temporary_file.write(content)
+        temporary_file.flush()
+        os.fsync(temporary_file.fileno())
+    os.replace(temporary_path, file_path)
+    # Make the rename itself durable (not supported on all platforms).
+    try:
+        directory_fd = os.open(directory_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+### PERSISTENCE classes ###
+
+"""
+* PersistenceQueue
+* Background writer of the JSON files, repeated writes of the same file are merged and pending content is served to readers.
+"""
+class PersistenceQueue:
+
+    _default = None
+
+    def __init__(self) -> None:
+        # Init context.
+        self.write_count = 0
+        self.merge_count = 0
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._overlay = {}
+        self._writing = None
+        self._written_mtimes = {}
+        self._failed = {}
+        self._failure_callbacks = []
+        # Start writer thread.
+        self._thread = threading.Thread(target=self._run, name="persistence", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def get_default() -> "PersistenceQueue":
+        # A second queue would have its own writer thread and overlay.
+        with PERSISTENCE_DEFAULT_LOCK:
+            if (PersistenceQueue._default is None):
+                PersistenceQueue._default = PersistenceQueue()
+                # Pending writes are never lost on a normal exit.
+                atexit.register(PersistenceQueue._default.flush)
+        return PersistenceQueue._default
+
+    def write(self, file_path: str, content: str) -> None:
+        # Only the last content of a file is written.
+        with self._condition:
+            if (self._pending.pop(file_path, None) is not None):
+                self.merge_count += 1
+            self._pending[file_path] = content
+            self._overlay[file_path] = content
+            self._condition.notify_all()
+
+    def stage(self, file_path: str, content: str) -> None:
+        # Content served to readers but written later by an explicit write.
+        with self._condition:
+            self._overlay[file_path] = content
+
+    def read(self, file_path: str) -> str:
+        # Content which is not on disk yet (None if the file is up to date).
+        with self._condition:
+            return self._overlay.get(file_path)
+
+    def get_written_mtime(self, path: str) -> int:
+        # Modification time of a file (or of its directory) after the last write of the queue, to ignore own writes when watching.
+        with self._condition:
+            return self._written_mtimes.get(path)
+
+    def has_failed(self, file_path: str) -> bool:
+        # Last content of the file could not be written (it is not served to readers anymore).
+        with self._condition:
+            return (file_path in self._failed)
+
+    def add_failure_callback(self, callback) -> None:
+        # Callback is called from the writer thread with the path and the error message.
+        with self._condition:
+            self._failure_callbacks.append(callback)
+
+    def remove_failure_callback(self, callback) -> None:
+        with self._condition:
+            if (callback in self._failure_callbacks):
+                self._failure_callbacks.remove(callback)
+
+    def flush(self, file_path: str = None, timeout: float = None) -> bool:
+        # Wait for the given file (all files by default) to be written.
+        with self._condition:
+            if (file_path is None):
+                return self._condition.wait_for(lambda: ((len(self._pending) == 0) and (self._writing is None)), timeout)
+            return self._condition.wait_for(lambda: ((file_path not in self._pending) and (self._writing != file_path)), timeout)
+
+    def _run(self) -> None:
+        while True:
+            # Wait for the next file.
+            with self._condition:
+                self._condition.wait_for(lambda: (len(self._pending) > 0))
+                file_path = next(iter(self._pending))
+                content = self._pending.pop(file_path)
+                self._writing = file_path
+            mtimes = {}
+            error = None
+            delay = PERSISTENCE_RETRY_DELAY_S
+            for attempt in range(PERSISTENCE_WRITE_RETRIES + 1):
+                try:
+                    write_atomic(file_path, content)
+                    self.write_count += 1
+                    for path in [file_path, (os.path.dirname(file_path) or ".")]:
+                        mtimes[path] = os.stat(path).st_mtime_ns
+                    error = None
+                    break
+                except OSError as e:
+                    error = e
+                    logging.warning("JSON file writing failed (attempt %d) : %s", (attempt + 1), e)
+                # Wait before retrying, newer content of the file replaces the failed one.
+                with self._condition:
+                    if ((attempt == PERSISTENCE_WRITE_RETRIES) or self._condition.wait_for(lambda: (file_path in self._pending), delay)):
+                        break
+                delay *= 2
+            # File on disk is now the reference unless it has been modified again in the meantime.
+            with self._condition:
+                self._writing = None
+                self._written_mtimes.update(mtimes)
+                superseded = ((file_path in self._pending) or (self._overlay.get(file_path) is not content))
+                if (error is None):
+                    self._failed.pop(file_path, None)
+                elif (superseded == False):
+                    self._failed[file_path] = str(error)
+                # Content which could not be written is not served as if it had been saved either.
+                if (superseded == False):
+                    del self._overlay[file_path]
+                callbacks = list(self._failure_callbacks) if ((superseded == False) and (error is not None)) else []
+                self._condition.notify_all()
+            if (len(callbacks) > 0):
+                logging.error("JSON file writing failed, %s is not up to date : %s", file_path, error)
+            for callback in callbacks:
+                callback(file_path, str(error))
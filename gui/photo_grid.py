@@ -0,0 +1,219 @@
+"""
+* photo_grid.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import os
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QObject, QPoint, QSize, QThreadPool, QTimer, Qt
+from PySide6.QtGui import QColor, QImage, QPixmap, QResizeEvent
+from PySide6.QtWidgets import QDialog, QListView, QVBoxLayout, QWidget
+
+from gui.cache import LruCache
+from gui.image import Image
+from gui.image_loader import pixmap_size_bytes
+from gui.worker import Worker
+
+### PHOTO GRID macros ###
+
+PHOTO_GRID_PATH_ROLE = Qt.UserRole
+PHOTO_GRID_ICON_SIZE = 160
+PHOTO_GRID_SPACING = 8
+PHOTO_GRID_CACHE_MAX_BYTES = (64 * 1024 * 1024)
+PHOTO_GRID_THREADS = 2
+PHOTO_GRID_SCROLL_DEBOUNCE_MS = 50
+PHOTO_GRID_LAYOUT_BATCH_SIZE = 200
+# Rows kept loading around the visible area.
+PHOTO_GRID_MARGIN_ROWS = 20
+
+### PHOTO GRID functions ###
+
+def _load_thumbnail(worker: Worker, image_path: str, size: QSize) -> QImage:
+    # Check if the cell is still visible.
+    if (worker.is_cancelled() == True):
+        return None
+    return Image.read(image_path, size)
+
+### PHOTO GRID classes ###
+
+"""
+* PhotoGridModel
+* List model of photos, thumbnails are decoded in background when a cell is painted for the first time.
+"""
+class PhotoGridModel(QAbstractListModel):
+
+    def __init__(self, photos: list, icon_size: int = PHOTO_GRID_ICON_SIZE, parent: QObject = None) -> None:
+        # Init parent.
+        super().__init__(parent)
+        # Init context (photos are (path, label) tuples).
+        self._photos = list(photos)
+        self._rows = {photo[0]: row for row, photo in enumerate(self._photos)}
+        self._size = QSize(icon_size, icon_size)
+        self._pixmaps = LruCache(PHOTO_GRID_CACHE_MAX_BYTES, weigher=pixmap_size_bytes)
+        self._workers = {}
+        self._running_workers = set()
+        self._placeholder = QPixmap(self._size)
+        self._placeholder.fill(QColor(Qt.lightGray))
+        # Dedicated pool so that the grid never delays the photo viewers.
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(PHOTO_GRID_THREADS)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._photos)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> object:
+        # Check index.
+        if ((not index.isValid()) or (index.row() >= len(self._photos))):
+            return None
+        # Local variables.
+        image_path, label = self._photos[index.row()]
+        # Read item content.
+        if (role == Qt.DisplayRole):
+            return label
+        if (role == Qt.ToolTipRole):
+            return os.path.basename(image_path)
+        if (role == PHOTO_GRID_PATH_ROLE):
+            return image_path
+        if (role == Qt.DecorationRole):
+            # Only painted cells ask for their thumbnail.
+            pixmap = self._pixmaps.get(image_path)
+            if (pixmap is None):
+                self._request(image_path)
+                return self._placeholder
+            return pixmap
+        return None
+
+    def _request(self, image_path: str) -> None:
+        # Check if the thumbnail is already loading.
+        if (image_path in self._workers):
+            return
+        worker = Worker(_load_thumbnail, image_path, self._size)
+        worker.signals.finished.connect(lambda image, image_path=image_path, worker=worker: self._loaded_callback(image_path, worker, image))
+        worker.signals.failed.connect(lambda error, image_path=image_path, worker=worker: self._loaded_callback(image_path, worker, None))
+        self._workers[image_path] = worker
+        self._running_workers.add(worker)
+        self._thread_pool.start(worker)
+
+    def _loaded_callback(self, image_path: str, worker: Worker, image: QImage) -> None:
+        # Forget worker.
+        self._running_workers.discard(worker)
+        if (self._workers.get(image_path) is worker):
+            self._workers.pop(image_path)
+        # Keep thumbnail and repaint the cell (failed photos keep the placeholder).
+        if ((worker.is_cancelled() == True) or (image is None) or image.isNull()):
+            return
+        self._pixmaps.put(image_path, QPixmap.fromImage(image))
+        index = self.index(self._rows[image_path])
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def _cancel(self, image_path: str) -> None:
+        # Queued workers are simply removed, running ones are kept alive until they finish.
+        worker = self._workers.pop(image_path)
+        worker.cancel()
+        if (self._thread_pool.tryTake(worker) == True):
+            self._running_workers.discard(worker)
+
+    def set_visible_rows(self, first_row: int, last_row: int) -> None:
+        # Cancel thumbnails which have been scrolled away.
+        for image_path in list(self._workers):
+            row = self._rows[image_path]
+            if ((row < (first_row - PHOTO_GRID_MARGIN_ROWS)) or (row > (last_row + PHOTO_GRID_MARGIN_ROWS))):
+                self._cancel(image_path)
+
+    def clear(self) -> None:
+        # Cancel everything and release memory.
+        for image_path in list(self._workers):
+            self._cancel(image_path)
+        self._thread_pool.waitForDone()
+        self._running_workers = set()
+        self._pixmaps.clear()
+
+"""
+* PhotoGridView
+* Icon mode list view which reports its visible rows to the photo grid model.
+"""
+class PhotoGridView(QListView):
+
+    def __init__(self, parent: QWidget = None) -> None:
+        # Init parent.
+        super().__init__(parent)
+        # Uniform cells laid out in batches keep scrolling smooth on large lists.
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(PHOTO_GRID_LAYOUT_BATCH_SIZE)
+        self.setIconSize(QSize(PHOTO_GRID_ICON_SIZE, PHOTO_GRID_ICON_SIZE))
+        self.setSpacing(PHOTO_GRID_SPACING)
+        self.setSelectionMode(QListView.SingleSelection)
+        self.setEditTriggers(QListView.NoEditTriggers)
+        # Wait for the scrolling to settle.
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(PHOTO_GRID_SCROLL_DEBOUNCE_MS)
+        self._timer.timeout.connect(self._update_visible_rows)
+        self.verticalScrollBar().valueChanged.connect(self._timer.start)
+
+    def _row_at(self, y_positions: range) -> int:
+        # First cell found along the left column (positions can fall between cells).
+        for y in y_positions:
+            index = self.indexAt(QPoint((PHOTO_GRID_SPACING + 1), y))
+            if index.isValid():
+                return index.row()
+        return None
+
+    def _update_visible_rows(self) -> None:
+        # Local variables.
+        model = self.model()
+        height = self.viewport().height()
+        # Rows of the first and last visible cells.
+        if (not isinstance(model, PhotoGridModel)):
+            return
+        first_row = self._row_at(range(0, height, PHOTO_GRID_SPACING))
+        last_row = self._row_at(range((height - 1), -1, -PHOTO_GRID_SPACING))
+        if ((first_row is None) or (last_row is None)):
+            return
+        # Last visible line is complete.
+        column_count = (self.viewport().width() // max(1, self.visualRect(model.index(first_row)).width()))
+        model.set_visible_rows(first_row, (last_row + column_count))
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        super().resizeEvent(event)
+        self._timer.start()
+
+"""
+* PhotoGalleryWindow
+* Graphic class showing all photos of a species, a double click selects a photo.
+"""
+class PhotoGalleryWindow(QDialog):
+
+    def __init__(self, title: str, photos: list, parent: QWidget = None) -> None:
+        # Init parent.
+        super().__init__(parent)
+        # Init context.
+        self._selected_image_path = None
+        self._model = PhotoGridModel(photos, parent=self)
+        # Setup window.
+        self.setWindowTitle(title + " (" + str(len(photos)) + " photos)")
+        self.resize(900, 700)
+        self._view = PhotoGridView(self)
+        self._view.setModel(self._model)
+        self._view.activated.connect(self._activated_callback)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._view)
+
+    def _activated_callback(self, index: QModelIndex) -> None:
+        # Close window on the selected photo.
+        self._selected_image_path = index.data(PHOTO_GRID_PATH_ROLE)
+        self.accept()
+
+    def get_selected_image_path(self) -> str:
+        return self._selected_image_path
+
+    def done(self, result: int) -> None:
+        # Release thumbnails.
+        self._model.clear()
+        super().done(result)
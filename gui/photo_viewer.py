@@ -0,0 +1,316 @@
+"""
+* photo_viewer.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import math
+import os
+
+from PySide6.QtCore import QPointF, QRect, QRectF, QSize, QThreadPool, QTimer, Qt
+from PySide6.QtGui import QImage, QImageIOHandler, QImageReader, QMouseEvent, QPainter, QPixmap, QResizeEvent, QWheelEvent
+from PySide6.QtWidgets import QGraphicsPixmapItem, QGraphicsScene, QGraphicsView, QWidget
+
+from gui.cache import LruCache
+from gui.exif import ExifIndex
+from gui.image import Image
+from gui.image_loader import ImageLoader, pixmap_size_bytes, transform_image, transformation_matrix
+from gui.worker import Worker
+
+### PHOTO VIEWER macros ###
+
+PHOTO_VIEWER_PLACEHOLDER_TEXT = "Chargement..."
+PHOTO_VIEWER_RESIZE_DEBOUNCE_MS = 200
+PHOTO_VIEWER_TILE_DEBOUNCE_MS = 50
+PHOTO_VIEWER_ZOOM_STEP = 1.25
+PHOTO_VIEWER_ZOOM_MAX = 4.0
+PHOTO_VIEWER_TILE_SIZE = 512
+PHOTO_VIEWER_TILE_LEVEL_MAX = 8
+PHOTO_VIEWER_TILE_CACHE_MAX_BYTES = (64 * 1024 * 1024)
+PHOTO_VIEWER_TILE_THREADS = 2
+
+### PHOTO VIEWER functions ###
+
+def _decode_tile(worker: Worker, image_path: str, level: int, tile_rect: QRect, transformation: QImageIOHandler.Transformation) -> QImage:
+    # Check if the tile is still visible.
+    if (worker.is_cancelled() == True):
+        return None
+    # Tile area in the stored photo (orientation is applied to the decoded tile only).
+    reader = QImageReader(image_path)
+    reader.setAutoTransform(False)
+    matrix = transformation_matrix(transformation)
+    source_rect = tile_rect
+    if (not matrix.isIdentity()):
+        raw_size = reader.size()
+        source_rect = QImage.trueMatrix(matrix, raw_size.width(), raw_size.height()).inverted()[0].mapRect(QRectF(tile_rect)).toAlignedRect()
+    # Decode only the tile area, downscaled by the level factor.
+    reader.setClipRect(source_rect)
+    reader.setScaledSize(QSize(math.ceil(source_rect.width() / level), math.ceil(source_rect.height() / level)))
+    return transform_image(reader.read(), transformation)
+
+### PHOTO VIEWER classes ###
+
+"""
+* PhotoViewer
+* Graphics view displaying one photo with wheel zoom, drag pan and tiled rendering of the zoomed area.
+"""
+class PhotoViewer(QGraphicsView):
+
+    _tile_thread_pool = None
+
+    # Tiles shared by all viewers.
+    tile_cache = LruCache(PHOTO_VIEWER_TILE_CACHE_MAX_BYTES, weigher=pixmap_size_bytes)
+
+    def __init__(self, parent: QWidget = None) -> None:
+        # Init parent.
+        super().__init__(parent)
+        # Init context.
+        self._image_path = None
+        self._source_size = QSize()
+        self._transformation = QImageIOHandler.TransformationNone
+        self._tile_items = {}
+        self._tile_workers = {}
+        self._running_workers = set()
+        # Single scene and pixmap item reused for all photos.
+        self._scene = QGraphicsScene(self)
+        self._pixmap_item = self._scene.addPixmap(QPixmap())
+        self._pixmap_item.setTransformationMode(Qt.SmoothTransformation)
+        self._placeholder_item = self._scene.addText(PHOTO_VIEWER_PLACEHOLDER_TEXT)
+        self._placeholder_item.setVisible(False)
+        # Photos are decoded at the view size in background, after a fast low resolution version.
+        self._loader = ImageLoader(self, Image.read, Image.read_preview)
+        self._loader.loading.connect(self._loading_callback)
+        self._loader.loaded.connect(self._loaded_callback)
+        self._loader.failed.connect(self._failed_callback)
+        # Setup view (scroll bars would change the viewport size while zooming).
+        self.setRenderHints(self.renderHints() | QPainter.SmoothPixmapTransform)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(PHOTO_VIEWER_RESIZE_DEBOUNCE_MS)
+        self._resize_timer.timeout.connect(self._loader.update_size)
+        self._tile_timer = QTimer(self)
+        self._tile_timer.setSingleShot(True)
+        self._tile_timer.setInterval(PHOTO_VIEWER_TILE_DEBOUNCE_MS)
+        self._tile_timer.timeout.connect(self._update_tiles)
+
+    @staticmethod
+    def _get_tile_thread_pool() -> QThreadPool:
+        if (PhotoViewer._tile_thread_pool is None):
+            PhotoViewer._tile_thread_pool = QThreadPool()
+            PhotoViewer._tile_thread_pool.setMaxThreadCount(PHOTO_VIEWER_TILE_THREADS)
+        return PhotoViewer._tile_thread_pool
+
+    def display(self, image_path: str = None, image: QImage = None) -> None:
+        # Clear view if none image is provided.
+        if (image_path is None):
+            self.clear()
+            return
+        # Check image.
+        if (not os.path.isfile(image_path)):
+            raise ValueError("Image file not found:")
+        # Use already decoded image if provided, otherwise decode in background.
+        if ((image is not None) and (not image.isNull())):
+            self._loader.show(image_path, image)
+        else:
+            self._loader.load(image_path)
+
+    def prefetch(self, image_paths: list, group: str = "") -> None:
+        # Decode photos which are likely to be displayed next.
+        self._loader.prefetch(image_paths, group)
+
+    def clear(self) -> None:
+        # Release displayed photo.
+        self._loader.cancel()
+        self._reset_photo(None)
+        self.setScene(None)
+
+    def _reset_photo(self, image_path: str) -> None:
+        # Drop tiles and zoom of the previous photo.
+        self._remove_tiles([])
+        self._image_path = image_path
+        self._source_size = QSize()
+        self._pixmap_item.setPixmap(QPixmap())
+        self.setDragMode(QGraphicsView.NoDrag)
+
+    def _loading_callback(self, image_path: str) -> None:
+        # Show placeholder.
+        self._reset_photo(image_path)
+        self._placeholder_item.setVisible(True)
+        self._fit(self._placeholder_item.sceneBoundingRect())
+
+    def _failed_callback(self, image_path: str) -> None:
+        _ = image_path
+        self.clear()
+
+    def _loaded_callback(self, image_path: str, pixmap: QPixmap) -> None:
+        # Local variables.
+        same_photo = ((image_path == self._image_path) and self._source_size.isValid())
+        # Read original size (header only) and orientation.
+        if (same_photo == False):
+            self._reset_photo(image_path)
+            transformation = ExifIndex.get_default().get(image_path).transformation()
+            self._source_size = QImageReader(image_path).size()
+            if (transformation & QImageIOHandler.TransformationRotate90):
+                self._source_size = self._source_size.transposed()
+            self._transformation = transformation
+            if (not self._source_size.isValid()):
+                self._source_size = pixmap.size()
+        # Pixmap covers the original photo area in scene coordinates.
+        self._placeholder_item.setVisible(False)
+        self._pixmap_item.setPixmap(pixmap)
+        self._pixmap_item.setScale(self._source_size.width() / max(pixmap.width(), 1))
+        if (same_photo == False):
+            self._fit(QRectF(0, 0, self._source_size.width(), self._source_size.height()))
+        else:
+            self._tile_timer.start()
+
+    def _fit(self, scene_rect: QRectF) -> None:
+        # Show whole content.
+        self._scene.setSceneRect(scene_rect)
+        if (self.scene() is not self._scene):
+            self.setScene(self._scene)
+        self.setSceneRect(scene_rect)
+        self.fitInView(scene_rect, Qt.KeepAspectRatio)
+        self.setDragMode(QGraphicsView.NoDrag)
+
+    def _fit_scale(self) -> float:
+        # Scale which shows the whole photo.
+        if (not self._source_size.isValid()):
+            return 1.0
+        return min((self.viewport().width() / self._source_size.width()), (self.viewport().height() / self._source_size.height()))
+
+    def is_zoomed(self) -> bool:
+        return (self.transform().m11() > (self._fit_scale() * 1.001))
+
+    def zoom(self, factor: float) -> None:
+        # Check photo.
+        if ((self._image_path is None) or (not self._source_size.isValid())):
+            return
+        # Zoom between whole photo and 4 screen pixels per photo pixel.
+        scale = self.transform().m11()
+        new_scale = min(max((scale * factor), self._fit_scale()), (PHOTO_VIEWER_ZOOM_MAX / self.devicePixelRatioF()))
+        if (new_scale <= (self._fit_scale() * 1.001)):
+            self.fitInView(self._scene.sceneRect(), Qt.KeepAspectRatio)
+        else:
+            self.scale((new_scale / scale), (new_scale / scale))
+        self.setDragMode(QGraphicsView.ScrollHandDrag if self.is_zoomed() else QGraphicsView.NoDrag)
+        self._tile_timer.start()
+
+    def _tile_level(self) -> int:
+        # Largest power of 2 downscaling which keeps at least one photo pixel per screen pixel.
+        device_scale = (self.transform().m11() * self.devicePixelRatioF())
+        level = 1
+        while (((level * 2) <= PHOTO_VIEWER_TILE_LEVEL_MAX) and ((level * 2 * device_scale) <= 1.0)):
+            level *= 2
+        return level
+
+    def _remove_tiles(self, keys: list) -> None:
+        # Remove tile items which are not listed and cancel their decoding.
+        for key in [k for k in self._tile_items if (k not in keys)]:
+            self._scene.removeItem(self._tile_items.pop(key))
+        for key in [k for k in self._tile_workers if (k not in keys)]:
+            worker = self._tile_workers.pop(key)
+            worker.cancel()
+            if (PhotoViewer._get_tile_thread_pool().tryTake(worker) == True):
+                self._running_workers.discard(worker)
+
+    def _update_tiles(self) -> None:
+        # Local variables.
+        keys = []
+        pixmap = self._pixmap_item.pixmap()
+        # Check if the displayed pixmap is sharp enough.
+        if ((self._image_path is None) or pixmap.isNull()):
+            self._remove_tiles(keys)
+            return
+        level = self._tile_level()
+        if (pixmap.width() >= (self._source_size.width() * self.transform().m11() * self.devicePixelRatioF() * 0.999)):
+            self._remove_tiles(keys)
+            return
+        # Visible tiles at the current zoom level.
+        try:
+            mtime_ns = os.stat(self._image_path).st_mtime_ns
+        except OSError:
+            return
+        span = (PHOTO_VIEWER_TILE_SIZE * level)
+        visible = self.mapToScene(self.viewport().rect()).boundingRect().intersected(QRectF(0, 0, self._source_size.width(), self._source_size.height()))
+        if (visible.isEmpty()):
+            self._remove_tiles(keys)
+            return
+        for ty in range(int(visible.top() // span), int(math.ceil(visible.bottom() / span))):
+            for tx in range(int(visible.left() // span), int(math.ceil(visible.right() / span))):
+                keys.append((self._image_path, mtime_ns, level, tx, ty))
+        self._remove_tiles(keys)
+        # Show cached tiles and decode missing ones.
+        for key in keys:
+            if ((key in self._tile_items) or (key in self._tile_workers)):
+                continue
+            tile_pixmap = PhotoViewer.tile_cache.get(key)
+            if (tile_pixmap is not None):
+                self._add_tile(key, tile_pixmap)
+                continue
+            _, _, level, tx, ty = key
+            tile_rect = QRect((tx * span), (ty * span), span, span).intersected(QRect(0, 0, self._source_size.width(), self._source_size.height()))
+            worker = Worker(_decode_tile, self._image_path, level, tile_rect, self._transformation)
+            worker.signals.finished.connect(lambda image, key=key, worker=worker: self._tile_decoded_callback(key, worker, image))
+            worker.signals.failed.connect(lambda error, key=key, worker=worker: self._tile_decoded_callback(key, worker, None))
+            self._tile_workers[key] = worker
+            self._running_workers.add(worker)
+            PhotoViewer._get_tile_thread_pool().start(worker)
+
+    def _add_tile(self, key: tuple, pixmap: QPixmap) -> None:
+        # Local variables.
+        _, _, level, tx, ty = key
+        span = (PHOTO_VIEWER_TILE_SIZE * level)
+        # Tile is drawn above the preview.
+        item = QGraphicsPixmapItem(pixmap)
+        item.setTransformationMode(Qt.SmoothTransformation)
+        item.setPos(QPointF((tx * span), (ty * span)))
+        item.setScale(level)
+        item.setZValue(1)
+        self._scene.addItem(item)
+        self._tile_items[key] = item
+
+    def _tile_decoded_callback(self, key: tuple, worker: Worker, image: QImage) -> None:
+        # Drop tiles which are not visible anymore.
+        self._running_workers.discard(worker)
+        if (self._tile_workers.get(key) is not worker):
+            return
+        self._tile_workers.pop(key)
+        if ((image is None) or image.isNull()):
+            return
+        pixmap = QPixmap.fromImage(image)
+        PhotoViewer.tile_cache.put(key, pixmap)
+        self._add_tile(key, pixmap)
+
+    def wheelEvent(self, event: QWheelEvent) -> None:
+        # Zoom under the mouse cursor.
+        if (self._image_path is None):
+            super().wheelEvent(event)
+            return
+        self.zoom(PHOTO_VIEWER_ZOOM_STEP ** (event.angleDelta().y() / 120.0))
+        event.accept()
+
+    def mouseDoubleClickEvent(self, event: QMouseEvent) -> None:
+        # Back to the whole photo.
+        if (self._source_size.isValid()):
+            self._remove_tiles([])
+            self._fit(self._scene.sceneRect())
+        super().mouseDoubleClickEvent(event)
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        # Update tiles once panning is over.
+        super().scrollContentsBy(dx, dy)
+        if self.is_zoomed():
+            self._tile_timer.start()
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        # Keep the whole photo visible and decode it again at the new size.
+        super().resizeEvent(event)
+        if (self.scene() is self._scene):
+            if (not self.is_zoomed()):
+                self.fitInView(self._scene.sceneRect(), Qt.KeepAspectRatio)
+            self._resize_timer.start()
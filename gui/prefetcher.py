@@ -0,0 +1,145 @@
+"""
+* prefetcher.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import logging
+
+from PySide6.QtCore import QObject, QSize, QThread, QThreadPool, QTimer
+from PySide6.QtGui import QImage
+
+from gui.cache import LruCache
+from gui.image import Image
+from gui.image_loader import target_size
+from gui.species import SpeciesView
+from gui.worker import Worker
+
+### PREFETCHER macros ###
+
+PREFETCHER_DEPTH = 2
+PREFETCHER_MEMORY_MAX_BYTES = (128 * 1024 * 1024)
+PREFETCHER_IDLE_DELAY_MS = 250
+PREFETCHER_THREADS = 1
+
+### PREFETCHER classes ###
+
+"""
+* SpeciesPrefetcher
+* Loads the species around the current selection (JSON, identifications list and decoded photo) when the GUI is idle.
+"""
+class SpeciesPrefetcher(QObject):
+
+    def __init__(self, gui: object, species_cache: LruCache, depth: int = PREFETCHER_DEPTH, memory_max_bytes: int = PREFETCHER_MEMORY_MAX_BYTES, parent: QObject = None) -> None:
+        # Init parent.
+        super().__init__(parent)
+        # Init context.
+        self._gui = gui
+        self._species_cache = species_cache
+        self.depth = depth
+        self._images = LruCache(memory_max_bytes, weigher=QImage.sizeInBytes)
+        self._requested_paths = []
+        self._workers = {}
+        self._running_workers = set()
+        # Low priority pool so that prefetching never competes with the GUI.
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(PREFETCHER_THREADS)
+        self._thread_pool.setThreadPriority(QThread.LowestPriority)
+        # Wait for the selection to settle.
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(PREFETCHER_IDLE_DELAY_MS)
+        self._timer.timeout.connect(self._start)
+
+    @staticmethod
+    def _load(worker: Worker, gui: object, species_directory_path: str, size: QSize) -> tuple:
+        # Read species content.
+        species_view = SpeciesView(gui, species_directory_path)
+        # Decode photo unless selection has moved in the meantime.
+        image = None
+        if ((worker.is_cancelled() == False) and (species_view.get_image_path() is not None)):
+            image = Image.read(species_view.get_image_path(), size)
+        return (species_view, image)
+
+    @staticmethod
+    def neighbours(paths: list, current_path: str, depth: int) -> list:
+        # Local variables.
+        neighbour_paths = []
+        # Closest siblings first, alternating after and before the selection.
+        if (current_path not in paths):
+            return neighbour_paths
+        row = paths.index(current_path)
+        for distance in range(1, (depth + 1)):
+            for neighbour_row in [(row + distance), (row - distance)]:
+                if ((neighbour_row >= 0) and (neighbour_row < len(paths))):
+                    neighbour_paths.append(paths[neighbour_row])
+        return neighbour_paths
+
+    def schedule(self, species_directory_paths: list) -> None:
+        # Cancel loads which are not requested anymore (selection has jumped elsewhere).
+        self._requested_paths = list(species_directory_paths)
+        for path, worker in list(self._workers.items()):
+            if (path not in self._requested_paths):
+                self._cancel(worker)
+                self._workers.pop(path)
+        # Restart idle timer.
+        self._timer.start()
+
+    def _start(self) -> None:
+        # Local variables.
+        size = target_size(self._gui.speciesPhotoGraphicsView)
+        # Photos are decoded at the size of the species view.
+        for path in self._requested_paths:
+            # Check if species is already loaded or loading.
+            if ((path in self._workers) or (self._species_cache.peek(path) is not None)):
+                continue
+            worker = Worker(SpeciesPrefetcher._load, self._gui, path, size)
+            worker.signals.finished.connect(lambda result, path=path, worker=worker: self._loaded_callback(path, worker, result))
+            worker.signals.failed.connect(lambda error, path=path, worker=worker: self._done(path, worker))
+            self._workers[path] = worker
+            self._running_workers.add(worker)
+            self._thread_pool.start(worker)
+
+    def _cancel(self, worker: Worker) -> None:
+        # Queued workers are simply removed, running ones are kept alive until they finish.
+        worker.cancel()
+        if (self._thread_pool.tryTake(worker) == True):
+            self._running_workers.discard(worker)
+
+    def _done(self, species_directory_path: str, worker: Worker) -> None:
+        self._running_workers.discard(worker)
+        if (self._workers.get(species_directory_path) is worker):
+            self._workers.pop(species_directory_path)
+
+    def _loaded_callback(self, species_directory_path: str, worker: Worker, result: tuple) -> None:
+        # Local variables.
+        species_view, image = result
+        # Drop results of cancelled loads.
+        self._done(species_directory_path, worker)
+        if (worker.is_cancelled() == True):
+            return
+        # Keep an already opened species object.
+        if (self._species_cache.peek(species_directory_path) is None):
+            self._species_cache.put(species_directory_path, species_view)
+        if ((image is not None) and (not image.isNull())):
+            self._images.put(species_directory_path, image)
+        logging.debug("Species prefetched : %s (%d bytes of images)", species_directory_path, self._images.weight)
+
+    def take_image(self, species_directory_path: str) -> QImage:
+        # Decoded photo is given once to the species view.
+        return self._images.pop(species_directory_path)
+
+    def set_memory_max(self, memory_max_bytes: int) -> None:
+        self._images.set_capacity(memory_max_bytes)
+
+    def clear(self) -> None:
+        # Cancel everything and release memory.
+        self._timer.stop()
+        self._requested_paths = []
+        for worker in list(self._running_workers):
+            self._cancel(worker)
+        self._thread_pool.waitForDone()
+        self._workers = {}
+        self._running_workers = set()
+        self._images.clear()
@@ -0,0 +1,188 @@
+"""
+* scanner.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import argparse
+import fnmatch
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+### SCANNER macros ###
+
+SCANNER_IGNORE_FILE = '.botanyignore'
+SCANNER_WORKERS = 8
+
+### SCANNER classes ###
+
+"""
+* ScanNode
+* Data class containing a classification directory found by the scanner.
+"""
+@dataclass(frozen=True)
+class ScanNode:
+
+    path: str
+    depth: int
+
+"""
+* IgnoreRules
+* Directory names and relative paths which are never scanned.
+"""
+class IgnoreRules:
+
+    def __init__(self, patterns: list = None) -> None:
+        # Init context.
+        self.patterns = [] if (patterns is None) else list(patterns)
+        self._name_patterns = [p for p in self.patterns if ("/" not in p)]
+        self._path_patterns = [p for p in self.patterns if ("/" in p)]
+
+    @staticmethod
+    def load(data_directory_path: str) -> "IgnoreRules":
+        # Local variables.
+        patterns = []
+        ignore_file_path = os.path.join(data_directory_path, SCANNER_IGNORE_FILE)
+        # Read glob patterns (one per line, '#' for comments).
+        try:
+            with open(ignore_file_path, 'r', encoding='utf-8') as ignore_file:
+                for line in ignore_file:
+                    pattern = line.strip()
+                    if ((pattern == "") or pattern.startswith("#")):
+                        continue
+                    patterns.append(pattern.strip("/"))
+        except FileNotFoundError:
+            pass
+        return IgnoreRules(patterns)
+
+    def is_ignored(self, name: str, relative_path: str) -> bool:
+        # Folders with name starting with dot are always ignored.
+        if name.startswith("."):
+            return True
+        for pattern in self._name_patterns:
+            if fnmatch.fnmatch(name, pattern):
+                return True
+        if (len(self._path_patterns) > 0):
+            posix_path = Path(relative_path).as_posix()
+            for pattern in self._path_patterns:
+                if fnmatch.fnmatch(posix_path, pattern):
+                    return True
+        return False
+
+"""
+* HerbariumScanner
+* Workspace scanner pruning ignored directories before descending into them.
+"""
+class HerbariumScanner:
+
+    def __init__(self, data_directory_path: str, depth_max: int, ignore_rules: IgnoreRules = None, max_workers: int = SCANNER_WORKERS) -> None:
+        # Init context.
+        self._data_directory_path = data_directory_path
+        self._depth_max = depth_max
+        self.ignore_rules = IgnoreRules.load(data_directory_path) if (ignore_rules is None) else ignore_rules
+        self.max_workers = max_workers
+
+    def list_directories(self, relative_path: str) -> list:
+        # Local variables.
+        names = []
+        directory_path = os.path.join(self._data_directory_path, relative_path) if (relative_path != "") else self._data_directory_path
+        # Keep real directories which are not ignored.
+        with os.scandir(directory_path) as it:
+            for entry in it:
+                if self.ignore_rules.is_ignored(entry.name, os.path.join(relative_path, entry.name)):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    names.append(entry.name)
+        return sorted(names)
+
+    def filter(self, relative_path: str, names: list) -> list:
+        return [name for name in names if (not self.ignore_rules.is_ignored(name, os.path.join(relative_path, name)))]
+
+    def _scan_branch(self, relative_path: str, depth: int) -> list:
+        # Local variables.
+        nodes = [ScanNode(os.path.join(self._data_directory_path, relative_path), depth)]
+        # Species level is the last one.
+        if ((depth + 1) >= self._depth_max):
+            return nodes
+        try:
+            names = self.list_directories(relative_path)
+        except OSError:
+            return nodes
+        for name in names:
+            nodes.extend(self._scan_branch(os.path.join(relative_path, name), (depth + 1)))
+        return nodes
+
+    def iter_nodes(self, relative_path: str = "", depth: int = 0):
+        # Depth first walk yielding the nodes of the scan one at a time (parents before their children).
+        try:
+            names = self.list_directories(relative_path)
+        except OSError:
+            return
+        for name in names:
+            child_relative_path = os.path.join(relative_path, name)
+            yield ScanNode(os.path.join(self._data_directory_path, child_relative_path), (depth + 1))
+            if ((depth + 2) < self._depth_max):
+                yield from self.iter_nodes(child_relative_path, (depth + 1))
+
+    def fan_out(self, function, relative_paths: list) -> list:
+        # Run one task per top level branch.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(function, relative_paths))
+
+    def scan(self) -> list:
+        # Local variables.
+        nodes = []
+        # Scan top level branches in parallel to hide file system latency.
+        if (self._depth_max > 1):
+            for branch_nodes in self.fan_out(lambda name: self._scan_branch(name, 1), self.list_directories("")):
+                nodes.extend(branch_nodes)
+        # Same order as the former sorted os.walk.
+        nodes.sort(key=lambda node: node.path)
+        return nodes
+
+### SCANNER functions ###
+
+def legacy_walk(data_directory_path: str, depth_max: int) -> list:
+    # Local variables.
+    nodes = []
+    data_directory_depth = len(Path(os.path.join(data_directory_path)).parents)
+    # Former classification refresh algorithm, kept as benchmark reference.
+    for root, _, _ in sorted(os.walk(data_directory_path)):
+        rel = os.path.relpath(root, data_directory_path)
+        if rel != ".":
+            parts = rel.split(os.sep)
+            if any(p.startswith(".") for p in parts):
+                continue
+        depth = (len(Path(os.path.join(root)).parents) - data_directory_depth)
+        if ((depth > 0) and (depth < depth_max)):
+            nodes.append(ScanNode(os.path.join(root), depth))
+    return nodes
+
+def main() -> int:
+    # Local import to avoid a circular dependency with the classification view.
+    from gui.classification import CLASSIFICATION_DEPTH_MAX
+    parser = argparse.ArgumentParser(description="Benchmark the workspace scanner against the former os.walk.")
+    parser.add_argument("directory", help="Workspace directory")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs (default: 3)")
+    parser.add_argument("--workers", type=int, default=SCANNER_WORKERS, help=f"Scanner threads (default: {SCANNER_WORKERS})")
+    args = parser.parse_args()
+    # Compare with dot folders rule only, so that both lists must be identical.
+    scanner = HerbariumScanner(args.directory, CLASSIFICATION_DEPTH_MAX, IgnoreRules(), args.workers)
+    for name, function in [("os.walk", lambda: legacy_walk(args.directory, CLASSIFICATION_DEPTH_MAX)), ("scandir", scanner.scan)]:
+        durations = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            nodes = function()
+            durations.append(time.perf_counter() - start)
+        print(f"{name:8s}: {len(nodes)} nodes, best {min(durations) * 1000.0:.1f} ms, mean {(sum(durations) / len(durations)) * 1000.0:.1f} ms")
+    identical = (legacy_walk(args.directory, CLASSIFICATION_DEPTH_MAX) == scanner.scan())
+    print("Node lists identical" if identical else "Node lists differ")
+    return 0 if identical else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
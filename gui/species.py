@@ -5,25 +5,30 @@
 *      Author: Ludo & Copilot
 """
 
-import json
 import logging
 import os
 import re
+import shutil
 
 from pathlib import Path
-from typing import Any
-from PySide6.QtCore import QUrl
+from PySide6.QtCore import QThreadPool, QUrl
 from PySide6.QtWidgets import QDialog, QDialogButtonBox, QTextEdit, QFileDialog
-from PySide6.QtGui import QDesktopServices
+from PySide6.QtGui import QDesktopServices, QImage
 
 from gui.single_slot_connector import SingleSlotConnector
 from gui.species_edit_window_ui import Ui_SpeciesEditDialog
-from gui.identification import Identification, IdentificationEditWindow, IdentificationView
+from gui.identification import Identification, IdentificationEditWindow, IdentificationView, IDENTIFICATION_DATA_FILE_EXTENSION
 from gui.image import Image
+from gui.journal import EditJournal
+from gui.persistence import PersistenceQueue
+from gui.json_codec import JsonCodec, JsonField, JsonObject, to_number
+from gui.photo_grid import PhotoGalleryWindow
+from gui.worker import Worker
 
 ### SPECIES macros ###
 
 SPECIES_DATA_FILE_EXTENSION = '.json'
+SPECIES_IDENTIFICATION_THREADS = 2
 
 SPECIES_JSON_KEY_TOP_LEVEL = 'species'
 
@@ -41,14 +46,24 @@ SPECIES_JSON_KEY_REFERENCES_DECOUVRIR_FLORE_PYRENEES = 'decouvrirFlorePyrenees'
 SPECIES_JSON_KEY_REFERENCES_GUIDE_DELACHAUX_ARBRES = 'guideDelachauxArbres'
 SPECIES_JSON_KEY_REFERENCES_GUIDE_CHAMPIGNONS = 'guideChampignons'
 
-SPECIES_JSON_KEY_REQUIRED = [
-    SPECIES_JSON_KEY_NAME,
-]
-
-SPECIES_JSON_KEY_NAME_REQUIRED = [
-    SPECIES_JSON_KEY_NAME_LATIN,
-    SPECIES_JSON_KEY_NAME_COMMON
-]
+SPECIES_CODEC = JsonCodec(JsonObject(SPECIES_JSON_KEY_TOP_LEVEL, [
+    JsonObject(SPECIES_JSON_KEY_NAME, [
+        JsonField(SPECIES_JSON_KEY_NAME_LATIN, "latin_name", required=True),
+        JsonField(SPECIES_JSON_KEY_NAME_COMMON, "common_name", required=True),
+    ]),
+    JsonObject(SPECIES_JSON_KEY_DESCRIPTION, [
+        JsonField(SPECIES_JSON_KEY_DESCRIPTION_CRITERIA, "criteria"),
+        JsonField(SPECIES_JSON_KEY_DESCRIPTION_EDIBILITY, "edibility"),
+        JsonField(SPECIES_JSON_KEY_DESCRIPTION_CONFUSION, "confusion"),
+    ], required=False),
+    JsonObject(SPECIES_JSON_KEY_REFERENCES, [
+        JsonField(SPECIES_JSON_KEY_REFERENCES_GUIDE_DELACHAUX_FLEURS, "references_guide_delachaux_fleurs", to_number, 0),
+        JsonField(SPECIES_JSON_KEY_REFERENCES_RECONNAITRE_700_PLANTES, "references_reconnaitre_700_plantes", to_number, 0),
+        JsonField(SPECIES_JSON_KEY_REFERENCES_DECOUVRIR_FLORE_PYRENEES, "references_decouvrir_flore_pyrenees", to_number, 0),
+        JsonField(SPECIES_JSON_KEY_REFERENCES_GUIDE_DELACHAUX_ARBRES, "references_guide_delachaux_arbres", to_number, 0),
+        JsonField(SPECIES_JSON_KEY_REFERENCES_GUIDE_CHAMPIGNONS, "references_guide_champignons", to_number, 0),
+    ], required=False),
+]))
 
 ### SPECIES classes ###
 
@@ -206,16 +221,24 @@ class SpeciesEditWindow(QDialog, Ui_SpeciesEditDialog):
 """
 class SpeciesView:
 
+    _thread_pool = None
+
     def __init__(self, gui: object, species_directory_path: str, species: Species = None) -> None:
         # Local variables.
         json_decoded = False
         image_found = False
+        subdirectory_paths = []
         # Init context.
         self._gui = gui
         self._directory_path = species_directory_path
         self._image_path = None
-        self._identification_view_list = []
+        self._image = None
+        self._identification_directory_list = []
+        self._identification_views = {}
+        self._prefetch_workers = {}
+        self._displayed = False
         self._current_identification_index = 0
+        self._stamp = {}
         self._single_slot_connector = SingleSlotConnector()
         # Check initialization mode.
         if (species is None):
@@ -226,8 +249,9 @@ class SpeciesView:
             # Create object from input.
             self._species = species
             self._json_path = os.path.join(species_directory_path, self._species.compute_json_file_name())
-            # Create JSON file.
+            # Create JSON file (written now since the directory is listed below).
             self._write_json()
+            PersistenceQueue.get_default().flush(self._json_path)
         # Read directory.
         for f in sorted(os.listdir(species_directory_path)):
             # Build complete path.
@@ -245,98 +269,73 @@ class SpeciesView:
             if ((Path(f).suffix.lower() == Image.IMAGE_FILE_EXTENSION) and (image_found == False)):
                 self._image_path = p
                 image_found = True
-            # Check identifications sub-directories.
+            # Identifications sub-directories are only listed (those with a JSON file), they are read when displayed.
             if (os.path.isdir(p)):
-                try:
-                    identification_view = IdentificationView(self._gui, p)
-                    self._identification_view_list.append(identification_view)
-                except Exception as e:
-                    logging.error("Invalid species sub-directory : %s", e)
+                subdirectory_paths.append(p)
+                if (SpeciesView._has_json(p) == True):
+                    self._identification_directory_list.append(p)
         # Warn if image has not been found.
         if (image_found == False):
             logging.warning("No species image found")
         # Check if directory content is valid.
         if (json_decoded == False):
             raise ValueError("Invalid species directory")
+        # Save modification times of the content (sub-directories without JSON file become identifications once it is added).
+        self._update_stamp([self._directory_path, self._json_path] + subdirectory_paths)
 
     @staticmethod
-    def _to_text(value: Any) -> str:
-        if value is None:
-            return ""
-        return str(value)
+    def _get_thread_pool() -> QThreadPool:
+        # Identifications are read in a pool of the species views, which is cancelled when they are hidden.
+        if (SpeciesView._thread_pool is None):
+            SpeciesView._thread_pool = QThreadPool()
+            SpeciesView._thread_pool.setMaxThreadCount(SPECIES_IDENTIFICATION_THREADS)
+        return SpeciesView._thread_pool
 
-    def _parse_json(self, species_json_path: str) -> None:
-        # Open JSON file.
+    @staticmethod
+    def _has_json(directory_path: str) -> bool:
         try:
-            with open(species_json_path, 'r') as json_file:
-                data = json.load(json_file)
-        except Exception as e:
-            raise ValueError(f"Species JSON file decoding failed: {e}")
-        # Check top level key.
-        if SPECIES_JSON_KEY_TOP_LEVEL not in data:
-            raise ValueError("Species JSON file top level key not found")
-        # Extract data.
-        species_mapping = data[SPECIES_JSON_KEY_TOP_LEVEL]
-        # Check type.
-        if not isinstance(species_mapping, dict):
-            raise ValueError("Invalid species content: expected an object")
-        # Check mandatory keys.
-        missing_keys = [k for k in SPECIES_JSON_KEY_REQUIRED if k not in species_mapping]
-        if missing_keys:
-            raise ValueError(f"Missing required species keys: {', '.join(missing_keys)}")
-        name_mapping = species_mapping.get(SPECIES_JSON_KEY_NAME)
-        missing_keys = [k for k in SPECIES_JSON_KEY_NAME_REQUIRED if k not in name_mapping]
-        if missing_keys:
-            raise ValueError(f"Missing required identification keys: {', '.join(missing_keys)}")
-        # Update context.
-        self._species.latin_name = self._to_text(name_mapping.get(SPECIES_JSON_KEY_NAME_LATIN, ""))
-        self._species.common_name = self._to_text(name_mapping.get(SPECIES_JSON_KEY_NAME_COMMON, ""))
-        self._species.criteria = self._to_text(species_mapping.get(SPECIES_JSON_KEY_DESCRIPTION).get(SPECIES_JSON_KEY_DESCRIPTION_CRITERIA, ""))
-        self._species.edibility = self._to_text(species_mapping.get(SPECIES_JSON_KEY_DESCRIPTION).get(SPECIES_JSON_KEY_DESCRIPTION_EDIBILITY, ""))
-        self._species.confusion = self._to_text(species_mapping.get(SPECIES_JSON_KEY_DESCRIPTION).get(SPECIES_JSON_KEY_DESCRIPTION_CONFUSION, ""))
-        self._species.references_guide_delachaux_fleurs = species_mapping.get(SPECIES_JSON_KEY_REFERENCES).get(SPECIES_JSON_KEY_REFERENCES_GUIDE_DELACHAUX_FLEURS, 0)
-        self._species.references_reconnaitre_700_plantes = species_mapping.get(SPECIES_JSON_KEY_REFERENCES).get(SPECIES_JSON_KEY_REFERENCES_RECONNAITRE_700_PLANTES, 0)
-        self._species.references_decouvrir_flore_pyrenees = species_mapping.get(SPECIES_JSON_KEY_REFERENCES).get(SPECIES_JSON_KEY_REFERENCES_DECOUVRIR_FLORE_PYRENEES, 0)
-        self._species.references_guide_delachaux_arbres = species_mapping.get(SPECIES_JSON_KEY_REFERENCES).get(SPECIES_JSON_KEY_REFERENCES_GUIDE_DELACHAUX_ARBRES, 0)
-        self._species.references_guide_champignons = species_mapping.get(SPECIES_JSON_KEY_REFERENCES).get(SPECIES_JSON_KEY_REFERENCES_GUIDE_CHAMPIGNONS, 0)
+            return any((Path(f).suffix.lower() == IDENTIFICATION_DATA_FILE_EXTENSION) for f in os.listdir(directory_path))
+        except OSError:
+            return False
+
+    def _parse_json(self, species_json_path: str) -> None:
+        SpeciesView.decode_json(species_json_path, self._species)
+
+    @staticmethod
+    def decode_json(species_json_path: str, species: Species) -> None:
+        # Decode and validate in a single pass.
+        SPECIES_CODEC.load(species_json_path, species)
 
     def _write_json(self) -> None:
-        # Local variables.
-        data = dict()
         # Check local path.
         if (self._json_path is None):
             return
-        # Open JSON file.
-        with open(self._json_path, 'r+' if (os.path.isfile(self._json_path)) else 'w+') as json_file:
-            # Compute data.
-            data[SPECIES_JSON_KEY_TOP_LEVEL] = dict()
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_NAME] = dict()
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_NAME][SPECIES_JSON_KEY_NAME_LATIN] = self._species.latin_name
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_NAME][SPECIES_JSON_KEY_NAME_COMMON] = self._species.common_name
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_DESCRIPTION] = dict()
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_DESCRIPTION][SPECIES_JSON_KEY_DESCRIPTION_CRITERIA] = self._species.criteria
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_DESCRIPTION][SPECIES_JSON_KEY_DESCRIPTION_EDIBILITY] = self._species.edibility
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_DESCRIPTION][SPECIES_JSON_KEY_DESCRIPTION_CONFUSION] = self._species.confusion
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_REFERENCES] = dict()
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_REFERENCES][SPECIES_JSON_KEY_REFERENCES_GUIDE_DELACHAUX_FLEURS] = self._species.references_guide_delachaux_fleurs
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_REFERENCES][SPECIES_JSON_KEY_REFERENCES_RECONNAITRE_700_PLANTES] = self._species.references_reconnaitre_700_plantes
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_REFERENCES][SPECIES_JSON_KEY_REFERENCES_DECOUVRIR_FLORE_PYRENEES] = self._species.references_decouvrir_flore_pyrenees
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_REFERENCES][SPECIES_JSON_KEY_REFERENCES_GUIDE_DELACHAUX_ARBRES] = self._species.references_guide_delachaux_arbres
-            data[SPECIES_JSON_KEY_TOP_LEVEL][SPECIES_JSON_KEY_REFERENCES][SPECIES_JSON_KEY_REFERENCES_GUIDE_CHAMPIGNONS] = self._species.references_guide_champignons
-            # Write file.
-            json_file.seek(0)
-            json.dump(data, json_file, indent=4)
-            json_file.truncate()
-            json_file.close()
+        # Write file in background.
+        SPECIES_CODEC.save(self._json_path, self._species)
+
+    def _journal_edit(self, previous_values: dict) -> None:
+        # Local variables.
+        journal = EditJournal.get_default()
+        # Whole file is rewritten when the journal is compacted.
+        if ((journal is not None) and (self._json_path is not None)):
+            try:
+                journal.record(self._json_path, SPECIES_CODEC, previous_values, self._species)
+                return
+            except OSError as e:
+                logging.error("Journal writing failed : %s", e)
+        self._write_json()
 
     def _edit_callback(self) -> None:
+        # Local variables.
+        previous_values = SPECIES_CODEC.snapshot(self._species)
         # Open edition window.
         edit_window = SpeciesEditWindow(self._species, False, None)
         edit_window.exec()
         # Check if any property has been modified.
         if (edit_window._has_changed == True):
-            # Update JSON file.
-            self._write_json()
+            # Journal modified fields.
+            self._journal_edit(previous_values)
+            self._update_stamp([self._json_path])
             # Refresh GUI.
             self.display(update_identification = False, reset_identification = False)
         edit_window.close()
@@ -352,8 +351,10 @@ class SpeciesView:
         new_window.exec()
         # Check if any property has been modified.
         if (new_window._has_changed == True):
-            # Check if date is new.
-            for identification_view in self._identification_view_list:
+            # Check if date is new (among the identifications which have been read).
+            for identification_view in self._identification_views.values():
+                if (identification_view is None):
+                    continue
                 if ((new_identification.date_day == identification_view.get_identification().date_day) and
                     (new_identification.date_month == identification_view.get_identification().date_month) and
                     (new_identification.date_year == identification_view.get_identification().date_year)):
@@ -367,16 +368,94 @@ class SpeciesView:
                 return
             # Create folder.
             os.makedirs(identification_directory_path)
+            # Copy selected photos.
+            for image_path in new_window.get_image_paths():
+                try:
+                    shutil.copy2(image_path, identification_directory_path)
+                except OSError as e:
+                    logging.error("Photo copy failed : %s", e)
             # Create identification object.
             new_identification_view = IdentificationView(self._gui, identification_directory_path, new_identification)
-            self._identification_view_list.append(new_identification_view)
+            self._identification_directory_list.append(identification_directory_path)
+            self._identification_views[identification_directory_path] = new_identification_view
+            self._update_stamp([self._directory_path] + new_identification_view.get_watched_paths())
             # Refresh GUI.
             self.display(update_identification = True, reset_identification = False)
         new_window.close()
 
+    @staticmethod
+    def _load_identification(worker: Worker, gui: object, identification_directory_path: str) -> IdentificationView:
+        _ = worker
+        return IdentificationView(gui, identification_directory_path)
+
+    def _get_identification_view(self, index: int) -> IdentificationView:
+        # Local variables.
+        identification_directory_path = self._identification_directory_list[index]
+        # Read identification if it has not been prefetched yet.
+        if (identification_directory_path not in self._identification_views):
+            try:
+                self._store_identification_view(identification_directory_path, IdentificationView(self._gui, identification_directory_path))
+            except Exception as e:
+                logging.error("Invalid species sub-directory : %s", e)
+                self._store_identification_view(identification_directory_path, None)
+        return self._identification_views[identification_directory_path]
+
+    def _store_identification_view(self, identification_directory_path: str, identification_view: IdentificationView) -> None:
+        # Keep the first result (synchronous read or prefetch).
+        self._prefetch_workers.pop(identification_directory_path, None)
+        if (identification_directory_path in self._identification_views):
+            return
+        self._identification_views[identification_directory_path] = identification_view
+        if (identification_view is not None):
+            self._update_stamp(identification_view.get_watched_paths())
+            # Photo prefetching is shared by the species views, only the displayed one drives it.
+            if (self._displayed == True):
+                self._prefetch_photos()
+
+    def hide(self) -> None:
+        # View is kept in the cache only: stop reading identifications in background.
+        self._displayed = False
+        for worker in self._prefetch_workers.values():
+            worker.cancel()
+            SpeciesView._get_thread_pool().tryTake(worker)
+        self._prefetch_workers = {}
+
+    def _prefetch_photos(self) -> None:
+        # Local variables.
+        image_paths = []
+        # First photo of the adjacent identifications which have been read.
+        for index in [(self._current_identification_index + 1), (self._current_identification_index - 1)]:
+            if ((index < 0) or (index >= len(self._identification_directory_list))):
+                continue
+            identification_view = self._identification_views.get(self._identification_directory_list[index])
+            if ((identification_view is not None) and (len(identification_view.get_image_paths()) > 0)):
+                image_paths.append(identification_view.get_image_paths()[0])
+        self._gui.identificationPhotosGraphicsView.prefetch(image_paths, "identifications")
+
+    def _prefetch_identifications(self) -> None:
+        # Read previous and next identifications in background.
+        for index in [(self._current_identification_index - 1), (self._current_identification_index + 1)]:
+            if ((index < 0) or (index >= len(self._identification_directory_list))):
+                continue
+            identification_directory_path = self._identification_directory_list[index]
+            if ((identification_directory_path in self._identification_views) or (identification_directory_path in self._prefetch_workers)):
+                continue
+            worker = Worker(SpeciesView._load_identification, self._gui, identification_directory_path)
+            worker.signals.finished.connect(lambda view, path=identification_directory_path: self._store_identification_view(path, view))
+            worker.signals.failed.connect(lambda error, path=identification_directory_path: self._store_identification_view(path, None))
+            self._prefetch_workers[identification_directory_path] = worker
+            SpeciesView._get_thread_pool().start(worker)
+
     def _display_identification(self):
+        # Skip invalid sub-directories.
+        while ((self._current_identification_index < len(self._identification_directory_list)) and (self._get_identification_view(self._current_identification_index) is None)):
+            del self._identification_directory_list[self._current_identification_index]
+        if ((self._current_identification_index > 0) and (self._current_identification_index >= len(self._identification_directory_list))):
+            self._current_identification_index = (len(self._identification_directory_list) - 1)
+            self._display_identification()
+            return
         # Local variables.
-        identification_count = len(self._identification_view_list)
+        identification_count = len(self._identification_directory_list)
         # Check count.
         if (identification_count == 0):
             # Clear identification panel.
@@ -386,17 +465,16 @@ class SpeciesView:
             # Update title.
             self._gui.identificationListGroupBox.setTitle("Liste (0)")
         else:
-            # Check index.
-            if (self._current_identification_index >= identification_count):
-                logging.warning("Identification index overflow, defaulting to last")
-                self._current_identification_index = (identification_count - 1)
             # Print identification.
-            self._identification_view_list[self._current_identification_index].display()
+            self._get_identification_view(self._current_identification_index).display()
             # Update buttons state.
             self._gui.identificationListPreviousPushButton.setEnabled(True if (self._current_identification_index > 0) else False)
             self._gui.identificationListNextPushButton.setEnabled(True if (self._current_identification_index < (identification_count - 1)) else False)
             # Update title.
             self._gui.identificationListGroupBox.setTitle("Liste (" + str(self._current_identification_index + 1) + "/" + str(identification_count) + ")")
+            # Prepare neighbours.
+            self._prefetch_identifications()
+            self._prefetch_photos()
 
     def _previous_identification_callback(self):
         # Check index.
@@ -407,11 +485,89 @@ class SpeciesView:
 
     def _next_identification_callback(self):
         # Check index.
-        if (self._current_identification_index < (len(self._identification_view_list) - 1)):
+        if (self._current_identification_index < (len(self._identification_directory_list) - 1)):
             # Print previous item.
             self._current_identification_index += 1
             self._display_identification()
 
+    def get_photos(self) -> list:
+        # Local variables.
+        photos = []
+        # Photos of all identifications (listed without reading the identifications which have not been read yet).
+        for identification_directory_path in self._identification_directory_list:
+            identification_view = self._identification_views.get(identification_directory_path)
+            if (identification_view is not None):
+                image_paths = identification_view.get_image_paths()
+            else:
+                try:
+                    image_paths = [os.path.join(identification_directory_path, f) for f in sorted(os.listdir(identification_directory_path)) if (Path(f).suffix.lower() == Image.IMAGE_FILE_EXTENSION)]
+                except OSError:
+                    continue
+            photos.extend((image_path, os.path.basename(identification_directory_path)) for image_path in image_paths)
+        return photos
+
+    def _gallery_callback(self) -> None:
+        # Open gallery window.
+        gallery_window = PhotoGalleryWindow(self._species.latin_name, self.get_photos())
+        gallery_window.exec()
+        # Show the selected photo.
+        image_path = gallery_window.get_selected_image_path()
+        if (image_path is not None):
+            identification_directory_path = os.path.dirname(image_path)
+            if (identification_directory_path in self._identification_directory_list):
+                self._current_identification_index = self._identification_directory_list.index(identification_directory_path)
+                self._display_identification()
+                identification_view = self._identification_views.get(identification_directory_path)
+                if (identification_view is not None):
+                    identification_view.show_image(image_path)
+        gallery_window.close()
+
+    def get_watched_paths(self) -> list:
+        # Local variables.
+        paths = [self._directory_path, self._json_path] + self._identification_directory_list
+        # Add content of the identifications which have been read.
+        for identification_view in self._identification_views.values():
+            if (identification_view is not None):
+                paths.extend(identification_view.get_watched_paths())
+        return list(dict.fromkeys(paths))
+
+    @staticmethod
+    def _get_mtime(path: str) -> int:
+        # Modification time (None if the path has been removed).
+        try:
+            return os.stat(path).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
+    def _update_stamp(self, paths: list) -> None:
+        for path in paths:
+            if (path is not None):
+                self._stamp[path] = SpeciesView._get_mtime(path)
+
+    def is_up_to_date(self) -> bool:
+        # Check that directories and JSON files have not been modified since they have been read.
+        for path, mtime in list(self._stamp.items()):
+            current_mtime = SpeciesView._get_mtime(path)
+            if (current_mtime != mtime):
+                # Files written by the persistence queue are already up to date.
+                if ((current_mtime is not None) and (PersistenceQueue.get_default().get_written_mtime(path) == current_mtime)):
+                    self._stamp[path] = current_mtime
+                    continue
+                return False
+        return True
+
+    def get_image_path(self) -> str:
+        return self._image_path
+
+    def set_image(self, image: QImage) -> None:
+        self._image = image
+
+    def get_identification_index(self) -> int:
+        return self._current_identification_index
+
+    def set_identification_index(self, index: int) -> None:
+        self._current_identification_index = index
+
     @staticmethod
     def _display_page(page: int) -> str:
         if ((page is None) or (page == 0)):
@@ -420,6 +576,7 @@ class SpeciesView:
 
     def display(self, update_identification: bool = True, reset_identification: bool = True) -> None:
         # Print fields.
+        self._displayed = True
         self._gui.speciesLatinNameContentLabel.setText(self._species.latin_name)
         self._gui.speciesCommonNameContentLabel.setText(self._species.common_name)
         self._gui.speciesCriteriaContentLabel.setText(self._species.criteria)
@@ -430,8 +587,9 @@ class SpeciesView:
         self._gui.speciesRefFlorePyreneesContentLabel.setText(SpeciesView._display_page(self._species.references_decouvrir_flore_pyrenees))
         self._gui.speciesRefDelachauxArbresContentLabel.setText(SpeciesView._display_page(self._species.references_guide_delachaux_arbres))
         self._gui.speciesRefChampignonsContentLabel.setText(SpeciesView._display_page(self._species.references_guide_champignons))
-        # Update image.
-        Image.display(self._gui.speciesPhotoGraphicsView, self._image_path)
+        # Update image (preloaded image is only used once, the pixmap is then owned by the scene).
+        self._gui.speciesPhotoGraphicsView.display(self._image_path, self._image)
+        self._image = None
         # Check call type.
         if (update_identification == True):
             # Update buttons callbacks.
@@ -439,6 +597,8 @@ class SpeciesView:
             self._gui.speciesEditPushButton.setEnabled(True)
             self._single_slot_connector.connect(self._gui.speciesOpenDirectoryPushButton.clicked, self._open_directory_callback)
             self._gui.speciesOpenDirectoryPushButton.setEnabled(True)
+            self._single_slot_connector.connect(self._gui.speciesGalleryPushButton.clicked, self._gallery_callback)
+            self._gui.speciesGalleryPushButton.setEnabled(True)
             self._single_slot_connector.connect(self._gui.identificationAddPushButton.clicked, self._add_identification_callback)
             self._gui.identificationAddPushButton.setEnabled(True)
             self._single_slot_connector.connect(self._gui.identificationListPreviousPushButton.clicked, self._previous_identification_callback)
@@ -464,10 +624,11 @@ class SpeciesView:
         # Update title.
         gui.identificationListGroupBox.setTitle("Liste")
         # Clear image.
-        Image.display(gui.speciesPhotoGraphicsView, None)
+        gui.speciesPhotoGraphicsView.clear()
         # Disable buttons.
         gui.speciesEditPushButton.setEnabled(False)
         gui.speciesOpenDirectoryPushButton.setEnabled(False)
+        gui.speciesGalleryPushButton.setEnabled(False)
         gui.identificationAddPushButton.setEnabled(False)
         gui.identificationListPreviousPushButton.setEnabled(False)
         gui.identificationListNextPushButton.setEnabled(False)
@@ -0,0 +1,267 @@
+"""
+* thumbnail_cache.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from typing import Callable
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QImage, QImageIOHandler
+
+from gui.image_loader import read_image
+from gui.persistence import write_atomic
+
+### THUMBNAIL CACHE macros ###
+
+THUMBNAIL_CACHE_DIRECTORY = os.path.join("botany-guide-gui", "thumbnails")
+THUMBNAIL_CACHE_MAX_BYTES = (512 * 1024 * 1024)
+THUMBNAIL_CACHE_EVICTION_RATIO = 0.9
+# Size limit shared by the GUI and the preview generation command.
+THUMBNAIL_CACHE_SETTINGS_FILE = "settings.json"
+THUMBNAIL_SIZES = [320, 1024, 2048]
+THUMBNAIL_FORMAT = "jpg"
+THUMBNAIL_QUALITY = 85
+# Default cache is created on first use, which may happen in any thread.
+THUMBNAIL_CACHE_DEFAULT_LOCK = threading.Lock()
+
+### THUMBNAIL CACHE classes ###
+
+"""
+* ThumbnailCache
+* Persistent cache of oriented and downscaled photos, keyed by photo path, size and modification time.
+"""
+class ThumbnailCache:
+
+    _default = None
+
+    def __init__(self, directory_path: str = None, max_bytes: int = None, evict: bool = True) -> None:
+        # Init context (size limit is read from the cache settings by default).
+        self.directory_path = ThumbnailCache.default_directory_path() if (directory_path is None) else directory_path
+        self.max_bytes = self._read_max_bytes() if (max_bytes is None) else max_bytes
+        self.evict = evict
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_directory_path() -> str:
+        # XDG base directory specification.
+        cache_home = os.environ.get("XDG_CACHE_HOME", "")
+        if (cache_home == ""):
+            cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(cache_home, THUMBNAIL_CACHE_DIRECTORY)
+
+    @staticmethod
+    def get_default() -> "ThumbnailCache":
+        with THUMBNAIL_CACHE_DEFAULT_LOCK:
+            if (ThumbnailCache._default is None):
+                ThumbnailCache._default = ThumbnailCache()
+        return ThumbnailCache._default
+
+    def _read_max_bytes(self) -> int:
+        # Local variables.
+        settings_path = os.path.join(self.directory_path, THUMBNAIL_CACHE_SETTINGS_FILE)
+        # Stored limit, default one otherwise.
+        try:
+            with open(settings_path, 'r', encoding='utf-8') as settings_file:
+                return int(json.load(settings_file)["max_bytes"])
+        except FileNotFoundError:
+            return THUMBNAIL_CACHE_MAX_BYTES
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning("Thumbnail cache settings ignored : %s", e)
+            return THUMBNAIL_CACHE_MAX_BYTES
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        # New limit is stored so that all users of the cache apply the same one.
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(self.directory_path, exist_ok=True)
+            write_atomic(os.path.join(self.directory_path, THUMBNAIL_CACHE_SETTINGS_FILE), json.dumps({"max_bytes": max_bytes}))
+        except OSError as e:
+            logging.warning("Thumbnail cache settings write failed : %s", e)
+
+    @staticmethod
+    def _key(image_path: str) -> str:
+        # Any modification of the photo gives a new key.
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        key = os.path.realpath(image_path) + "\0" + str(stat.st_size) + "\0" + str(stat.st_mtime_ns)
+        return hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+
+    def _entry_path(self, key: str, size: int) -> str:
+        return os.path.join(self.directory_path, key[:2], f"{key}_{size}.{THUMBNAIL_FORMAT}")
+
+    @staticmethod
+    def select_size(target_size: QSize) -> int:
+        # Smallest stored size which fills the target (None if the original is needed).
+        for size in THUMBNAIL_SIZES:
+            if (size >= max(target_size.width(), target_size.height())):
+                return size
+        return None
+
+    def _list_entries(self) -> list:
+        # Local variables.
+        entries = []
+        # Cached files with their size and last use time.
+        for root, _, files in os.walk(self.directory_path):
+            for f in files:
+                # Settings and temporary files are not entries.
+                if (not f.endswith("." + THUMBNAIL_FORMAT)):
+                    continue
+                p = os.path.join(root, f)
+                try:
+                    stat = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, p))
+        return entries
+
+    def _evict_entries(self) -> list:
+        # Evict least recently used entries (modification time is updated on each use).
+        evicted = []
+        entries = sorted(self._list_entries())
+        self._total_bytes = sum(entry[1] for entry in entries)
+        for entry_mtime_ns, entry_size, entry_path in entries:
+            if (self._total_bytes <= (self.max_bytes * THUMBNAIL_CACHE_EVICTION_RATIO)):
+                break
+            try:
+                os.remove(entry_path)
+                self._total_bytes -= entry_size
+                evicted.append(entry_mtime_ns)
+            except OSError:
+                pass
+        return evicted
+
+    def _add_bytes(self, byte_count: int) -> None:
+        # Size is checked by the owner of the cache only (see trim).
+        if (self.evict == False):
+            return
+        # Update total size (read from disk the first time, new entry is already written).
+        with self._lock:
+            if (self._total_bytes is None):
+                self._total_bytes = sum(entry[1] for entry in self._list_entries())
+            else:
+                self._total_bytes += byte_count
+            if (self._total_bytes > self.max_bytes):
+                self._evict_entries()
+
+    def trim(self, since_ns: int = 0) -> tuple:
+        # Apply the size limit at once, returns the number of evicted entries and of those written after the given time.
+        with self._lock:
+            self._total_bytes = sum(entry[1] for entry in self._list_entries())
+            if (self._total_bytes <= self.max_bytes):
+                return (0, 0)
+            evicted = self._evict_entries()
+        return (len(evicted), len([mtime_ns for mtime_ns in evicted if (mtime_ns >= since_ns)]))
+
+    def _store(self, key: str, size: int, image: QImage) -> None:
+        # Local variables.
+        entry_path = self._entry_path(key, size)
+        temporary_path = entry_path + "." + str(threading.get_ident()) + ".tmp"
+        # Write entry atomically (concurrent readers never see a partial file).
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            if (image.save(temporary_path, THUMBNAIL_FORMAT, THUMBNAIL_QUALITY) == False):
+                raise OSError("image encoding failed")
+            # Only the size difference is counted when an entry is rebuilt.
+            with self._lock:
+                previous_size = os.path.getsize(entry_path) if os.path.exists(entry_path) else 0
+                os.replace(temporary_path, entry_path)
+                byte_count = (os.path.getsize(entry_path) - previous_size)
+            self._add_bytes(byte_count)
+        except OSError as e:
+            logging.warning("Thumbnail cache write failed : %s", e)
+
+    def read(self, image_path: str, target_size: QSize = None, transformation: QImageIOHandler.Transformation = None) -> QImage:
+        # Local variables.
+        size = None if ((target_size is None) or target_size.isEmpty()) else ThumbnailCache.select_size(target_size)
+        key = None if (size is None) else ThumbnailCache._key(image_path)
+        # Original photo is needed for full resolution or very large views.
+        if (key is None):
+            return read_image(image_path, target_size, transformation)
+        # Use cached entry.
+        entry_path = self._entry_path(key, size)
+        if os.path.isfile(entry_path):
+            image = read_image(entry_path, target_size)
+            if (not image.isNull()):
+                try:
+                    os.utime(entry_path)
+                except OSError:
+                    pass
+                return image
+        # Decode original at the stored size only, then fit to the target.
+        image = read_image(image_path, QSize(size, size), transformation)
+        if image.isNull():
+            return image
+        self._store(key, size, image)
+        return image.scaled(target_size, Qt.KeepAspectRatio, Qt.SmoothTransformation) if ((image.width() > target_size.width()) or (image.height() > target_size.height())) else image
+
+    def read_cached(self, image_path: str) -> QImage:
+        # Smallest cached entry of the photo, never decodes the original (null image if none).
+        key = ThumbnailCache._key(image_path)
+        if (key is not None):
+            for size in THUMBNAIL_SIZES:
+                entry_path = self._entry_path(key, size)
+                if os.path.isfile(entry_path):
+                    return read_image(entry_path, QSize(THUMBNAIL_SIZES[0], THUMBNAIL_SIZES[0]))
+        return QImage()
+
+    def get_missing_sizes(self, image_path: str) -> list:
+        # Sizes which are not cached for the current version of the photo.
+        key = ThumbnailCache._key(image_path)
+        if (key is None):
+            return []
+        return [size for size in THUMBNAIL_SIZES if (not os.path.isfile(self._entry_path(key, size)))]
+
+    def generate(self, image_path: str, force: bool = False) -> int:
+        # Local variables.
+        key = ThumbnailCache._key(image_path)
+        generated = 0
+        # Check photo.
+        if (key is None):
+            return generated
+        missing_sizes = list(THUMBNAIL_SIZES) if (force == True) else self.get_missing_sizes(image_path)
+        if (len(missing_sizes) == 0):
+            return generated
+        # Decode original once at the largest size and derive the smaller ones.
+        image = read_image(image_path, QSize(THUMBNAIL_SIZES[-1], THUMBNAIL_SIZES[-1]))
+        if image.isNull():
+            logging.warning("Thumbnail generation failed : %s", image_path)
+            return generated
+        for size in reversed(THUMBNAIL_SIZES):
+            if ((image.width() > size) or (image.height() > size)):
+                image = image.scaled(QSize(size, size), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            if (size in missing_sizes):
+                self._store(key, size, image)
+                generated += 1
+        return generated
+
+    def rebuild(self, image_paths: list, progress_callback: Callable = None, is_cancelled: Callable = None) -> int:
+        # Local variables.
+        generated = 0
+        # Generate all sizes of the given photos again.
+        for count, image_path in enumerate(image_paths, start=1):
+            if ((is_cancelled is not None) and (is_cancelled() == True)):
+                break
+            generated += self.generate(image_path, force=True)
+            if (progress_callback is not None):
+                progress_callback(count, len(image_paths))
+        return generated
+
+    def clear(self) -> None:
+        # Remove all entries.
+        with self._lock:
+            for _, _, entry_path in self._list_entries():
+                try:
+                    os.remove(entry_path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
@@ -0,0 +1,113 @@
+"""
+* thumbs.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gui.exif import ExifIndex
+from gui.image import Image
+from gui.thumbnail_cache import ThumbnailCache, THUMBNAIL_CACHE_MAX_BYTES
+
+### THUMBS macros ###
+
+THUMBS_WORKERS = max(1, (os.cpu_count() or 1))
+THUMBS_PROGRESS_PERIOD_S = 2.0
+THUMBS_EXIF_BATCH_SIZE = 500
+
+### THUMBS functions ###
+
+def _init_process(cache_directory_path: str, max_bytes: int) -> None:
+    # Each process writes in the same cache directory (entries are written atomically), the size limit is applied once by the parent.
+    ThumbnailCache._default = ThumbnailCache(cache_directory_path, max_bytes, evict=False)
+
+def _generate(image_path: str) -> tuple:
+    # Decode original once and store all preview sizes.
+    try:
+        return (image_path, ThumbnailCache.get_default().generate(image_path), None)
+    except Exception as e:
+        return (image_path, 0, str(e))
+
+def find_outdated(image_paths: list, thumbnail_cache: ThumbnailCache) -> list:
+    # Photos whose previews are missing or older than the photo (cache keys include the modification time).
+    return [image_path for image_path in image_paths if (len(thumbnail_cache.get_missing_sizes(image_path)) > 0)]
+
+def index_exif(image_paths: list) -> None:
+    # Fill the EXIF index so that photos are sorted and oriented without reading their header.
+    for start in range(0, len(image_paths), THUMBS_EXIF_BATCH_SIZE):
+        ExifIndex.get_default().get_many(image_paths[start:(start + THUMBS_EXIF_BATCH_SIZE)])
+
+def generate_all(image_paths: list, thumbnail_cache: ThumbnailCache, workers: int = THUMBS_WORKERS, report=print) -> tuple:
+    # Local variables.
+    generated = 0
+    failed = 0
+    count = 0
+    start = time.perf_counter()
+    last_report = start
+    # One task per photo, finished photos are never processed again if the command is interrupted.
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_process, initargs=(thumbnail_cache.directory_path, thumbnail_cache.max_bytes)) as executor:
+        futures = [executor.submit(_generate, image_path) for image_path in image_paths]
+        try:
+            for future in as_completed(futures):
+                image_path, entry_count, error = future.result()
+                count += 1
+                generated += entry_count
+                if (error is not None):
+                    failed += 1
+                    logging.error("Preview generation failed for %s : %s", image_path, error)
+                # Report throughput periodically.
+                now = time.perf_counter()
+                if ((now - last_report) >= THUMBS_PROGRESS_PERIOD_S):
+                    last_report = now
+                    report(f"{count}/{len(image_paths)} photos, {count / (now - start):.1f} images/s")
+        except KeyboardInterrupt:
+            # Drop queued photos, next run resumes from the missing ones.
+            executor.shutdown(wait=True, cancel_futures=True)
+            report(f"Interrupted after {count} photos")
+            raise
+    return (count, generated, failed, (time.perf_counter() - start))
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate the cached photo previews of a workspace.")
+    parser.add_argument("directory", help="Workspace directory")
+    parser.add_argument("--workers", type=int, default=THUMBS_WORKERS, help=f"Worker processes (default: {THUMBS_WORKERS})")
+    parser.add_argument("--cache-directory", default=None, help="Cache directory (default: " + ThumbnailCache.default_directory_path() + ")")
+    parser.add_argument("--max-bytes", type=int, default=None, help=f"Cache size limit in bytes, older entries are evicted (stored in the cache and also used by the GUI, default: {THUMBNAIL_CACHE_MAX_BYTES})")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # List photos and keep the ones which need previews.
+    thumbnail_cache = ThumbnailCache(args.cache_directory)
+    if (args.max_bytes is not None):
+        thumbnail_cache.set_max_bytes(args.max_bytes)
+    image_paths = Image.find(args.directory)
+    index_exif(image_paths)
+    outdated_paths = find_outdated(image_paths, thumbnail_cache)
+    print(f"{len(image_paths)} photos, {len(image_paths) - len(outdated_paths)} up to date, {len(outdated_paths)} to process")
+    if (len(outdated_paths) == 0):
+        return 0
+    # Generate previews.
+    start_ns = time.time_ns()
+    try:
+        count, generated, failed, duration = generate_all(outdated_paths, thumbnail_cache, args.workers)
+    except KeyboardInterrupt:
+        thumbnail_cache.trim()
+        return 130
+    print(f"{count} photos processed in {duration:.1f} s ({count / max(duration, 1e-6):.1f} images/s), {generated} previews written, {failed} failed")
+    # Apply the size limit once all previews are written (older entries go first).
+    evicted, evicted_generated = thumbnail_cache.trim(start_ns)
+    if (evicted > 0):
+        print(f"{evicted} cached previews evicted to stay below {thumbnail_cache.max_bytes} bytes")
+    if (evicted_generated > 0):
+        print(f"Warning: {evicted_generated} previews written by this run have been evicted, increase --max-bytes")
+        return 1
+    return 0 if (failed == 0) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
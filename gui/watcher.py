@@ -0,0 +1,93 @@
+"""
+* watcher.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import logging
+import os
+import time
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+
+### WATCHER macros ###
+
+WATCHER_DEBOUNCE_MS = 300
+WATCHER_LATENCY_MAX_MS = 2000
+
+### WATCHER classes ###
+
+"""
+* WorkspaceWatcher
+* File system watcher emitting the changed paths once a burst of events is over.
+"""
+class WorkspaceWatcher(QObject):
+
+    changed = Signal(list)
+
+    def __init__(self, parent: QObject = None) -> None:
+        # Init parent.
+        super().__init__(parent)
+        # Init context.
+        self._pending = set()
+        self._first_event_time = None
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._path_changed_callback)
+        self._watcher.fileChanged.connect(self._path_changed_callback)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(WATCHER_DEBOUNCE_MS)
+        self._timer.timeout.connect(self._flush)
+
+    def add_paths(self, paths: list) -> None:
+        # Local variables.
+        watched = set(self._watcher.directories()) | set(self._watcher.files())
+        new_paths = [p for p in paths if ((p is not None) and (p not in watched) and os.path.exists(p))]
+        # Add paths.
+        if (len(new_paths) == 0):
+            return
+        failed_paths = self._watcher.addPaths(new_paths)
+        if (len(failed_paths) > 0):
+            logging.warning("%d paths cannot be watched (system limit reached?)", len(failed_paths))
+
+    def remove_paths(self, paths: list) -> None:
+        # Local variables.
+        watched = set(self._watcher.directories()) | set(self._watcher.files())
+        old_paths = [p for p in paths if (p in watched)]
+        # Remove paths.
+        if (len(old_paths) > 0):
+            self._watcher.removePaths(old_paths)
+
+    def set_paths(self, paths: list) -> None:
+        self.clear()
+        self.add_paths(paths)
+
+    def clear(self) -> None:
+        # Stop watching and drop pending events.
+        watched = self._watcher.directories() + self._watcher.files()
+        if (len(watched) > 0):
+            self._watcher.removePaths(watched)
+        self._timer.stop()
+        self._pending.clear()
+        self._first_event_time = None
+
+    def _path_changed_callback(self, path: str) -> None:
+        # Store path and restart debounce timer.
+        self._pending.add(path)
+        if (self._first_event_time is None):
+            self._first_event_time = time.monotonic()
+        # Do not postpone notification forever during a continuous flow of events.
+        if (((time.monotonic() - self._first_event_time) * 1000.0) < WATCHER_LATENCY_MAX_MS):
+            self._timer.start()
+        elif (self._timer.isActive() == False):
+            self._timer.start(0)
+
+    def _flush(self) -> None:
+        # Emit all changed paths at once.
+        paths = sorted(self._pending)
+        self._pending.clear()
+        self._first_event_time = None
+        self._timer.setInterval(WATCHER_DEBOUNCE_MS)
+        if (len(paths) > 0):
+            self.changed.emit(paths)
@@ -0,0 +1,57 @@
+"""
+* worker.py
+*
+*  Created on: 18 oct. 2026
+*      Author: Ludo
+"""
+
+import logging
+import threading
+
+from typing import Callable
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+### WORKER classes ###
+
+"""
+* WorkerSignals
+* Signals emitted by a worker, delivered to the GUI thread through queued connections.
+"""
+class WorkerSignals(QObject):
+
+    progress = Signal(object)
+    finished = Signal(object)
+    failed = Signal(str)
+
+"""
+* Worker
+* Thread pool task running a function which receives the worker as first argument.
+"""
+class Worker(QRunnable):
+
+    def __init__(self, function: Callable, *args) -> None:
+        # Init parent.
+        super().__init__()
+        # Object is kept alive by its owner.
+        self.setAutoDelete(False)
+        # Init context.
+        self.signals = WorkerSignals()
+        self._function = function
+        self._args = args
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self) -> None:
+        # Execute function.
+        try:
+            result = self._function(self, *self._args)
+        except Exception as e:
+            logging.error("Worker failed : %s", e)
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
@@ -5,14 +5,13 @@
 *      Author: Ludo
 """
 
-import json
 import logging
 import os
 
-from typing import Any
 from PySide6.QtWidgets import QFileDialog
 
 from gui.classification import ClassificationView
+from gui.json_codec import JsonCodec, JsonField, JsonObject
 
 ### CLASSIFICATION macros ###   
 
@@ -20,6 +19,10 @@ WORKSPACE_FILE = 'workspace.json'
 WORKSPACE_JSON_KEY_TOP_LEVEL = 'workspace'
 WORKSPACE_JSON_KEY_DIRECTORY_PATH = 'directory_path'
 
+WORKSPACE_CODEC = JsonCodec(JsonObject(WORKSPACE_JSON_KEY_TOP_LEVEL, [
+    JsonField(WORKSPACE_JSON_KEY_DIRECTORY_PATH, "_directory_path"),
+]))
+
 ### CLASSIFICATION class definition ###
         
 class WorkspaceView:
@@ -30,6 +33,7 @@ class WorkspaceView:
         # Init context.
         self._gui = gui
         self._directory_path = ""
+        self._classification = None
         # Check if there is a workspace file.
         for f in sorted(os.listdir(root_directory)):
             # Build complete path.
@@ -50,47 +54,17 @@ class WorkspaceView:
         self._gui.workspaceContentLabel.setText(self._directory_path)
         self._gui.workspaceEditPushButton.clicked.connect(self._edit_workspace_callback)
         self._gui.workspaceEditPushButton.setEnabled(True)
-        # Display classification.
-        self._classification = ClassificationView(self._gui, self._directory_path)
+        # Display classification (already created if the workspace has just been selected).
+        if (self._classification is None):
+            self._classification = ClassificationView(self._gui, self._directory_path)
         
-    @staticmethod
-    def _to_text(value: Any) -> str:
-        if value is None:
-            return ""
-        return str(value)
-            
     def _parse_json(self, workspace_json_path: str) -> None:
-        # Open JSON file.
-        try:
-            with open(workspace_json_path, 'r') as json_file:
-                data = json.load(json_file)
-        except Exception as e:
-            raise ValueError(f"Workspace JSON file decoding failed: {e}")
-        # Check top level key.
-        if WORKSPACE_JSON_KEY_TOP_LEVEL not in data:
-            raise ValueError("Workspace JSON file top level key not found")
-        # Extract data.
-        workspace_mapping = data[WORKSPACE_JSON_KEY_TOP_LEVEL]
-        # Check type.
-        if not isinstance(workspace_mapping, dict):
-            raise ValueError("Invalid workspace content: expected an object")
-        # Update context.
-        self._directory_path = self._to_text(workspace_mapping.get(WORKSPACE_JSON_KEY_DIRECTORY_PATH, ""))
+        # Decode and validate in a single pass.
+        WORKSPACE_CODEC.load(workspace_json_path, self)
 
     def _write_json(self) -> None:
-        # Local variables.
-        data = dict()
-        json_path = os.path.join(os.getcwd(), WORKSPACE_FILE)
-        # Open JSON file.
-        with open(json_path, 'r+' if (os.path.isfile(json_path)) else 'w+') as json_file:
-            # Compute data.
-            data[WORKSPACE_JSON_KEY_TOP_LEVEL] = dict()
-            data[WORKSPACE_JSON_KEY_TOP_LEVEL][WORKSPACE_JSON_KEY_DIRECTORY_PATH] = self._directory_path
-            # Write file.
-            json_file.seek(0)
-            json.dump(data, json_file, indent=4)
-            json_file.truncate()
-            json_file.close()
+        # Write file in background.
+        WORKSPACE_CODEC.save(os.path.join(os.getcwd(), WORKSPACE_FILE), self)
             
     def _edit_workspace_callback(self) -> None:
         # Ask new workspace.
@@ -102,6 +76,9 @@ class WorkspaceView:
         self._gui.workspaceContentLabel.setText(self._directory_path)
         # Update metadata file.
         self._write_json()
+        # Release previous classification.
+        if (self._classification is not None):
+            self._classification.close()
         # Display new classification.
         self._classification = ClassificationView(self._gui, self._directory_path)
             
\ No newline at end of file